@@ -0,0 +1,24 @@
+__all__ = ["metrics_router"]
+
+from fastapi import APIRouter
+
+from common.utils.llm_admission import LLMAdmissionStats, get_llm_admission_stats
+from common.utils.llm_router import LLMBackendStats, get_llm_backend_stats
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/llm", response_model=list[LLMAdmissionStats])
+async def get_llm_metrics() -> list[LLMAdmissionStats]:
+    """
+    In-flight calls, queue depth per priority and admission wait times of each LLM backend.
+    """
+    return get_llm_admission_stats()
+
+
+@metrics_router.get("/llm/backends", response_model=list[LLMBackendStats])
+async def get_llm_backend_metrics() -> list[LLMBackendStats]:
+    """
+    Calls, failures, circuit state and p50/p95/p99 latencies of each LLM backend.
+    """
+    return get_llm_backend_stats()
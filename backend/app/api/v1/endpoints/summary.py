@@ -2,10 +2,10 @@ __all__ = ["summary_router"]
 
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
 from backend.app.schemas.summary import WeeklySummaryResponse
-from backend.app.services.summary import SummaryService
+from backend.app.services.summary_cache import get_weekly_summary_cache
 from backend.app.config.config import backend_config
 from backend.app.exceptions.sources import NotEnoughSourcesException
 
@@ -13,20 +13,32 @@ logger = logging.getLogger(__name__)
 summary_router = APIRouter()
 
 
-async def get_summary_service() -> SummaryService:
-    return await SummaryService.from_config(backend_config)
-
-
-@summary_router.get("/weekly/text")
+@summary_router.get("/weekly/text", response_model=WeeklySummaryResponse)
 async def get_weekly_summary_text(
-    # summary_service: SummaryService = Depends(get_summary_service),
-) -> WeeklySummaryResponse:  # TODO: Add user settings to the summary
-    summary_service = await get_summary_service()
+    request: Request,
+) -> Response:  # TODO: Add user settings to the summary
+    summary_cache = await get_weekly_summary_cache(backend_config)
     try:
-        return await summary_service.generate_summary(weeks=1, days=0)
-    except NotEnoughSourcesException as e:
+        cached = await summary_cache.get()
+    except (NotEnoughSourcesException, TimeoutError) as e:
         logger.exception(e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="There was an error generating the summary",
         )
+
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": (
+            f"public, max-age={backend_config.weekly_summary_max_age_seconds}, "
+            f"stale-while-revalidate={backend_config.weekly_summary_stale_while_revalidate_seconds}"
+        ),
+        "Last-Modified": cached.generated_at.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+    }
+    if request.headers.get("If-None-Match") == cached.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=cached.summary.model_dump_json(),
+        media_type="application/json",
+        headers=headers,
+    )
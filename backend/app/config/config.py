@@ -1,3 +1,5 @@
+from pydantic import Field
+
 from common.config.base_config import BaseConfig
 
 
@@ -6,14 +8,34 @@ class BackendConfig(BaseConfig):
     tool_call_llm: str
     summarize_llm: str
     summarize_docs_prompt: str
+    summarize_context_max_tokens: int
+    # Later documents would get no budget share at 0
+    summarize_context_rank_decay: float = Field(gt=0)
+    summarize_context_duplicate_threshold: float
     max_tool_call_retries: int
     max_search_results: int
     max_retries: int
     max_clothing_items_to_stream: int
     max_images_to_display: int
+    image_display_size: int
+    hybrid_search_vector_weight: float
+    hybrid_search_lexical_weight: float
+    hybrid_search_lexical_k: int
+    hybrid_search_rrf_k: int
+    grade_docs_prompt: str
+    grade_docs_max_concurrency: int
+    grade_docs_min_relevant_docs: int
+    grade_docs_timeout: float
+    grade_docs_max_doc_chars: int
     summarize_weekly_prompt: str
     summarize_docs_prompt_no_images: str
     min_sources_for_summary: int
+    embedding_migrations_table_name: str
+    weekly_summary_refresh_interval_seconds: int
+    weekly_summary_check_interval_seconds: int
+    weekly_summary_refresh_timeout_seconds: int
+    weekly_summary_max_age_seconds: int
+    weekly_summary_stale_while_revalidate_seconds: int
     select_action_plan_prompt: str
     question_filter_prompt: str
     clothing_extractor_prompt: str
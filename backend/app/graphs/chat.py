@@ -1,5 +1,6 @@
 import re
 import asyncio
+import uuid
 import logging
 from functools import partial
 from typing import AsyncGenerator, Any, Union, Optional
@@ -11,6 +12,8 @@ from langgraph.graph.state import CompiledStateGraph
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.prompts import PromptTemplate
 from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import llm_request_id
 
 from backend.app.config.config import BackendConfig, backend_config
 from backend.app.utils.streaming import AsyncStreamingCallbackHandler, StreamingData
@@ -20,7 +23,7 @@ from backend.app.graphs.rag import RagGraph
 from backend.app.graphs.clothing_search import ClothingSearchGraph
 from backend.app.nodes.end import EndNode
 from backend.app.nodes.subgraph_start import SubgraphStartNode
-from common.db.vector_store import PgVectorStore
+from common.db.vector_store import PgVectorStore, get_async_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -64,7 +67,7 @@ class ChatGraph(BaseModel):
             else None
         )
         graph = StateGraph(AgentState)
-        vector_store = await PgVectorStore.from_config(config)
+        vector_store = await get_async_vector_store(config)
 
         subgraphs = cls._get_subgraphs_from_config(config, vector_store, stream_handler)
 
@@ -87,7 +90,12 @@ class ChatGraph(BaseModel):
             START,
             partial(
                 ChatGraph.select_subgraph,
-                get_llm_from_config(config, config.fast_llm),
+                get_llm_from_config(
+                    config,
+                    config.fast_llm,
+                    batched=True,
+                    priority=LLMPriority.ROUTING,
+                ),
                 subgraphs,
             ),
             [
@@ -102,7 +110,9 @@ class ChatGraph(BaseModel):
             stop_event=stop_event,
             stream_handler=stream_handler,
             subgraphs=subgraphs,
-            llm=get_llm_from_config(config, config.fast_llm),
+            llm=get_llm_from_config(
+                config, config.fast_llm, priority=LLMPriority.ROUTING
+            ),
         )
 
     async def ainvoke(self, *args, **kwargs) -> Union[dict[str, Any], Any]:
@@ -110,6 +120,8 @@ class ChatGraph(BaseModel):
         Wrapper function to invoke the graph with the streaming callback handler.
         """
         result = None
+        # LLM calls made for this question are queued fairly against those of other questions
+        llm_request_id.set(uuid.uuid4().hex)
         if self.stream_handler:
             await self.stream_handler.on_llm_start(serialized={}, prompts=[], **kwargs)
         try:
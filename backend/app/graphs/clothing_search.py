@@ -14,6 +14,7 @@ from backend.app.nodes.clothing_search import ClothingSearchNode
 from backend.app.nodes.clothing_parser import ClothingParserNode
 from backend.app.config.config import backend_config
 from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
 
 
 class ClothingSearchGraph(Subgraph):
@@ -36,9 +37,13 @@ class ClothingSearchGraph(Subgraph):
         config: BackendConfig,
         stream_handler: Optional[AsyncStreamingCallbackHandler] = None,
     ) -> "ClothingSearchGraph":
-        llm = get_llm_from_config(config)
-        fast_llm = get_llm_from_config(config, config.fast_llm)
-        structured_llm = get_llm_from_config(config, config.tool_call_llm)
+        llm = get_llm_from_config(config, priority=LLMPriority.BACKGROUND)
+        fast_llm = get_llm_from_config(
+            config, config.fast_llm, batched=True, priority=LLMPriority.BACKGROUND
+        )
+        structured_llm = get_llm_from_config(
+            config, config.tool_call_llm, priority=LLMPriority.BACKGROUND
+        )
         graph = StateGraph(ClothingGraphState)
         graph.add_node(
             "clothing_extractor",
@@ -76,7 +81,12 @@ class ClothingSearchGraph(Subgraph):
         """
         # TODO: This should be a classifier to save money on LLM calls
         # TODO: Train a BERT classifier to classify questions into clothing or not clothing
-        fast_llm = get_llm_from_config(backend_config, llm=backend_config.fast_llm)
+        fast_llm = get_llm_from_config(
+            backend_config,
+            llm=backend_config.fast_llm,
+            batched=True,
+            priority=LLMPriority.ROUTING,
+        )
         prompt = PromptTemplate(
             input_variables=["user_question"],
             template=backend_config.question_filter_prompt,
@@ -6,9 +6,12 @@ from backend.app.config.config import BackendConfig
 from backend.app.utils.streaming import AsyncStreamingCallbackHandler
 from common.db.vector_store import PgVectorStore
 from backend.app.schemas.rag import RagState
+from backend.app.nodes.grade_docs import GradeDocsNode
 from backend.app.nodes.retrieve import RetrieveNode
 from backend.app.nodes.summarize_docs import SummarizeDocsNode
 from backend.app.schemas.subgraph import Subgraph
+from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
 
 
 class RagGraph(Subgraph):
@@ -35,15 +38,37 @@ class RagGraph(Subgraph):
     ) -> "RagGraph":
         graph = StateGraph(RagState)
 
-        graph.add_node("retrieve", RetrieveNode(vector_store))
-        # graph.add_node("grade_docs", GradeDocsNode(stream_handler))
+        graph.add_node(
+            "retrieve",
+            RetrieveNode(
+                vector_store,
+                vector_weight=config.hybrid_search_vector_weight,
+                lexical_weight=config.hybrid_search_lexical_weight,
+                lexical_k=config.hybrid_search_lexical_k,
+                rrf_k=config.hybrid_search_rrf_k,
+            ),
+        )
+        graph.add_node(
+            "grade_docs",
+            GradeDocsNode(
+                get_llm_from_config(
+                    config,
+                    config.fast_llm,
+                    batched=True,
+                    priority=LLMPriority.ROUTING,
+                ),
+                config.grade_docs_prompt,
+                max_concurrency=config.grade_docs_max_concurrency,
+                min_relevant_docs=config.grade_docs_min_relevant_docs,
+                timeout=config.grade_docs_timeout,
+                max_doc_chars=config.grade_docs_max_doc_chars,
+            ),
+        )
         graph.add_node("summarize", SummarizeDocsNode(stream_handler))
 
         graph.add_edge(START, "retrieve")
-        graph.add_edge("retrieve", "summarize")
-        # TODO: Re-enable doc grading once RAG performance is improved
-        # graph.add_edge("retrieve", "grade_docs")
-        # graph.add_edge("grade_docs", "summarize")
+        graph.add_edge("retrieve", "grade_docs")
+        graph.add_edge("grade_docs", "summarize")
         graph.add_edge("summarize", END)
 
         return cls(
@@ -1,3 +1,4 @@
+import asyncio
 import gc
 import logging
 import jwt
@@ -7,7 +8,7 @@ from fastapi import FastAPI, HTTPException, Request, status
 from fastapi_limiter import FastAPILimiter
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from langchain.globals import set_llm_cache
 from langchain_community.cache import RedisCache
 from pydantic import ValidationError
@@ -16,6 +17,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from backend.app.config.config import backend_config
 from backend.app.api.v1 import api
 from backend.app.api.dependencies import get_redis_client, get_redis_client_sync
+from common.db.postgres import dispose_async_engine_from_config
+from backend.app.services.summary_cache import get_weekly_summary_cache
+from common.db.vector_store import get_async_vector_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -76,13 +80,22 @@ async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
         redis_client,
         identifier=user_id_identifier,
     )
+    # Process-wide vector store on a shared async connection pool, reused by every request
+    await get_async_vector_store(backend_config)
+    # Weekly summary is regenerated in the background and served from Redis
+    summary_cache = await get_weekly_summary_cache(backend_config)
+    summary_refresh_task = asyncio.create_task(summary_cache.run())
 
     logger.info("Start up FastAPI [Full dev mode]")
     yield
 
     # shutdown
+    summary_refresh_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await summary_refresh_task
     await FastAPICache.clear()
     await FastAPILimiter.close()
+    await dispose_async_engine_from_config(backend_config)
     gc.collect()
 
 
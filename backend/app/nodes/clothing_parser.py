@@ -258,7 +258,6 @@ class ClothingParserNode(BaseModel, Runnable[ClothingGraphState, ClothingGraphSt
             template=backend_config.is_clothing_product_link_prompt,
         )
         extract_prompt = prompt.format(url=url)
-        # TODO: Add batching to speed up processing
         raw_res = AIMessage.model_validate(
             await self.fast_llm.ainvoke(extract_prompt)
         ).content
@@ -1,21 +1,44 @@
 from typing import Optional
+import asyncio
+import logging
 
+from langchain.schema import AIMessage
 from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
 
 from backend.app.schemas.rag import RagState
-from backend.app.schemas.rag import DocumentGrade
-from backend.app.utils.streaming import AsyncStreamingCallbackHandler
+
+logger = logging.getLogger(__name__)
 
 
 class GradeDocsNode(Runnable[RagState, RagState]):
+    """
+    Drops retrieved documents the LLM grades as irrelevant to the question.
+    All documents are graded concurrently, at most max_concurrency at a time.
+    Grading stops as soon as min_relevant_docs are found. After timeout seconds
+    the documents not yet graded are passed through, so grading never holds up
+    the answer for longer than the timeout.
+    """
+
     def __init__(
-        self, llm: BaseLanguageModel, stream_handler: AsyncStreamingCallbackHandler
+        self,
+        llm: BaseLanguageModel,
+        grade_docs_prompt: str,
+        max_concurrency: int = 8,
+        min_relevant_docs: int = 3,
+        timeout: float = 5.0,
+        max_doc_chars: int = 2000,
     ):
         self.llm = llm
-        self.stream_handler = stream_handler
+        self.prompt = PromptTemplate(
+            input_variables=["question", "doc"], template=grade_docs_prompt
+        )
+        self.max_concurrency = max_concurrency
+        self.min_relevant_docs = min_relevant_docs
+        self.timeout = timeout
+        self.max_doc_chars = max_doc_chars
 
     def invoke(self, state: RagState) -> RagState:
         raise NotImplementedError("GradeDocsNode does not support sync invoke")
@@ -25,37 +48,55 @@ class GradeDocsNode(Runnable[RagState, RagState]):
         state: RagState,
         config: Optional[RunnableConfig] = None,
     ) -> RagState:
-        grade_docs_prompt = PromptTemplate.from_template(
-            """
-            You are a helpful assistant that grades the relevance of documents to a user's question.
-            You are given a document and a user's question.
-            You must determine if the document is relevant to the question.
-            You must return a grade of "yes" if the document is relevant, and "no" if the document is not relevant.
-            You must return a reason for your grade.
-            """
-        )
+        docs = state["docs"]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
         async def grade_doc(doc: Document) -> bool:
-            grading_chain = grade_docs_prompt | self.llm.with_structured_output(
-                DocumentGrade
-            )
-            return (
-                "yes"
-                == (  # TODO: Might need less stringent requirements for weaker LLMs
-                    DocumentGrade(
-                        **(
-                            await grading_chain.ainvoke(
-                                {
-                                    "question": state["user_question"],
-                                    "doc": doc.page_content,
-                                }
-                            )
-                        )
-                    ).grade
+            async with semaphore:
+                return await self.grade_doc(state["user_question"], doc)
+
+        tasks = {asyncio.create_task(grade_doc(doc)): i for i, doc in enumerate(docs)}
+        grades: dict[int, bool] = {}
+        pending = set(tasks)
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        try:
+            while pending and sum(grades.values()) < self.min_relevant_docs:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=deadline - asyncio.get_running_loop().time(),
+                    return_when=asyncio.FIRST_COMPLETED,
                 )
-            )
+                if not done:
+                    logger.warning(
+                        f"Grading timed out after {self.timeout}s, passing through "
+                        f"{len(pending)} ungraded documents"
+                    )
+                    break
+                for task in done:
+                    if task.exception() is not None:
+                        logger.warning(f"Failed to grade document: {task.exception()}")
+                    # Documents that failed grading are kept
+                    grades[tasks[task]] = task.exception() is not None or task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if sum(grades.values()) >= self.min_relevant_docs:
+            relevant_docs = [doc for i, doc in enumerate(docs) if grades.get(i)]
+        else:
+            relevant_docs = [doc for i, doc in enumerate(docs) if grades.get(i, True)]
+        if not relevant_docs:
+            logger.warning("No documents graded relevant, keeping the retrieved ones")
+            relevant_docs = docs
+        logger.info(
+            f"Kept {len(relevant_docs)}/{len(docs)} documents "
+            f"after grading {len(grades)} of them"
+        )
+        return {"docs": relevant_docs}
 
-        return {
-            "documents": (filtered_docs := [*(filter(grade_doc, state["docs"]))]),
-            "search": len(filtered_docs) == len(state["docs"]),
-        }
+    async def grade_doc(self, question: str, doc: Document) -> bool:
+        grade_prompt = self.prompt.format(
+            question=question, doc=doc.page_content[: self.max_doc_chars]
+        )
+        raw_res = AIMessage.model_validate(await self.llm.ainvoke(grade_prompt)).content
+        return "true" in raw_res.lower()
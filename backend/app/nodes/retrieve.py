@@ -1,17 +1,38 @@
 from typing import Optional
+import asyncio
 import logging
 
 from langchain_core.runnables import Runnable, RunnableConfig
 
 from backend.app.schemas.rag import RagState
 from common.db.vector_store import PgVectorStore
+from common.utils.chunks import merge_chunks_by_parent
+from common.utils.rank_fusion import reciprocal_rank_fusion
 
 logger = logging.getLogger(__name__)
 
 
 class RetrieveNode(Runnable[RagState, RagState]):
-    def __init__(self, vector_store: PgVectorStore):
-        self.retriever = vector_store.as_retriever()
+    """
+    Hybrid retrieval: vector search and Postgres full-text search run concurrently
+    and are fused with weighted reciprocal rank fusion. Ranking falls back to the vector results
+    when the vector store found no lexical search index at startup.
+    The best chunks are then merged per page, carrying the page metadata.
+    """
+
+    def __init__(
+        self,
+        vector_store: PgVectorStore,
+        vector_weight: float = 1.0,
+        lexical_weight: float = 1.0,
+        lexical_k: int = 20,
+        rrf_k: int = 60,
+    ):
+        self.vector_store = vector_store
+        self.vector_weight = vector_weight
+        self.lexical_weight = lexical_weight
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
 
     def invoke(self, state: RagState) -> RagState:
         raise NotImplementedError("RetrieveNode does not support sync invoke")
@@ -21,10 +42,20 @@ class RetrieveNode(Runnable[RagState, RagState]):
         state: RagState,
         config: Optional[RunnableConfig] = None,
     ) -> RagState:
-        docs = self.retriever.invoke(state["user_question"])
-        logger.info(f"Retrieved {len(docs)} documents")
-        # TODO: Augment with BM25 retrieval using Rank-BM25
-        # https://github.com/dorianbrown/rank_bm25
+        vector_docs, lexical_docs = await asyncio.gather(
+            self.vector_store.asearch(state["user_question"]),
+            self.vector_store.alexical_search(state["user_question"], self.lexical_k),
+        )
+        chunks = reciprocal_rank_fusion(
+            [vector_docs, lexical_docs],
+            weights=[self.vector_weight, self.lexical_weight],
+            k=self.rrf_k,
+        )[: self.vector_store.vector_search_k]
+        docs = merge_chunks_by_parent(chunks)
+        logger.info(
+            f"Retrieved {len(chunks)} chunks of {len(docs)} pages "
+            f"from {len(vector_docs)} vector and {len(lexical_docs)} lexical results"
+        )
         return {
             "user_question": state["user_question"],
             "messages": state["messages"],
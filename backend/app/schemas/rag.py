@@ -10,10 +10,15 @@ def user_question_reducer(x: str, y: str) -> str:
     return y if y is not None else x
 
 
+def docs_reducer(x: list[Document], y: list[Document]) -> list[Document]:
+    # Grading replaces the retrieved documents with the relevant ones
+    return y if y is not None else x
+
+
 class RagState(TypedDict):
     user_question: Annotated[str, user_question_reducer]
     messages: Annotated[Sequence[BaseMessage], operator.add]
-    docs: Annotated[list[Document], operator.add]
+    docs: Annotated[list[Document], docs_reducer]
     output: Annotated[str, operator.add]
 
 
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -5,3 +8,11 @@ class WeeklySummaryResponse(BaseModel):
     text: str
     sources: list[str]
     images: list[str]
+
+
+class CachedWeeklySummary(BaseModel):
+    summary: WeeklySummaryResponse
+    etag: str
+    generated_at: datetime
+    # Timestamp of the newest document in the vector store when the summary was generated
+    data_version: Optional[str]
@@ -15,8 +15,10 @@ from backend.app.utils.rag import (
     get_image_urls,
     get_source_urls,
 )
+from common.utils.chunks import merge_chunks_by_parent
 from common.utils.llm import get_llm_from_config
-from common.db.vector_store import PgVectorStore
+from common.schemas.llm import LLMPriority
+from common.db.vector_store import PgVectorStore, get_async_vector_store
 
 logger = logging.getLogger(__name__)
 
@@ -30,14 +32,19 @@ class SummaryService(BaseModel):
 
     @classmethod
     async def from_config(cls, config: BackendConfig) -> "SummaryService":
-        vector_store = await PgVectorStore.from_config(config)
-        return cls(llm=get_llm_from_config(config), vector_store=vector_store)
+        vector_store = await get_async_vector_store(config)
+        return cls(
+            llm=get_llm_from_config(config, priority=LLMPriority.BACKGROUND),
+            vector_store=vector_store,
+        )
 
     async def generate_summary(self, weeks: int, days: int) -> WeeklySummaryResponse:
-        retriever = self.vector_store.as_retriever(
-            # filter=self._get_age_filter(weeks, days) TODO: Re-enable metadata filtering
+        docs = merge_chunks_by_parent(
+            await self.vector_store.asearch(
+                backend_config.summarize_weekly_prompt,
+                filter=self._get_age_filter(weeks, days),
+            )
         )
-        docs = retriever.invoke(backend_config.summarize_weekly_prompt)
 
         if not docs:
             raise NotEnoughSourcesException(
@@ -53,28 +60,26 @@ class SummaryService(BaseModel):
 
         summary = (
             await summarize_docs(
-                backend_config.summarize_weekly_prompt, docs, metadatas, self.llm
+                backend_config.summarize_weekly_prompt,
+                docs,
+                metadatas,
+                self.llm,
+                llm_name=backend_config.llm,
             )
         ).content
         return WeeklySummaryResponse(
             text=str(summary), sources=sources, images=image_urls
         )
 
-    # @staticmethod
-    # def _get_age_filter(weeks: int, days: int) -> dict:
-    #     one_week_ago = datetime.now() - timedelta(weeks=weeks, days=days)
-    #     # TODO: Think of the correct way to use metadata filtering with PGVector
-    #     return {
-    #         "query": """
-    #             SELECT * FROM langchain_pg_embedding
-    #             WHERE cmetadata->>'timestamp' < %s
-    #             AND cmetadata->>'timestamp' > %s
-    #         """,
-    #         "params": (
-    #             datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f"),
-    #             one_week_ago.strftime("%Y-%m-%dT%H:%M:%S.%f"),
-    #         ),
-    #     }
+    @staticmethod
+    def _get_age_filter(weeks: int, days: int) -> dict:
+        """
+        Restricts retrieval to documents crawled in the time window.
+        Compiles to an indexed comparison on cmetadata ->> 'timestamp',
+        which VectorMetadata stores as an ISO 8601 string.
+        """
+        window_start = datetime.now() - timedelta(weeks=weeks, days=days)
+        return {"timestamp": {"$gte": window_start.isoformat()}}
 
     @staticmethod
     def _has_enough_sources_for_summary(sources: list[str]) -> bool:
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from redis import asyncio as aioredis
+
+from backend.app.api.dependencies import get_redis_client
+from backend.app.config.config import BackendConfig
+from backend.app.exceptions.sources import NotEnoughSourcesException
+from backend.app.schemas.summary import CachedWeeklySummary
+from backend.app.services.summary import SummaryService
+
+logger = logging.getLogger(__name__)
+
+# Deletes the refresh lock only if it still holds this worker's token, so a worker whose
+# lock expired mid-refresh can't release the lock another worker has taken since
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class WeeklySummaryCache(BaseModel):
+    """
+    Weekly summary materialized in Redis, so requests never wait on retrieval and the LLM.
+    A background task regenerates it on a schedule and as soon as the crawler ingests
+    new documents. Requests meanwhile get the previous summary (stale-while-revalidate).
+    A Redis lock keeps concurrent API workers from refreshing at the same time.
+    """
+
+    redis_client: aioredis.Redis
+    summary_service: SummaryService
+    weeks: int = 1
+    days: int = 0
+    refresh_interval_seconds: int
+    check_interval_seconds: int
+    refresh_timeout_seconds: int
+    _refresh_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    async def from_config(cls, config: BackendConfig) -> "WeeklySummaryCache":
+        return cls(
+            redis_client=await get_redis_client(),
+            summary_service=await SummaryService.from_config(config),
+            refresh_interval_seconds=config.weekly_summary_refresh_interval_seconds,
+            check_interval_seconds=config.weekly_summary_check_interval_seconds,
+            refresh_timeout_seconds=config.weekly_summary_refresh_timeout_seconds,
+        )
+
+    @property
+    def key(self) -> str:
+        return f"weekly_summary:{self.weeks}w{self.days}d"
+
+    async def get(self) -> CachedWeeklySummary:
+        """
+        Returns the stored summary, scheduling a background refresh if it is older
+        than the refresh interval. Only the very first request waits for a summary.
+
+        Raises:
+            NotEnoughSourcesException: If there is no summary and none can be generated.
+        """
+        cached = await self._load()
+        if cached is None:
+            return await self._wait_for_refresh()
+        if self._age_seconds(cached) > self.refresh_interval_seconds:
+            self.schedule_refresh()
+        return cached
+
+    def schedule_refresh(self) -> None:
+        """Refreshes the summary in the background unless this process is already doing so."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_logged())
+
+    async def refresh(self) -> Optional[CachedWeeklySummary]:
+        """
+        Generates and stores a new summary.
+        Returns None without generating one if another worker holds the refresh lock.
+        """
+        lock_key = f"{self.key}:lock"
+        lock_token = uuid.uuid4().hex
+        if not await self.redis_client.set(
+            lock_key, lock_token, nx=True, ex=self.refresh_timeout_seconds
+        ):
+            return None
+        try:
+            data_version = await self.summary_service.vector_store.alatest_timestamp()
+            summary = await self.summary_service.generate_summary(
+                weeks=self.weeks, days=self.days
+            )
+            summary_json = summary.model_dump_json()
+            cached = CachedWeeklySummary(
+                summary=summary,
+                etag=f'"{hashlib.sha256(summary_json.encode("utf-8")).hexdigest()[:32]}"',
+                generated_at=datetime.now(timezone.utc),
+                data_version=data_version,
+            )
+            await self.redis_client.set(self.key, cached.model_dump_json())
+            logger.info(f"Refreshed weekly summary, data version {data_version}")
+            return cached
+        finally:
+            await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+
+    async def run(self) -> None:
+        """
+        Refreshes the summary whenever the vector store has newer documents than the
+        stored summary was built from, or the summary is older than the refresh interval.
+        Runs until cancelled.
+        """
+        while True:
+            try:
+                if await self._is_outdated():
+                    await self.refresh()
+            except NotEnoughSourcesException as e:
+                logger.warning(f"Weekly summary not refreshed: {e}")
+            except Exception as e:
+                logger.exception(f"Weekly summary refresh failed: {e}")
+            await asyncio.sleep(self.check_interval_seconds)
+
+    async def _is_outdated(self) -> bool:
+        cached = await self._load()
+        if cached is None or self._age_seconds(cached) > self.refresh_interval_seconds:
+            return True
+        return (
+            await self.summary_service.vector_store.alatest_timestamp()
+            != cached.data_version
+        )
+
+    async def _refresh_logged(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.exception(f"Weekly summary refresh failed: {e}")
+
+    async def _wait_for_refresh(self) -> CachedWeeklySummary:
+        deadline = asyncio.get_running_loop().time() + self.refresh_timeout_seconds
+        while asyncio.get_running_loop().time() < deadline:
+            cached = await self.refresh()
+            if cached is not None:
+                return cached
+            # Another worker is generating the summary
+            await asyncio.sleep(1)
+            cached = await self._load()
+            if cached is not None:
+                return cached
+        raise TimeoutError("Timed out waiting for the weekly summary")
+
+    async def _load(self) -> Optional[CachedWeeklySummary]:
+        cached_json = await self.redis_client.get(self.key)
+        if cached_json is None:
+            return None
+        return CachedWeeklySummary.model_validate_json(cached_json)
+
+    @staticmethod
+    def _age_seconds(cached: CachedWeeklySummary) -> float:
+        return (datetime.now(timezone.utc) - cached.generated_at).total_seconds()
+
+
+_weekly_summary_cache: Optional[WeeklySummaryCache] = None
+
+
+async def get_weekly_summary_cache(config: BackendConfig) -> WeeklySummaryCache:
+    """
+    Returns the process-wide WeeklySummaryCache, created once in the FastAPI lifespan.
+    """
+    global _weekly_summary_cache
+    if _weekly_summary_cache is None:
+        _weekly_summary_cache = await WeeklySummaryCache.from_config(config)
+    return _weekly_summary_cache
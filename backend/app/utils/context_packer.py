@@ -0,0 +1,144 @@
+import hashlib
+import math
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+from pydantic import BaseModel
+
+from backend.app.config.config import BackendConfig
+from common.utils.tokens import count_tokens
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+TERM_PATTERN = re.compile(r"\w{3,}")
+
+
+class Passage(BaseModel):
+    doc_index: int
+    position: int
+    text: str
+    terms: frozenset[str]
+    num_tokens: int
+    score: float = 0.0
+
+
+class PackedContext(BaseModel):
+    text: str
+    num_tokens: int
+    num_docs: int
+    num_duplicates: int
+
+
+class ContextPacker(BaseModel):
+    """
+    Packs retrieved documents into a token budget for the summarize prompt.
+    Documents get budget shares decaying by rank, and each is trimmed to its sentences
+    that best match the question (IDF-weighted term overlap), kept in their original order.
+    Sentences that near-duplicate one already packed, typically the same article
+    syndicated on several sites, are dropped.
+    """
+
+    llm: str
+    max_tokens: int
+    rank_decay: float
+    duplicate_threshold: float
+
+    @classmethod
+    def from_config(cls, config: BackendConfig, llm: str) -> "ContextPacker":
+        return cls(
+            llm=llm,
+            max_tokens=config.summarize_context_max_tokens,
+            rank_decay=config.summarize_context_rank_decay,
+            duplicate_threshold=config.summarize_context_duplicate_threshold,
+        )
+
+    def pack(self, question: str, docs: list[Document]) -> PackedContext:
+        passages = self._split_passages(docs)
+        self._score_passages(question, passages)
+
+        by_doc: dict[int, list[Passage]] = {}
+        for passage in passages:
+            by_doc.setdefault(passage.doc_index, []).append(passage)
+
+        packed_terms: list[frozenset[str]] = []
+        packed_hashes: set[str] = set()
+        sections, remaining, num_duplicates = [], self.max_tokens, 0
+        weights = [self.rank_decay**rank for rank in range(len(docs))]
+        for rank, doc in enumerate(docs):
+            header = f"{doc.metadata.get('url', '')}:\n"
+            # Unused budget of earlier documents carries over to the later ones
+            share = remaining * weights[rank] / sum(weights[rank:])
+            budget = share - count_tokens(header, self.llm)
+            selected = []
+            for passage in sorted(
+                by_doc.get(rank, []), key=lambda p: (-p.score, p.position)
+            ):
+                if passage.num_tokens > budget:
+                    continue
+                text_hash = hashlib.sha256(passage.text.lower().encode()).hexdigest()
+                if text_hash in packed_hashes or self._is_duplicate(
+                    passage.terms, packed_terms
+                ):
+                    num_duplicates += 1
+                    continue
+                selected.append(passage)
+                packed_hashes.add(text_hash)
+                packed_terms.append(passage.terms)
+                budget -= passage.num_tokens
+            if not selected:
+                continue
+            body = " ".join(p.text for p in sorted(selected, key=lambda p: p.position))
+            sections.append(header + body)
+            remaining -= share - budget
+
+        text = "\n".join(sections)
+        return PackedContext(
+            text=text,
+            num_tokens=count_tokens(text, self.llm),
+            num_docs=len(sections),
+            num_duplicates=num_duplicates,
+        )
+
+    def _split_passages(self, docs: list[Document]) -> list[Passage]:
+        passages = []
+        for doc_index, doc in enumerate(docs):
+            for position, sentence in enumerate(
+                SENTENCE_SPLIT_PATTERN.split(doc.page_content)
+            ):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                passages.append(
+                    Passage(
+                        doc_index=doc_index,
+                        position=position,
+                        text=sentence,
+                        terms=frozenset(TERM_PATTERN.findall(sentence.lower())),
+                        # +1 for the joining space
+                        num_tokens=count_tokens(sentence, self.llm) + 1,
+                    )
+                )
+        return passages
+
+    @staticmethod
+    def _score_passages(question: str, passages: list[Passage]) -> None:
+        question_terms = set(TERM_PATTERN.findall(question.lower()))
+        document_frequencies = Counter(
+            term for passage in passages for term in passage.terms & question_terms
+        )
+        for passage in passages:
+            overlap = sum(
+                math.log(1 + len(passages) / document_frequencies[term])
+                for term in passage.terms & question_terms
+            )
+            passage.score = overlap / (1 + math.log(1 + len(passage.terms)))
+
+    def _is_duplicate(
+        self, terms: frozenset[str], packed_terms: list[frozenset[str]]
+    ) -> bool:
+        if not terms:
+            return False
+        return any(
+            len(terms & other) / len(terms | other) >= self.duplicate_threshold
+            for other in packed_terms
+        )
@@ -7,9 +7,14 @@ from langchain_core.language_models import BaseLanguageModel
 
 from backend.app.config.config import backend_config
 from langchain_core.callbacks import AsyncCallbackHandler
-from backend.app.utils.streaming import AsyncStreamingCallbackHandler
+from backend.app.utils.context_packer import ContextPacker
+from backend.app.utils.streaming import (
+    AsyncStreamingCallbackHandler,
+    TimeToFirstTokenCallbackHandler,
+)
 from common.schemas.vector_metadata import VectorMetadata
-
+from common.schemas.image_metadata import ImageMetadata
+from common.utils.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -20,28 +25,50 @@ async def summarize_docs(
     metadatas: list[VectorMetadata],
     llm: BaseLanguageModel,
     stream_handler: Optional[AsyncStreamingCallbackHandler] = None,
+    llm_name: Optional[str] = None,
 ) -> AIMessage:
+    """
+    Summarizes the documents for the question, packed into the context token budget.
+    The prompt token count and time to first token are logged and returned in the
+    response metadata. llm_name selects the tokenizer, defaulting to the summarize LLM.
+    """
     prompt = PromptTemplate(
         input_variables=["question", "docs", "sources", "image_links"],
         template=backend_config.summarize_docs_prompt,
     )
-    logger.info(f"doc.metadata = {docs[0].metadata}")
+    logger.debug(f"doc.metadata = {docs[0].metadata}")
+    llm_name = llm_name or backend_config.summarize_llm
+    context = ContextPacker.from_config(backend_config, llm_name).pack(
+        user_question, docs
+    )
     summarize_prompt = prompt.format(
         question=user_question,
-        docs="\n".join([f"{doc.metadata["url"]}:\n{doc.page_content}" for doc in docs]),
+        docs=context.text,
         sources="\n".join(get_source_urls(metadatas)),
         image_links="\n".join(
             get_image_urls(metadatas)[: backend_config.max_images_to_display]
         ),  # TODO: Filter down to a smaller number of images
     )
-    logger.info(f"Summarize prompt: {summarize_prompt}")
+    prompt_tokens = count_tokens(summarize_prompt, llm_name)
+    logger.debug(f"Summarize prompt: {summarize_prompt}")
 
-    return AIMessage.model_validate(
-        await llm.ainvoke(
-            summarize_prompt,
-            config={"callbacks": stream_handler} if stream_handler else None,
-        )
+    timing_handler = TimeToFirstTokenCallbackHandler()
+    callbacks = [timing_handler] + ([stream_handler] if stream_handler else [])
+    response = AIMessage.model_validate(
+        await llm.ainvoke(summarize_prompt, config={"callbacks": callbacks})
+    )
+    ttft = timing_handler.time_to_first_token
+    logger.info(
+        f"Summarized {context.num_docs}/{len(docs)} docs "
+        f"({context.num_tokens} context tokens, {context.num_duplicates} duplicate passages dropped): "
+        f"prompt_tokens={prompt_tokens}, "
+        f"ttft={f'{ttft:.2f}s' if ttft is not None else 'n/a'}, "
+        f"total={timing_handler.total_time or 0:.2f}s"
+    )
+    response.response_metadata.update(
+        {"prompt_tokens": prompt_tokens, "time_to_first_token": ttft}
     )
+    return response
 
 
 def get_metadatas(docs: list[Document]) -> list[VectorMetadata]:
@@ -52,14 +79,23 @@ def get_source_urls(metadatas: list[VectorMetadata]) -> list[str]:
     return [metadata.url for metadata in metadatas if metadata.url]
 
 
-def get_image_urls(source_metadatas: list[VectorMetadata]) -> list[str]:
+def get_image_urls(
+    source_metadatas: list[VectorMetadata], max_size: Optional[int] = None
+) -> list[str]:
+    """
+    Returns the URL of the smallest stored variant of each image that is still at least
+    max_size pixels on its longest side, defaulting to the configured display size.
+    """
     # TODO: Return only the most relevant image URLs
+    max_size = max_size or backend_config.image_display_size
     try:
         image_urls = []
         for source_metadata in source_metadatas:
             if source_metadata.image_metadata:
                 for image_metadata in source_metadata.image_metadata:
-                    image_urls.append(image_metadata["url"])
+                    image_urls.append(
+                        ImageMetadata.model_validate(image_metadata).get_url(max_size)
+                    )
         return image_urls
     except Exception:
         logger.exception("Error getting image URLs")
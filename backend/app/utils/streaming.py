@@ -1,6 +1,7 @@
 from datetime import datetime
 import logging
 import asyncio
+import time
 from enum import Enum
 from typing import Any, Callable, Optional
 
@@ -41,6 +42,47 @@ class StreamingData(BaseModel):
     metadata: dict[str, Any] = Field(default_factory=dict)
 
 
+class TimeToFirstTokenCallbackHandler(AsyncCallbackHandler):
+    """
+    Times an LLM call from its start to the first streamed token and to its end.
+    Models that don't stream tokens only report the total latency.
+    """
+
+    def __init__(self):
+        self.start_time: Optional[float] = None
+        self.first_token_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+    async def on_llm_start(
+        self, serialized: dict[str, Any], prompts: list[str], **kwargs: Any
+    ) -> None:
+        self.start_time = time.perf_counter()
+
+    async def on_chat_model_start(
+        self, serialized: dict[str, Any], messages: list[list[Any]], **kwargs: Any
+    ) -> None:
+        self.start_time = time.perf_counter()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.end_time = time.perf_counter()
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.start_time is None or self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    @property
+    def total_time(self) -> Optional[float]:
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+
 class AsyncStreamingCallbackHandler(AsyncCallbackHandler):
     def __init__(self, streaming_function: Callable[[str], None]):
         self.streaming_function = streaming_function
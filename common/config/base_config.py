@@ -11,11 +11,38 @@ class BaseConfig(BaseSettings):
     llm_temperature: float
     tool_call_llm: str
     fast_llm: str
+    llm_batch_window_ms: float
+    llm_batch_max_size: int
+    llm_batch_max_tokens: int
+    llm_max_concurrency: dict[str, int]
+    llm_fallbacks: dict[str, list[str]]
+    llm_timeout_seconds: float
+    llm_hedge_percentile: float
+    llm_hedge_min_samples: int
+    llm_latency_window: int
+    llm_circuit_failure_threshold: int
+    llm_circuit_reset_seconds: float
     embedding_model: str
+    embedding_cache_size: int
+    embedding_cache_redis: bool
+    embedding_cache_ttl_seconds: int
     vector_store_collection_name: str
     vector_search_type: str
     vector_search_k: int
     vector_search_fetch_k: int
+    vector_search_embedding_cache_size: int
+    postgres_pool_size: int
+    postgres_max_overflow: int
+    postgres_statement_timeout_ms: int
+    embedding_dimension: int
+    vector_index_type: str
+    vector_index_quantization: str
+    vector_index_rescore_k: int
+    vector_index_hnsw_m: int
+    vector_index_hnsw_ef_construction: int
+    vector_index_hnsw_ef_search: int
+    vector_index_ivfflat_lists: int
+    vector_index_ivfflat_probes: int
     search_plan_retry_limit: int
     num_search_iterations: int
     logging_dir: str
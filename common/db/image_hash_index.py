@@ -0,0 +1,152 @@
+import logging
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, Table, Text, func, select
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from common.db.postgres import get_async_engine_from_config
+from crawler.config.config import CrawlerConfig
+from crawler.utils.image_filters import hamming_distance
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+
+class ImageHashEntry(BaseModel):
+    image_hash: int
+    object_name: str
+    variant_object_names: dict[int, str] = Field(default_factory=dict)
+    summary: str
+
+
+class HammingIndex:
+    """
+    In-memory index of 64-bit perceptual hashes supporting near-duplicate lookups.
+    Hashes are split into max_distance + 1 bands; by the pigeonhole principle any hash
+    within max_distance bits of a stored hash matches it exactly on at least one band,
+    so only hashes sharing a band are compared bit by bit.
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        num_bands = max_distance + 1
+        band_bits = HASH_BITS // num_bands
+        self._band_shifts = [band * band_bits for band in range(num_bands)]
+        self._band_masks = [(1 << band_bits) - 1] * (num_bands - 1) + [
+            (1 << (HASH_BITS - band_bits * (num_bands - 1))) - 1
+        ]
+        self._bands: list[dict[int, set[int]]] = [{} for _ in range(num_bands)]
+
+    def _band_keys(self, image_hash: int) -> list[int]:
+        return [
+            (image_hash >> shift) & mask
+            for shift, mask in zip(self._band_shifts, self._band_masks)
+        ]
+
+    def add(self, image_hash: int) -> None:
+        for band, key in zip(self._bands, self._band_keys(image_hash)):
+            band.setdefault(key, set()).add(image_hash)
+
+    def find(self, image_hash: int) -> Optional[int]:
+        """Returns the closest stored hash within max_distance bits, if there is one."""
+        best_hash, best_distance = None, self.max_distance + 1
+        for band, key in zip(self._bands, self._band_keys(image_hash)):
+            for candidate in band.get(key, ()):
+                distance = hamming_distance(candidate, image_hash)
+                if distance < best_distance:
+                    best_hash, best_distance = candidate, distance
+        return best_hash
+
+
+class ImageHashIndex(BaseModel):
+    """
+    Perceptual hash index of every image stored in Minio, persisted in Postgres across crawls.
+    Lets the crawler resolve near-duplicate images to the object and summary it already has.
+    """
+
+    engine: AsyncEngine
+    table: Table
+    max_distance: int
+    _entries: dict[int, ImageHashEntry] = PrivateAttr(default_factory=dict)
+    _hamming_index: HammingIndex = PrivateAttr()
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def model_post_init(self, __context) -> None:
+        self._hamming_index = HammingIndex(self.max_distance)
+
+    @classmethod
+    async def from_config(cls, config: CrawlerConfig) -> "ImageHashIndex":
+        table = Table(
+            config.image_hash_table_name,
+            MetaData(),
+            Column("image_hash", BigInteger, primary_key=True),
+            Column("object_name", Text, nullable=False),
+            Column("variant_object_names", JSONB, nullable=False, server_default="{}"),
+            Column("summary", Text, nullable=False),
+            Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        )
+        index = cls(
+            engine=get_async_engine_from_config(config),
+            table=table,
+            max_distance=config.image_hash_max_distance,
+        )
+        await index.load()
+        return index
+
+    async def load(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(self.table.metadata.create_all)
+            rows = await conn.execute(
+                select(
+                    self.table.c.image_hash,
+                    self.table.c.object_name,
+                    self.table.c.variant_object_names,
+                    self.table.c.summary,
+                )
+            )
+            for row in rows:
+                self._add_local(
+                    ImageHashEntry(
+                        image_hash=self._from_signed(row.image_hash),
+                        object_name=row.object_name,
+                        variant_object_names=row.variant_object_names,
+                        summary=row.summary,
+                    )
+                )
+        logger.info(f"Loaded {len(self._entries)} image hashes")
+
+    def find(self, image_hash: int) -> Optional[ImageHashEntry]:
+        match = self._hamming_index.find(image_hash)
+        return self._entries[match] if match is not None else None
+
+    async def add(self, entry: ImageHashEntry) -> None:
+        self._add_local(entry)
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(self.table)
+                .values(
+                    image_hash=self._to_signed(entry.image_hash),
+                    object_name=entry.object_name,
+                    variant_object_names=entry.model_dump(mode="json")[
+                        "variant_object_names"
+                    ],
+                    summary=entry.summary,
+                )
+                .on_conflict_do_nothing()
+            )
+
+    def _add_local(self, entry: ImageHashEntry) -> None:
+        self._entries[entry.image_hash] = entry
+        self._hamming_index.add(entry.image_hash)
+
+    # Postgres has no unsigned 64-bit integer, so hashes are stored as signed BIGINTs
+    @staticmethod
+    def _to_signed(image_hash: int) -> int:
+        return image_hash - (1 << HASH_BITS) if image_hash >= 1 << 63 else image_hash
+
+    @staticmethod
+    def _from_signed(image_hash: int) -> int:
+        return image_hash + (1 << HASH_BITS) if image_hash < 0 else image_hash
@@ -1,3 +1,6 @@
+from functools import lru_cache
+
+import urllib3
 from minio import Minio
 from pydantic import BaseModel
 
@@ -10,11 +13,23 @@ class MinioResponse(BaseModel):
     url: str
 
 
-def get_minio_client():
+@lru_cache(maxsize=None)
+def get_minio_client() -> Minio:
+    """
+    Returns the process-wide Minio client.
+    The client is thread-safe, and sharing it reuses its connection pool and cached bucket regions.
+    """
     minio_url = f"{config.minio_host}:{config.minio_port}"
     return Minio(
         endpoint=minio_url,
         access_key=config.minio_backend_user,
         secret_key=config.minio_backend_password,
         secure=False,
+        http_client=urllib3.PoolManager(
+            # Sized so every upload worker thread can hold a connection at once
+            maxsize=config.minio_upload_workers,
+            retries=urllib3.Retry(
+                total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+            ),
+        ),
     )
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from common.config.base_config import BaseConfig
+
+
+def get_postgres_connection_string(
+    config: BaseConfig, driver: str = "postgresql"
+) -> str:
+    """
+    Builds a SQLAlchemy connection string for the Postgres database in the config.
+    Pass driver="postgresql+psycopg" for a connection string usable by async engines.
+    """
+    return f"{driver}://{config.postgres_user}:{config.postgres_password}@{config.postgres_host}:{config.postgres_port}/{config.postgres_db}"
+
+
+def get_async_engine_from_config(config: BaseConfig) -> AsyncEngine:
+    """
+    Returns the async engine for the Postgres database in the config.
+    Engines are cached per database so every caller in the process shares one connection pool.
+    """
+    return _get_async_engine(
+        get_postgres_connection_string(config, driver="postgresql+psycopg"),
+        config.postgres_pool_size,
+        config.postgres_max_overflow,
+        _get_connection_options(config),
+    )
+
+
+async def dispose_async_engine_from_config(config: BaseConfig) -> None:
+    """Closes the pooled connections of the async engine for the config, e.g. on shutdown."""
+    await get_async_engine_from_config(config).dispose()
+
+
+def _get_connection_options(config: BaseConfig) -> str:
+    # Session settings applied to every pooled connection, including the
+    # pgvector search-time knobs for HNSW and IVFFlat indexes
+    return " ".join(
+        [
+            f"-c statement_timeout={config.postgres_statement_timeout_ms}",
+            f"-c hnsw.ef_search={config.vector_index_hnsw_ef_search}",
+            f"-c ivfflat.probes={config.vector_index_ivfflat_probes}",
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_async_engine(
+    connection_string: str,
+    pool_size: int,
+    max_overflow: int,
+    options: str,
+) -> AsyncEngine:
+    return create_async_engine(
+        connection_string,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        connect_args={"options": options},
+    )
@@ -0,0 +1,76 @@
+import logging
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from sqlalchemy import Column, DateTime, MetaData, Table, Text, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from common.db.postgres import get_async_engine_from_config
+from crawler.config.config import CrawlerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMarkers(BaseModel):
+    """
+    Per-query completion markers for crawl runs, persisted in Postgres.
+    The LangGraph checkpointer only saves state between nodes, so a crash midway through search_tool
+    would otherwise repeat every Tavily search and LLM summary of that node on resume.
+    """
+
+    engine: AsyncEngine
+    table: Table
+    # Queries whose documents are waiting in the write buffer, keyed by query with their run id
+    _pending: dict[str, str] = PrivateAttr(default_factory=dict)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    async def from_config(cls, config: CrawlerConfig) -> "QueryMarkers":
+        table = Table(
+            config.query_markers_table_name,
+            MetaData(),
+            Column("run_id", Text, primary_key=True),
+            Column("query", Text, primary_key=True),
+            Column("completed_at", DateTime(timezone=True), server_default=func.now()),
+        )
+        markers = cls(engine=get_async_engine_from_config(config), table=table)
+        async with markers.engine.begin() as conn:
+            await conn.run_sync(table.metadata.create_all)
+        return markers
+
+    async def is_completed(self, run_id: str, query: str) -> bool:
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(self.table.c.query).where(
+                        self.table.c.run_id == run_id, self.table.c.query == query
+                    )
+                )
+            ).first()
+        return row is not None
+
+    def mark_pending(self, run_id: str, query: str) -> None:
+        """Tracks a query whose document is waiting in the write buffer."""
+        self._pending[query] = run_id
+
+    async def mark_completed(self, run_id: str, queries: list[str]) -> None:
+        if not queries:
+            return
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(self.table)
+                .values([{"run_id": run_id, "query": query} for query in queries])
+                .on_conflict_do_nothing()
+            )
+
+    async def record(self, queries: list[str]) -> None:
+        """Completes the pending queries whose documents have been written."""
+        completed: dict[str, list[str]] = {}
+        for query in queries:
+            if (run_id := self._pending.pop(query, None)) is not None:
+                completed.setdefault(run_id, []).append(query)
+        for run_id, run_queries in completed.items():
+            await self.mark_completed(run_id, run_queries)
+            logger.debug(
+                f"Marked {len(run_queries)} queries completed for run {run_id}"
+            )
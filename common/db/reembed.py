@@ -0,0 +1,342 @@
+"""
+Re-embeds the pgvector collection with a new embedding model, without re-crawling.
+
+Documents are streamed from the collection with a server-side cursor and re-embedded in batches
+into a shadow collection, checkpointing after every batch. Once every document is copied, the shadow
+collection atomically takes over vector_store_collection_name and the old one is kept as a backup.
+Running the same command again resumes an interrupted migration.
+Stop the crawler first: documents it writes meanwhile may not be copied.
+
+A model with the same embedding dimension is migrated while the backend keeps serving from the old
+collection. A model with another dimension can't share the vector(n) column and its ANN index, which
+have to be dropped before the copy, leaving searches without an index until it is rebuilt. The command
+refuses to do so unless --services-stopped confirms that the backend and the crawler are stopped,
+and should then be followed by rebuilding the index before they are restarted.
+
+Usage:
+    python -m common.db.reembed run --model text-embedding-3-small [--batch-size 64] [--services-stopped]
+    python -m common.db.reembed drop-backup --model nomic-embed-text
+
+Then set embedding_model (and embedding_dimension) in the configs and restart the services.
+If the dimension changed, drop the backup, then run python -m common.db.vector_index set-dimension
+and create before restarting them.
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+import time
+
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.app.config.config import BackendConfig, backend_config
+from common.db.postgres import get_async_engine_from_config
+from common.db.vector_index import VECTOR_INDEX_NAME
+from common.db.vector_store import IndexedMetadataPGVector
+from common.utils.llm import get_embedding_model_from_config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingMigration(BaseModel):
+    """
+    Copies every document of the collection into a shadow collection embedded with target_model.
+    langchain_pg_embedding ids are unique across collections, so shadow documents are stored under
+    "<shadow collection>:<id>" and get their original ids back in the swap.
+    """
+
+    engine: AsyncEngine
+    config: BackendConfig
+    table: Table
+    target_model: str
+    batch_size: int
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    async def from_config(
+        cls, config: BackendConfig, target_model: str, batch_size: int
+    ) -> "EmbeddingMigration":
+        table = Table(
+            config.embedding_migrations_table_name,
+            MetaData(),
+            Column("shadow_collection", Text, primary_key=True),
+            Column("source_collection", Text, nullable=False),
+            Column("last_id", Text),
+            Column("num_documents", Integer, nullable=False, server_default="0"),
+            Column("started_at", DateTime(timezone=True), server_default=func.now()),
+            Column("swapped_at", DateTime(timezone=True)),
+        )
+        migration = cls(
+            engine=get_async_engine_from_config(config),
+            config=config,
+            table=table,
+            target_model=target_model,
+            batch_size=batch_size,
+        )
+        async with migration.engine.begin() as conn:
+            await conn.run_sync(table.metadata.create_all)
+        return migration
+
+    @property
+    def collection_name(self) -> str:
+        return self.config.vector_store_collection_name
+
+    @property
+    def shadow_collection_name(self) -> str:
+        return get_model_collection_name(self.collection_name, self.target_model)
+
+    @property
+    def backup_collection_name(self) -> str:
+        return get_model_collection_name(
+            self.collection_name, self.config.embedding_model
+        )
+
+    async def run(self, services_stopped: bool = False) -> None:
+        """
+        Re-embeds the collection, resuming from the last checkpoint, then swaps it in.
+
+        Args:
+            services_stopped (bool): Confirms the backend and the crawler are stopped,
+                which a change of embedding dimension requires.
+
+        Raises:
+            ValueError: If the dimension changes and services_stopped isn't set.
+        """
+        shadow_store = IndexedMetadataPGVector(
+            embeddings=get_embedding_model_from_config(
+                self.config.model_copy(update={"embedding_model": self.target_model})
+            ),
+            collection_name=self.shadow_collection_name,
+            connection=self.engine,
+        )
+        await shadow_store.acreate_collection()
+        EmbeddingStore = shadow_store.EmbeddingStore
+        CollectionStore = shadow_store.CollectionStore
+
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                insert(self.table)
+                .values(
+                    shadow_collection=self.shadow_collection_name,
+                    source_collection=self.collection_name,
+                )
+                .on_conflict_do_nothing()
+            )
+            checkpoint = (
+                await conn.execute(
+                    select(self.table).where(
+                        self.table.c.shadow_collection == self.shadow_collection_name
+                    )
+                )
+            ).one()
+            source_id = await conn.scalar(
+                select(CollectionStore.uuid).where(
+                    CollectionStore.name == self.collection_name
+                )
+            )
+            if source_id is None:
+                raise ValueError(f"Collection {self.collection_name} does not exist")
+            num_source_documents = await conn.scalar(
+                select(func.count()).where(EmbeddingStore.collection_id == source_id)
+            )
+            dimensions = await conn.scalar(
+                text(
+                    "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                    "WHERE attrelid = 'langchain_pg_embedding'::regclass AND attname = 'embedding'"
+                )
+            )
+        if checkpoint.swapped_at is not None:
+            logger.info(f"{self.shadow_collection_name} was already swapped in")
+            return
+        await self._allow_any_dimension(shadow_store, dimensions, services_stopped)
+
+        last_id, num_documents = checkpoint.last_id, checkpoint.num_documents
+        logger.info(
+            f"Re-embedding {num_source_documents} documents of {self.collection_name} "
+            f"into {self.shadow_collection_name}, {num_documents} already done"
+        )
+        start, num_embedded = time.perf_counter(), 0
+        stmt = (
+            select(EmbeddingStore.id, EmbeddingStore.document, EmbeddingStore.cmetadata)
+            .where(EmbeddingStore.collection_id == source_id)
+            .order_by(EmbeddingStore.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        if last_id is not None:
+            stmt = stmt.where(EmbeddingStore.id > last_id)
+        # Rows are fetched batch by batch from a server-side cursor, so memory doesn't grow with the corpus
+        async with self.engine.connect() as read_conn:
+            await read_conn.execute(text("SET LOCAL statement_timeout = 0"))
+            result = await read_conn.stream(stmt)
+            async for rows in result.partitions():
+                texts = [row.document or "" for row in rows]
+                await shadow_store.aadd_embeddings(
+                    texts=texts,
+                    embeddings=await shadow_store.embeddings.aembed_documents(texts),
+                    metadatas=[row.cmetadata or {} for row in rows],
+                    ids=[f"{self.shadow_collection_name}:{row.id}" for row in rows],
+                )
+                last_id, num_documents = rows[-1].id, num_documents + len(rows)
+                num_embedded += len(rows)
+                await self._checkpoint(last_id, num_documents)
+                logger.info(
+                    f"Re-embedded {num_documents}/{num_source_documents} documents "
+                    f"({num_embedded / (time.perf_counter() - start):.1f} docs/s)"
+                )
+        await self._swap(source_id)
+
+    async def drop_backup(self, model: str) -> None:
+        backup_name = get_model_collection_name(self.collection_name, model)
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text("DELETE FROM langchain_pg_collection WHERE name = :name"),
+                {"name": backup_name},
+            )
+        logger.info(f"Dropped {backup_name}")
+
+    async def _allow_any_dimension(
+        self,
+        shadow_store: IndexedMetadataPGVector,
+        dimensions: str,
+        services_stopped: bool,
+    ) -> None:
+        target_dimension = len(await shadow_store.embeddings.aembed_query("dimension"))
+        if dimensions in ("vector", f"vector({target_dimension})"):
+            return
+        if not services_stopped:
+            # Dropping the index under the running backend would turn every search into a full scan
+            raise ValueError(
+                f"{self.target_model} embeddings have {target_dimension} dimensions instead of {dimensions}, "
+                "which requires dropping the live ANN index. Stop the backend and the crawler, "
+                "then run again with --services-stopped"
+            )
+        # A vector(n) column and its ANN index can't hold embeddings of another size
+        logger.warning(
+            f"{self.target_model} embeddings have {target_dimension} dimensions, "
+            f"dropping the ANN index and the {dimensions} constraint of the embedding column"
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))
+            await conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+            await conn.execute(
+                text(
+                    "ALTER TABLE langchain_pg_embedding ALTER COLUMN embedding TYPE vector"
+                )
+            )
+
+    async def _checkpoint(self, last_id: str, num_documents: int) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(self.table)
+                .where(self.table.c.shadow_collection == self.shadow_collection_name)
+                .values(last_id=last_id, num_documents=num_documents)
+            )
+
+    async def _swap(self, source_id) -> None:
+        """
+        In one transaction, renames the source collection to the backup name and the shadow
+        collection to vector_store_collection_name, moving the original ids to the shadow documents.
+        """
+        id_prefix = f"{self.shadow_collection_name}:"
+        backup_prefix = f"{self.backup_collection_name}:"
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))
+            shadow_id = await conn.scalar(
+                text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+                {"name": self.shadow_collection_name},
+            )
+            await conn.execute(
+                text(
+                    "UPDATE langchain_pg_embedding SET id = :prefix || id "
+                    "WHERE collection_id = :collection_id"
+                ),
+                {"prefix": backup_prefix, "collection_id": source_id},
+            )
+            await conn.execute(
+                text(
+                    "UPDATE langchain_pg_embedding SET id = substr(id, :start) "
+                    "WHERE collection_id = :collection_id"
+                ),
+                {"start": len(id_prefix) + 1, "collection_id": shadow_id},
+            )
+            await conn.execute(
+                text(
+                    "UPDATE langchain_pg_collection SET name = :name WHERE uuid = :uuid"
+                ),
+                {"name": self.backup_collection_name, "uuid": source_id},
+            )
+            await conn.execute(
+                text(
+                    "UPDATE langchain_pg_collection SET name = :name WHERE uuid = :uuid"
+                ),
+                {"name": self.collection_name, "uuid": shadow_id},
+            )
+            await conn.execute(
+                update(self.table)
+                .where(self.table.c.shadow_collection == self.shadow_collection_name)
+                .values(swapped_at=func.now())
+            )
+        logger.info(
+            f"{self.collection_name} is now embedded with {self.target_model}, "
+            f"the previous collection was kept as {self.backup_collection_name}"
+        )
+
+
+def get_model_collection_name(collection_name: str, model: str) -> str:
+    return f"{collection_name}__{re.sub(r'[^a-z0-9]+', '_', model.lower())}"
+
+
+async def _run(args: argparse.Namespace) -> None:
+    migration = await EmbeddingMigration.from_config(
+        backend_config, args.model, args.batch_size
+    )
+    try:
+        if args.command == "run":
+            await migration.run(services_stopped=args.services_stopped)
+        else:
+            await migration.drop_backup(args.model)
+    finally:
+        await migration.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser(
+        "run", help="Re-embed the collection, resuming if interrupted, then swap it in"
+    )
+    run_parser.add_argument("--model", required=True, help="The new embedding model")
+    run_parser.add_argument("--batch-size", type=int, default=64)
+    run_parser.add_argument(
+        "--services-stopped",
+        action="store_true",
+        help="Confirm the backend and the crawler are stopped, required to change the embedding dimension",
+    )
+    drop_parser = subparsers.add_parser(
+        "drop-backup", help="Delete the backup collection of a previous model"
+    )
+    drop_parser.add_argument(
+        "--model", required=True, help="The previous embedding model"
+    )
+    drop_parser.set_defaults(batch_size=64)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,155 @@
+"""
+Creates the full-text search column and index and the metadata filter indexes on the pgvector collection.
+
+Usage:
+    python -m common.db.search_indexes create
+    python -m common.db.search_indexes status
+
+Run create once per database before starting the backend, whose lexical search needs the column and index,
+and again when INDEXED_METADATA_FIELDS changes.
+Services don't create them at startup: adding the generated column rewrites langchain_pg_embedding
+under an exclusive lock and the index builds outlast the statement timeout of the services.
+Indexes are built with CREATE INDEX CONCURRENTLY so the crawler and the backend can keep
+writing and searching meanwhile. An index left invalid by an interrupted build is rebuilt.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from backend.app.config.config import backend_config
+from common.config.base_config import BaseConfig
+from common.db.postgres import get_async_engine_from_config
+from common.db.vector_store import INDEXED_METADATA_FIELDS, LEXICAL_SEARCH_INDEX_NAME
+
+logger = logging.getLogger(__name__)
+
+# Full-text search runs on a generated tsvector column of langchain_pg_embedding,
+# kept up to date by Postgres on every insert
+LEXICAL_SEARCH_COLUMN_STATEMENT = """
+    ALTER TABLE langchain_pg_embedding
+    ADD COLUMN IF NOT EXISTS document_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(document, ''))) STORED
+    """
+
+# Index name to the indexed method and expression. The metadata indexes are scoped to the collection
+# and match the cmetadata ->> 'field' comparisons of IndexedMetadataPGVector.
+SEARCH_INDEXES = {
+    LEXICAL_SEARCH_INDEX_NAME: "gin (document_tsv)",
+    **{
+        f"ix_langchain_pg_embedding_cmetadata_{field}": f"btree (collection_id, (cmetadata ->> '{field}'))"
+        for field in INDEXED_METADATA_FIELDS
+    },
+}
+
+
+class SearchIndexStatus(BaseModel):
+    name: str
+    valid: bool
+    size_bytes: int
+
+
+class SearchIndexManager(BaseModel):
+    """
+    Creates the generated tsvector column and the search indexes over langchain_pg_embedding,
+    skipping those that already exist.
+    """
+
+    engine: AsyncEngine
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(cls, config: BaseConfig) -> "SearchIndexManager":
+        return cls(engine=get_async_engine_from_config(config))
+
+    async def create(self) -> float:
+        """
+        Adds the column and builds the missing indexes.
+
+        Returns:
+            float: The build time in seconds.
+        """
+        start = time.perf_counter()
+        # CREATE INDEX CONCURRENTLY can't run in a transaction
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("SET statement_timeout = 0"))
+            try:
+                await conn.execute(text(LEXICAL_SEARCH_COLUMN_STATEMENT))
+                statuses = {status.name: status for status in await self._status(conn)}
+                for name, definition in SEARCH_INDEXES.items():
+                    if name in statuses and statuses[name].valid:
+                        continue
+                    if name in statuses:
+                        logger.warning(
+                            f"Rebuilding {name}, left invalid by a failed build"
+                        )
+                        await conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+                    index_start = time.perf_counter()
+                    await conn.execute(text(f"""
+                            CREATE INDEX CONCURRENTLY {name}
+                            ON langchain_pg_embedding USING {definition}
+                            """))
+                    logger.info(
+                        f"Built {name} in {time.perf_counter() - index_start:.1f}s"
+                    )
+            finally:
+                # The connection goes back to the shared pool
+                await conn.execute(text("RESET statement_timeout"))
+        return time.perf_counter() - start
+
+    async def status(self) -> list[SearchIndexStatus]:
+        async with self.engine.connect() as conn:
+            return await self._status(conn)
+
+    @staticmethod
+    async def _status(conn: AsyncConnection) -> list[SearchIndexStatus]:
+        rows = await conn.execute(
+            text("""
+                SELECT c.relname AS name,
+                       i.indisvalid AS valid,
+                       pg_relation_size(c.oid) AS size_bytes
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = ANY(:names)
+                ORDER BY c.relname
+                """),
+            {"names": list(SEARCH_INDEXES)},
+        )
+        return [SearchIndexStatus.model_validate(row._asdict()) for row in rows]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    manager = SearchIndexManager.from_config(backend_config)
+    if args.command == "create":
+        build_time = await manager.create()
+        print(f"Build time: {build_time:.1f}s")
+    statuses = {status.name: status for status in await manager.status()}
+    for name in SEARCH_INDEXES:
+        status = statuses.get(name)
+        if status is None:
+            print(f"{name}: missing")
+        else:
+            print(
+                f"{name}: {'valid' if status.valid else 'invalid'}, "
+                f"{status.size_bytes / 1024**2:.1f} MiB"
+            )
+    await manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("create", help="Create the missing search indexes")
+    subparsers.add_parser("status", help="Report the search indexes and their size")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from sqlalchemy import Column, DateTime, MetaData, Table, Text, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from common.db.postgres import get_async_engine_from_config
+from common.utils.url import canonicalize_url
+from crawler.config.config import CrawlerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class UrlIndexEntry(BaseModel):
+    canonical_url: str
+    document_id: str
+    content_hash: str
+
+
+class UrlIndex(BaseModel):
+    """
+    Index of every page saved to the vector store, persisted in Postgres next to the pgvector collection.
+    Maps each canonical URL to the id of its document and the hash of the content it was built from,
+    so re-crawls can skip unchanged pages and replace changed ones in place.
+    """
+
+    engine: AsyncEngine
+    table: Table
+    # Entries buffered for the vector store but not yet flushed to it
+    _pending: dict[str, UrlIndexEntry] = PrivateAttr(default_factory=dict)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    async def from_config(cls, config: CrawlerConfig) -> "UrlIndex":
+        table = Table(
+            config.url_index_table_name,
+            MetaData(),
+            Column("canonical_url", Text, primary_key=True),
+            Column("document_id", Text, nullable=False),
+            Column("content_hash", Text, nullable=False),
+            Column("last_crawled_at", DateTime(timezone=True), nullable=False),
+        )
+        index = cls(engine=get_async_engine_from_config(config), table=table)
+        async with index.engine.begin() as conn:
+            await conn.run_sync(table.metadata.create_all)
+        return index
+
+    async def lookup(self, url: str) -> Optional[UrlIndexEntry]:
+        canonical_url = canonicalize_url(url)
+        if canonical_url in self._pending:
+            return self._pending[canonical_url]
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(
+                        self.table.c.canonical_url,
+                        self.table.c.document_id,
+                        self.table.c.content_hash,
+                    ).where(self.table.c.canonical_url == canonical_url)
+                )
+            ).first()
+        return UrlIndexEntry.model_validate(row._asdict()) if row else None
+
+    async def touch(self, url: str) -> None:
+        """Records that an unchanged page was seen again."""
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(self.table)
+                .where(self.table.c.canonical_url == canonicalize_url(url))
+                .values(last_crawled_at=datetime.now(timezone.utc))
+            )
+
+    def mark_pending(self, url: str, document_id: str, content_hash: str) -> None:
+        """
+        Tracks a page whose document is waiting in the write buffer,
+        so the same page found again before the flush is skipped too.
+        """
+        canonical_url = canonicalize_url(url)
+        self._pending[canonical_url] = UrlIndexEntry(
+            canonical_url=canonical_url,
+            document_id=document_id,
+            content_hash=content_hash,
+        )
+
+    async def record(self, urls: list[str]) -> None:
+        """Persists the pending entries for pages whose documents have been written."""
+        entries = [
+            entry
+            for url in urls
+            if (entry := self._pending.pop(canonicalize_url(url), None))
+        ]
+        if not entries:
+            return
+        stmt = insert(self.table).values(
+            [
+                {**entry.model_dump(), "last_crawled_at": datetime.now(timezone.utc)}
+                for entry in entries
+            ]
+        )
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["canonical_url"],
+                    set_={
+                        "document_id": stmt.excluded.document_id,
+                        "content_hash": stmt.excluded.content_hash,
+                        "last_crawled_at": stmt.excluded.last_crawled_at,
+                    },
+                )
+            )
+        logger.debug(f"Recorded {len(entries)} URLs in the URL index")
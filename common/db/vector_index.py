@@ -0,0 +1,285 @@
+"""
+Manages the approximate nearest neighbour index of the pgvector collection.
+
+Usage:
+    python -m common.db.vector_index set-dimension
+    python -m common.db.vector_index create [--type hnsw|ivfflat] [--quantization none|halfvec|binary] [--rebuild]
+    python -m common.db.vector_index status
+
+Run set-dimension once on a new database, and after re-embedding with a model of another dimension,
+while the backend and the crawler are stopped: it alters the embedding column to vector(embedding_dimension)
+under an exclusive lock on langchain_pg_embedding, blocking searches and writes until every row is checked.
+Indexes are then built with CREATE INDEX CONCURRENTLY so the crawler and the backend can keep
+writing and searching meanwhile. --rebuild builds the new index under a temporary name and swaps it in
+for the old one in a short transaction.
+
+Requires pgvector >= 0.5 for HNSW indexes and >= 0.7 for quantized ones.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from backend.app.config.config import backend_config
+from common.config.base_config import BaseConfig
+from common.db.postgres import get_async_engine_from_config
+
+logger = logging.getLogger(__name__)
+
+VectorIndexType = Literal["hnsw", "ivfflat"]
+VectorQuantization = Literal["none", "halfvec", "binary"]
+
+VECTOR_INDEX_NAME = "ix_langchain_pg_embedding_embedding_ann"
+# Name of a rebuilt index until it replaces VECTOR_INDEX_NAME
+REBUILT_VECTOR_INDEX_NAME = f"{VECTOR_INDEX_NAME}_rebuilt"
+
+
+def get_indexed_expression(quantization: VectorQuantization, dimension: int) -> str:
+    """Returns the indexed expression and operator class of the ANN index."""
+    match quantization:
+        case "none":
+            return "embedding vector_cosine_ops"
+        case "halfvec":
+            return f"(embedding::halfvec({dimension})) halfvec_cosine_ops"
+        case "binary":
+            return f"(binary_quantize(embedding)::bit({dimension})) bit_hamming_ops"
+        case _:
+            raise ValueError(f"Invalid vector quantization: {quantization}")
+
+
+class VectorIndexStatus(BaseModel):
+    name: str
+    index_type: str
+    size_bytes: int
+    num_vectors: int
+    definition: str
+
+
+class VectorIndexManager(BaseModel):
+    """
+    Creates, rebuilds and reports on the HNSW or IVFFlat index over langchain_pg_embedding.
+    langchain_postgres creates the embedding column without a dimension, which pgvector can't index,
+    so the column has to be altered to vector(embedding_dimension) with set_dimension first.
+    Unquantized indexes use the cosine distance operator, so PGVector queries pick them up as they are.
+    Quantized indexes store halfvec (half the size) or binary quantized codes (1/32 of the size)
+    of the embeddings instead. PgVectorStore shortlists candidates through them with the same
+    expression and re-scores the shortlist with the full precision embeddings kept in the table.
+    """
+
+    engine: AsyncEngine
+    embedding_dimension: int
+    index_type: VectorIndexType
+    quantization: VectorQuantization
+    hnsw_m: int
+    hnsw_ef_construction: int
+    ivfflat_lists: int
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(cls, config: BaseConfig) -> "VectorIndexManager":
+        return cls(
+            engine=get_async_engine_from_config(config),
+            embedding_dimension=config.embedding_dimension,
+            index_type=config.vector_index_type,
+            quantization=config.vector_index_quantization,
+            hnsw_m=config.vector_index_hnsw_m,
+            hnsw_ef_construction=config.vector_index_hnsw_ef_construction,
+            ivfflat_lists=config.vector_index_ivfflat_lists,
+        )
+
+    async def create(
+        self,
+        index_type: Optional[VectorIndexType] = None,
+        quantization: Optional[VectorQuantization] = None,
+        rebuild: bool = False,
+    ) -> float:
+        """
+        Creates the ANN index, replacing the existing one if rebuild is set.
+        The quantization must match vector_index_quantization for queries to use the index.
+
+        Returns:
+            float: The build time in seconds.
+        """
+        index_type = index_type or self.index_type
+        quantization = quantization or self.quantization
+        match index_type:
+            case "hnsw":
+                options = (
+                    f"m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction}"
+                )
+            case "ivfflat":
+                options = f"lists = {self.ivfflat_lists}"
+            case _:
+                raise ValueError(f"Invalid vector index type: {index_type}")
+        indexed_expression = get_indexed_expression(
+            quantization, self.embedding_dimension
+        )
+
+        start = time.perf_counter()
+        # CREATE INDEX CONCURRENTLY can't run in a transaction, and index builds outlast
+        # the default statement timeout
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("SET statement_timeout = 0"))
+            try:
+                column_type = await self._column_type(conn)
+                if column_type != f"vector({self.embedding_dimension})":
+                    raise ValueError(
+                        f"The embedding column is {column_type} instead of vector({self.embedding_dimension}), "
+                        "run python -m common.db.vector_index set-dimension first"
+                    )
+                valid = await self._is_valid(conn, VECTOR_INDEX_NAME)
+                if valid and not rebuild:
+                    logger.info(f"{VECTOR_INDEX_NAME} already exists")
+                    return 0.0
+                # An existing index keeps serving searches while its replacement is built
+                swap = valid is not None and rebuild
+                if valid is False and not swap:
+                    logger.warning(
+                        f"Rebuilding {VECTOR_INDEX_NAME}, left invalid by a failed build"
+                    )
+                    await conn.execute(
+                        text(f"DROP INDEX CONCURRENTLY {VECTOR_INDEX_NAME}")
+                    )
+                name = REBUILT_VECTOR_INDEX_NAME if swap else VECTOR_INDEX_NAME
+                # Left over by an interrupted rebuild
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                await conn.execute(text(f"""
+                        CREATE INDEX CONCURRENTLY {name}
+                        ON langchain_pg_embedding
+                        USING {index_type} ({indexed_expression})
+                        WITH ({options})
+                        """))
+            finally:
+                # The connection goes back to the shared pool
+                await conn.execute(text("RESET statement_timeout"))
+        if swap:
+            # Only holds the table lock for the catalog changes
+            async with self.engine.begin() as conn:
+                await conn.execute(text(f"DROP INDEX {VECTOR_INDEX_NAME}"))
+                await conn.execute(
+                    text(
+                        f"ALTER INDEX {REBUILT_VECTOR_INDEX_NAME} RENAME TO {VECTOR_INDEX_NAME}"
+                    )
+                )
+        build_time = time.perf_counter() - start
+        logger.info(f"Built {index_type} {quantization} index in {build_time:.1f}s")
+        return build_time
+
+    async def set_dimension(self) -> None:
+        """
+        Alters the embedding column to vector(embedding_dimension).
+        Holds an exclusive lock on langchain_pg_embedding until every row is checked,
+        so the backend and the crawler must be stopped.
+        """
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SET LOCAL statement_timeout = 0"))
+            await conn.execute(text(f"""
+                    ALTER TABLE langchain_pg_embedding
+                    ALTER COLUMN embedding TYPE vector({self.embedding_dimension})
+                    """))
+
+    @staticmethod
+    async def _column_type(conn: AsyncConnection) -> str:
+        return await conn.scalar(
+            text(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = 'langchain_pg_embedding'::regclass AND attname = 'embedding'"
+            )
+        )
+
+    @staticmethod
+    async def _is_valid(conn: AsyncConnection, name: str) -> Optional[bool]:
+        """Returns whether the index is valid, or None if it doesn't exist."""
+        return await conn.scalar(
+            text("""
+                SELECT i.indisvalid
+                FROM pg_class c
+                JOIN pg_index i ON i.indexrelid = c.oid
+                WHERE c.relname = :name
+                """),
+            {"name": name},
+        )
+
+    async def status(self) -> Optional[VectorIndexStatus]:
+        async with self.engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text("""
+                        SELECT am.amname AS index_type,
+                               pg_relation_size(c.oid) AS size_bytes,
+                               pg_get_indexdef(c.oid) AS definition,
+                               (SELECT count(*) FROM langchain_pg_embedding) AS num_vectors
+                        FROM pg_class c
+                        JOIN pg_am am ON c.relam = am.oid
+                        WHERE c.relname = :name
+                        """),
+                    {"name": VECTOR_INDEX_NAME},
+                )
+            ).first()
+        if row is None:
+            return None
+        return VectorIndexStatus(
+            name=VECTOR_INDEX_NAME,
+            index_type=row.index_type,
+            size_bytes=row.size_bytes,
+            num_vectors=row.num_vectors,
+            definition=row.definition,
+        )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    manager = VectorIndexManager.from_config(backend_config)
+    if args.command == "set-dimension":
+        await manager.set_dimension()
+        print(f"Embedding column set to vector({manager.embedding_dimension})")
+    elif args.command == "create":
+        build_time = await manager.create(
+            args.type, args.quantization, rebuild=args.rebuild
+        )
+        print(f"Build time: {build_time:.1f}s")
+    status = await manager.status()
+    if status is None:
+        print("No vector index found")
+    else:
+        print(
+            f"{status.name}: {status.index_type}, {status.size_bytes / 1024**2:.1f} MiB, "
+            f"{status.num_vectors} vectors\n{status.definition}"
+        )
+    await manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "set-dimension",
+        help="Alter the embedding column to vector(embedding_dimension), with the services stopped",
+    )
+    create_parser = subparsers.add_parser("create", help="Create the vector index")
+    create_parser.add_argument(
+        "--type", choices=["hnsw", "ivfflat"], help="Defaults to vector_index_type"
+    )
+    create_parser.add_argument(
+        "--quantization",
+        choices=["none", "halfvec", "binary"],
+        help="Defaults to vector_index_quantization",
+    )
+    create_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild an existing index and swap it in",
+    )
+    subparsers.add_parser("status", help="Report the vector index type and size")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
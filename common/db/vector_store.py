@@ -1,10 +1,128 @@
-from pydantic import BaseModel, ConfigDict
+import logging
+from typing import Any, Optional, Sequence
 
+import numpy as np
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import SQLColumnExpression, cast, func, literal_column, select, text
+from sqlalchemy.types import UserDefinedType
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from langchain_core.documents import Document
 from langchain_core.vectorstores.base import VectorStoreRetriever
 from langchain_postgres import PGVector
 from langchain_postgres.vectorstores import PGVector
 from common.config.base_config import BaseConfig
+from common.db.postgres import (
+    get_async_engine_from_config,
+    get_postgres_connection_string,
+)
 from common.utils.llm import get_embedding_model_from_config
+from common.utils.lru_cache import LRUCache
+from common.utils.mmr import maximal_marginal_relevance, normalize
+
+logger = logging.getLogger(__name__)
+
+# VectorMetadata fields filtered on at query time (and parent_id when the crawler replaces a page's chunks),
+# each with an expression index scoped to the collection, see common.db.search_indexes
+INDEXED_METADATA_FIELDS = ("timestamp", "source_type", "query", "url", "parent_id")
+
+INDEXED_COMPARISONS = {
+    "$eq": "=",
+    "$ne": "!=",
+    "$lt": "<",
+    "$lte": "<=",
+    "$gt": ">",
+    "$gte": ">=",
+}
+
+# GIN index over the document_tsv column, both created by common.db.search_indexes
+LEXICAL_SEARCH_INDEX_NAME = "ix_langchain_pg_embedding_document_tsv"
+
+LEXICAL_SEARCH_READY_QUERY = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'langchain_pg_embedding'::regclass
+          AND attname = 'document_tsv'
+          AND NOT attisdropped
+    ) AND EXISTS (
+        SELECT 1 FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = :index_name AND i.indisvalid
+    )
+    """)
+
+LEXICAL_SEARCH_QUERY = text("""
+    SELECT e.id, e.document, e.cmetadata
+    FROM langchain_pg_embedding e
+    JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+    WHERE c.name = :collection_name
+      AND e.document_tsv @@ websearch_to_tsquery('english', :query)
+    ORDER BY ts_rank_cd(e.document_tsv, websearch_to_tsquery('english', :query)) DESC
+    LIMIT :k
+    """)
+
+# Walks the (collection_id, timestamp) metadata index backwards from the newest entry
+LATEST_TIMESTAMP_QUERY = text("""
+    SELECT cmetadata ->> 'timestamp'
+    FROM langchain_pg_embedding
+    WHERE collection_id = (
+        SELECT uuid FROM langchain_pg_collection WHERE name = :collection_name
+    )
+      AND cmetadata ->> 'timestamp' IS NOT NULL
+    ORDER BY cmetadata ->> 'timestamp' DESC
+    LIMIT 1
+    """)
+
+
+class HalfVector(Vector):
+    """pgvector's halfvec type, which pgvector.sqlalchemy only provides from 0.3."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw) -> str:
+        return f"HALFVEC({self.dim})"
+
+
+class Bit(UserDefinedType):
+    """Postgres bit(length) type, the type of binary quantized embeddings."""
+
+    cache_ok = True
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def get_col_spec(self, **kw) -> str:
+        return f"BIT({self.length})"
+
+
+class IndexedMetadataPGVector(PGVector):
+    """
+    PGVector whose string filters on the indexed metadata fields compile to
+    cmetadata ->> 'field' comparisons matching the expression indexes.
+    PGVector compiles comparisons to jsonb_path_match, which no index can serve,
+    so time-windowed retrieval would otherwise scan the whole collection.
+    ISO 8601 timestamps compare correctly as text.
+    """
+
+    def _handle_field_filter(self, field: str, value: Any) -> SQLColumnExpression:
+        operator, filter_value = (
+            next(iter(value.items()))
+            if isinstance(value, dict) and len(value) == 1
+            else ("$eq", value)
+        )
+        if (
+            field in INDEXED_METADATA_FIELDS
+            and operator in INDEXED_COMPARISONS
+            and isinstance(filter_value, str)
+        ):
+            # The key is inlined so the expression matches the index definition
+            queried_field = self.EmbeddingStore.cmetadata.op("->>")(
+                literal_column(f"'{field}'")
+            )
+            return queried_field.op(INDEXED_COMPARISONS[operator])(filter_value)
+        return super()._handle_field_filter(field, value)
 
 
 class PgVectorStore(BaseModel):
@@ -12,25 +130,55 @@ class PgVectorStore(BaseModel):
     vector_search_type: str
     vector_search_k: int
     vector_search_fetch_k: int
+    vector_search_lambda_mult: float = 0.5
+    # Quantization of the ANN index, see common.db.vector_index
+    quantization: str = "none"
+    rescore_k: int = 100
+    embedding_dimension: int = 768
+    hnsw_ef_search: int = 40
+    async_engine: Optional[AsyncEngine] = None
+    embedding_cache_size: int = 0
+    # Normalized candidate embeddings for local MMR, keyed by (document id, content hash)
+    # since a changed page keeps its document id
+    _embedding_cache: LRUCache[np.ndarray] = PrivateAttr()
+    # Set by ainit once the lexical search column and index are found
+    _lexical_search_enabled: bool = PrivateAttr(default=False)
     model_config: ConfigDict = ConfigDict(arbitrary_types_allowed=True)
 
+    def model_post_init(self, __context) -> None:
+        self._embedding_cache = LRUCache(self.embedding_cache_size)
+
     @classmethod
-    async def from_config(cls, config: BaseConfig) -> "PgVectorStore":
-        vector_store_from_client = PGVector(
+    async def from_config(
+        cls, config: BaseConfig, async_mode: bool = False
+    ) -> "PgVectorStore":
+        """
+        Creates a PgVectorStore from the config.
+        With async_mode the store runs on the process-wide async engine and only supports
+        the async methods (asearch, aadd_embeddings...), otherwise on its own sync engine.
+        """
+        async_engine = get_async_engine_from_config(config) if async_mode else None
+        vector_store_from_client = IndexedMetadataPGVector(
             embeddings=get_embedding_model_from_config(config),
             collection_name=config.vector_store_collection_name,
-            connection=cls._get_connection_string_from_config(config),
+            connection=async_engine or cls._get_connection_string_from_config(config),
         )
         return cls(
             vector_store=vector_store_from_client,
             vector_search_type=config.vector_search_type,
             vector_search_k=config.vector_search_k,
             vector_search_fetch_k=config.vector_search_fetch_k,
+            async_engine=async_engine,
+            embedding_cache_size=config.vector_search_embedding_cache_size,
+            quantization=config.vector_index_quantization,
+            rescore_k=config.vector_index_rescore_k,
+            embedding_dimension=config.embedding_dimension,
+            hnsw_ef_search=config.vector_index_hnsw_ef_search,
         )
 
     @staticmethod
     def _get_connection_string_from_config(config: BaseConfig) -> str:
-        return f"postgresql://{config.postgres_user}:{config.postgres_password}@{config.postgres_host}:{config.postgres_port}/{config.postgres_db}"
+        return get_postgres_connection_string(config)
 
     def as_retriever(self, filter: dict = {}) -> VectorStoreRetriever:
         return self.vector_store.as_retriever(
@@ -41,3 +189,237 @@ class PgVectorStore(BaseModel):
                 "filter": filter,
             },
         )
+
+    async def asearch(
+        self, query: str, filter: Optional[dict] = None
+    ) -> list[Document]:
+        """
+        Searches the vector store without blocking the event loop,
+        using the configured search type, k and fetch_k. Requires async_mode.
+        """
+        match self.vector_search_type:
+            case "mmr":
+                return await self.amax_marginal_relevance_search(query, filter=filter)
+            case "similarity":
+                return await self.asimilarity_search(query, filter=filter)
+            case _:
+                raise ValueError(
+                    f"Invalid vector search type: {self.vector_search_type}"
+                )
+
+    async def amax_marginal_relevance_search(
+        self, query: str, filter: Optional[dict] = None
+    ) -> list[Document]:
+        """
+        MMR search re-ranked locally with the vectorized maximal_marginal_relevance.
+        Candidates are fetched without their embeddings, which are served from the
+        in-process cache and only loaded from Postgres on a miss, so a larger fetch_k
+        costs little more than the nearest-neighbour query itself. Requires ainit.
+        """
+        query_embedding = normalize(
+            np.asarray(
+                await self.vector_store.embeddings.aembed_query(query), dtype=np.float32
+            )
+        )
+        EmbeddingStore = self.vector_store.EmbeddingStore
+        async with self.async_engine.connect() as conn:
+            candidates = await self._anearest_neighbours(
+                conn, query_embedding, self.vector_search_fetch_k, filter
+            )
+            keys = [
+                (row.id, (row.cmetadata or {}).get("content_hash"))
+                for row in candidates
+            ]
+            embeddings = {key: self._embedding_cache.get(key) for key in keys}
+            missing = [
+                key for key, embedding in embeddings.items() if embedding is None
+            ]
+            if missing:
+                rows = await conn.execute(
+                    select(
+                        EmbeddingStore.id,
+                        EmbeddingStore.cmetadata,
+                        EmbeddingStore.embedding,
+                    ).where(EmbeddingStore.id.in_([id for id, _ in missing]))
+                )
+                for row in rows:
+                    key = (row.id, (row.cmetadata or {}).get("content_hash"))
+                    embeddings[key] = normalize(
+                        np.asarray(row.embedding, dtype=np.float32)
+                    )
+                    self._embedding_cache.put(key, embeddings[key])
+
+        # Rows updated between the two queries have no embedding under their old key
+        candidates = [
+            (row, embeddings[key])
+            for row, key in zip(candidates, keys)
+            if embeddings.get(key) is not None
+        ]
+        if not candidates:
+            return []
+        selected = maximal_marginal_relevance(
+            query_embedding,
+            np.stack([embedding for _, embedding in candidates]),
+            k=self.vector_search_k,
+            lambda_mult=self.vector_search_lambda_mult,
+        )
+        return [
+            Document(
+                id=candidates[i][0].id,
+                page_content=candidates[i][0].document,
+                metadata=candidates[i][0].cmetadata,
+            )
+            for i in selected
+        ]
+
+    async def asimilarity_search(
+        self, query: str, filter: Optional[dict] = None
+    ) -> list[Document]:
+        """
+        Returns the vector_search_k nearest documents, shortlisted on the quantized
+        index if there is one. Requires async_mode.
+        """
+        query_embedding = await self.vector_store.embeddings.aembed_query(query)
+        async with self.async_engine.connect() as conn:
+            rows = await self._anearest_neighbours(
+                conn, query_embedding, self.vector_search_k, filter
+            )
+        return [
+            Document(id=row.id, page_content=row.document, metadata=row.cmetadata)
+            for row in rows
+        ]
+
+    async def _anearest_neighbours(
+        self,
+        conn: AsyncConnection,
+        query_embedding: Sequence[float],
+        limit: int,
+        filter: Optional[dict] = None,
+    ) -> list[Row]:
+        """
+        Fetches the id, document and metadata of the limit nearest embeddings.
+        With a quantized index the rescore_k nearest by quantized distance are shortlisted
+        through the index, then ordered by their full precision cosine distance.
+        """
+        EmbeddingStore = self.vector_store.EmbeddingStore
+        CollectionStore = self.vector_store.CollectionStore
+        query_embedding = [float(x) for x in query_embedding]
+        distance = EmbeddingStore.embedding.cosine_distance(query_embedding)
+        match self.quantization:
+            case "none":
+                index_distance = distance
+            case "halfvec":
+                # Must match the expression of the halfvec index
+                half_type = HalfVector(self.embedding_dimension)
+                index_distance = cast(EmbeddingStore.embedding, half_type).op("<=>")(
+                    cast(query_embedding, half_type)
+                )
+            case "binary":
+                # Must match the expression of the binary quantized index
+                index_distance = cast(
+                    func.binary_quantize(EmbeddingStore.embedding),
+                    Bit(self.embedding_dimension),
+                ).op("<~>")(
+                    func.binary_quantize(
+                        cast(query_embedding, Vector(self.embedding_dimension))
+                    )
+                )
+            case _:
+                raise ValueError(f"Invalid vector quantization: {self.quantization}")
+
+        stmt = (
+            select(
+                EmbeddingStore.id,
+                EmbeddingStore.document,
+                EmbeddingStore.cmetadata,
+                distance.label("distance"),
+            )
+            .join(CollectionStore, EmbeddingStore.collection_id == CollectionStore.uuid)
+            .where(CollectionStore.name == self.vector_store.collection_name)
+            .order_by(index_distance)
+        )
+        if filter:
+            stmt = stmt.where(self.vector_store._create_filter_clause(filter))
+        if self.quantization == "none":
+            return (await conn.execute(stmt.limit(limit))).all()
+
+        # HNSW returns at most ef_search rows, so it must cover the shortlist
+        await conn.execute(
+            text(
+                f"SET LOCAL hnsw.ef_search = {max(self.hnsw_ef_search, self.rescore_k)}"
+            )
+        )
+        shortlist = stmt.limit(max(self.rescore_k, limit)).subquery()
+        rows = await conn.execute(
+            select(shortlist.c.id, shortlist.c.document, shortlist.c.cmetadata)
+            .order_by(shortlist.c.distance)
+            .limit(limit)
+        )
+        return rows.all()
+
+    async def ainit(self) -> None:
+        """
+        Creates the vector store tables and collection if needed. Requires async_mode.
+        The lexical search column and the metadata filter indexes are created by common.db.search_indexes.
+        Without the column and its index, lexical search is disabled until the next start.
+        """
+        await self.vector_store.acreate_collection()
+        async with self.async_engine.connect() as conn:
+            self._lexical_search_enabled = await conn.scalar(
+                LEXICAL_SEARCH_READY_QUERY, {"index_name": LEXICAL_SEARCH_INDEX_NAME}
+            )
+        if not self._lexical_search_enabled:
+            logger.warning(
+                "The lexical search column or index is missing, falling back to vector search only. "
+                "Run python -m common.db.search_indexes create and restart"
+            )
+
+    async def alexical_search(self, query: str, k: int) -> list[Document]:
+        """
+        Ranks documents of the collection by Postgres full-text search on their content.
+        Catches exact brand names and item terms that embedding search misses. Requires async_mode
+        and the document_tsv column, see python -m common.db.search_indexes.
+        Returns no documents when ainit didn't find them.
+        """
+        if not self._lexical_search_enabled:
+            return []
+        async with self.async_engine.connect() as conn:
+            rows = await conn.execute(
+                LEXICAL_SEARCH_QUERY,
+                {
+                    "collection_name": self.vector_store.collection_name,
+                    "query": query,
+                    "k": k,
+                },
+            )
+            return [
+                Document(id=row.id, page_content=row.document, metadata=row.cmetadata)
+                for row in rows
+            ]
+
+    async def alatest_timestamp(self) -> Optional[str]:
+        """
+        Returns the crawl timestamp of the newest document in the collection,
+        which changes whenever the crawler ingests new or changed pages. Requires async_mode.
+        """
+        async with self.async_engine.connect() as conn:
+            return await conn.scalar(
+                LATEST_TIMESTAMP_QUERY,
+                {"collection_name": self.vector_store.collection_name},
+            )
+
+
+_async_vector_stores: dict[str, PgVectorStore] = {}
+
+
+async def get_async_vector_store(config: BaseConfig) -> PgVectorStore:
+    """
+    Returns the process-wide async PgVectorStore for the collection in the config.
+    It is created once, normally in the FastAPI lifespan, and shared by every request
+    so they all use the same async connection pool.
+    """
+    if config.vector_store_collection_name not in _async_vector_stores:
+        vector_store = await PgVectorStore.from_config(config, async_mode=True)
+        await vector_store.ainit()
+        _async_vector_stores[config.vector_store_collection_name] = vector_store
+    return _async_vector_stores[config.vector_store_collection_name]
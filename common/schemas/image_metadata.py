@@ -1,8 +1,30 @@
+from typing import Optional
 
+from pydantic import BaseModel, Field
 
-from pydantic import BaseModel
+
+class ImageVariant(BaseModel):
+    url: str
+    max_size: int = Field(..., description="The longest side of the variant in pixels")
+    content_type: str = "image/webp"
 
 
 class ImageMetadata(BaseModel):
     url: str
     summary: str
+    variants: list[ImageVariant] = Field(
+        default_factory=list,
+        description="Downscaled copies of the image, smallest first",
+    )
+
+    def get_url(self, max_size: Optional[int] = None) -> str:
+        """
+        Returns the URL of the smallest variant at least max_size pixels on its longest side,
+        falling back to the full-size image when no variant is large enough.
+        """
+        if max_size is None:
+            return self.url
+        for variant in sorted(self.variants, key=lambda variant: variant.max_size):
+            if variant.max_size >= max_size:
+                return variant.url
+        return self.url
@@ -1,5 +1,5 @@
 from typing import Literal
-from enum import Enum
+from enum import Enum, IntEnum
 
 LLMType = Literal["gpt-4o", "gpt-4o-mini", "llama3.1", "llama3-groq-tool-use"]
 EmbeddingModelType = Literal["text-embedding-3-small", "nomic-embed-text"]
@@ -9,3 +9,14 @@ class LLMPrefix(Enum):
     OLLAMA = "ollama_"
     VLLM = "vllm_"
     VLLM_TOOL_CALL = "vllm_tool_call_"
+
+
+class LLMPriority(IntEnum):
+    """
+    Admission priority of an LLM call, lower values are admitted first.
+    """
+
+    INTERACTIVE = 0  # Answers streamed to a waiting user
+    ROUTING = 1  # Short classifications deciding what the graph does next
+    BACKGROUND = 2  # Extraction and summaries nobody is watching stream
+    CRAWLER = 3
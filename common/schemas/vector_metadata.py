@@ -19,6 +19,13 @@ class VectorMetadata(BaseModel):
         default_factory=lambda: str(uuid()),
         description="Unique identifier for this vector chunk",
     )
+    parent_id: Optional[str] = Field(
+        default=None,
+        description="Id of the page this chunk belongs to, shared by all of its chunks",
+    )
+    chunk_index: Optional[int] = Field(
+        default=None, description="Position of this chunk in its page"
+    )
     timestamp: str = Field(..., description="Timestamp of when this vector was created")
     source_type: str = Field(
         ..., description="Type of source (e.g., 'web_page', 'pdf', 'image')"
@@ -29,6 +36,10 @@ class VectorMetadata(BaseModel):
     relevance_score: Optional[float] = Field(
         default=None, description="Relevance score of this vector to the original query"
     )
+    content_hash: Optional[str] = Field(
+        default=None,
+        description="SHA-256 of the source content, used to skip unchanged pages on re-crawls",
+    )
     model_config: ConfigDict = ConfigDict(populate_by_name=True)
 
     @field_validator("source_type")
@@ -0,0 +1,33 @@
+from langchain_core.documents import Document
+
+
+def get_chunk_id(parent_id: str, chunk_index: int) -> str:
+    return f"{parent_id}-{chunk_index}"
+
+
+def merge_chunks_by_parent(docs: list[Document]) -> list[Document]:
+    """
+    Merges retrieved chunks of the same page into one document per page, keeping the
+    rank of the page's best chunk. The chunks are joined in page order and the document
+    carries the page id and the shared page metadata. Documents stored before chunking
+    have no parent_id and are kept as they are.
+    """
+    groups: dict[str, list[Document]] = {}
+    for doc in docs:
+        parent_id = doc.metadata.get("parent_id") or doc.id or doc.page_content
+        groups.setdefault(parent_id, []).append(doc)
+
+    merged = []
+    for parent_id, chunks in groups.items():
+        if len(chunks) == 1 and "parent_id" not in chunks[0].metadata:
+            merged.append(chunks[0])
+            continue
+        chunks.sort(key=lambda chunk: chunk.metadata.get("chunk_index", 0))
+        merged.append(
+            Document(
+                id=parent_id,
+                page_content="\n".join(chunk.page_content for chunk in chunks),
+                metadata=chunks[0].metadata,
+            )
+        )
+    return merged
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel, ConfigDict
+from redis import Redis, RedisError
+from redis import asyncio as aioredis
+
+from common.config.base_config import BaseConfig
+from common.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_hits: int
+    redis_hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0
+
+
+class CachedEmbeddings(BaseModel, Embeddings):
+    """
+    Two-tier cache in front of an embedding model: an in-process LRU, then Redis.
+    Entries are keyed by the embedding model and the normalized text, and stored as
+    float16 bytes, half the size of float32. Embeddings are always returned from the
+    float16 payload, so a text embeds identically whether or not it was cached.
+    """
+
+    embeddings: Embeddings
+    embedding_model: str
+    memory_cache: LRUCache[bytes]
+    redis_client: Optional[Redis] = None
+    async_redis_client: Optional[aioredis.Redis] = None
+    ttl_seconds: int
+    redis_hits: int = 0
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(
+        cls, config: BaseConfig, embeddings: Embeddings
+    ) -> "CachedEmbeddings":
+        redis_kwargs = dict(
+            host=config.redis_host,
+            port=config.redis_port,
+            db=config.redis_db,
+            password=config.redis_password or None,
+        )
+        return cls(
+            embeddings=embeddings,
+            embedding_model=config.embedding_model,
+            memory_cache=LRUCache(config.embedding_cache_size),
+            redis_client=(
+                Redis(**redis_kwargs) if config.embedding_cache_redis else None
+            ),
+            async_redis_client=(
+                aioredis.Redis(**redis_kwargs) if config.embedding_cache_redis else None
+            ),
+            ttl_seconds=config.embedding_cache_ttl_seconds,
+        )
+
+    @property
+    def stats(self) -> EmbeddingCacheStats:
+        return EmbeddingCacheStats(
+            memory_hits=self.memory_cache.hits,
+            redis_hits=self.redis_hits,
+            misses=self.memory_cache.misses - self.redis_hits,
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._get_key(text) for text in texts]
+        payloads = self._get_from_memory(keys)
+        missing = [key for key in keys if payloads[key] is None]
+        if missing and self.redis_client is not None:
+            try:
+                self._add_redis_payloads(
+                    payloads, missing, self.redis_client.mget(missing)
+                )
+            except RedisError as e:
+                logger.warning(f"Embedding cache Redis lookup failed: {e}")
+        missing_texts = self._get_missing_texts(texts, keys, payloads)
+        if missing_texts:
+            new_payloads = self._to_payloads(
+                missing_texts,
+                self.embeddings.embed_documents(list(missing_texts.values())),
+            )
+            payloads.update(new_payloads)
+            if self.redis_client is not None:
+                try:
+                    self._store_in_redis(
+                        self.redis_client.pipeline(), new_payloads
+                    ).execute()
+                except RedisError as e:
+                    logger.warning(f"Embedding cache Redis write failed: {e}")
+        return self._from_payloads(keys, payloads)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._get_key(text) for text in texts]
+        payloads = self._get_from_memory(keys)
+        missing = [key for key in keys if payloads[key] is None]
+        if missing and self.async_redis_client is not None:
+            try:
+                self._add_redis_payloads(
+                    payloads, missing, await self.async_redis_client.mget(missing)
+                )
+            except RedisError as e:
+                logger.warning(f"Embedding cache Redis lookup failed: {e}")
+        missing_texts = self._get_missing_texts(texts, keys, payloads)
+        if missing_texts:
+            new_payloads = self._to_payloads(
+                missing_texts,
+                await self.embeddings.aembed_documents(list(missing_texts.values())),
+            )
+            payloads.update(new_payloads)
+            if self.async_redis_client is not None:
+                try:
+                    await self._store_in_redis(
+                        self.async_redis_client.pipeline(), new_payloads
+                    ).execute()
+                except RedisError as e:
+                    logger.warning(f"Embedding cache Redis write failed: {e}")
+        return self._from_payloads(keys, payloads)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def _get_key(self, text: str) -> str:
+        normalized_text = re.sub(
+            r"\s+", " ", unicodedata.normalize("NFC", text)
+        ).strip()
+        text_hash = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+        return f"embedding:{self.embedding_model}:{text_hash}"
+
+    def _get_from_memory(self, keys: list[str]) -> dict[str, Optional[bytes]]:
+        return {key: self.memory_cache.get(key) for key in keys}
+
+    def _add_redis_payloads(
+        self,
+        payloads: dict[str, Optional[bytes]],
+        keys: list[str],
+        redis_payloads: list[Optional[bytes]],
+    ) -> None:
+        for key, payload in zip(keys, redis_payloads):
+            if payload is not None:
+                self.redis_hits += 1
+                self.memory_cache.put(key, payload)
+                payloads[key] = payload
+
+    @staticmethod
+    def _get_missing_texts(
+        texts: list[str], keys: list[str], payloads: dict[str, Optional[bytes]]
+    ) -> dict[str, str]:
+        # Duplicate texts in a batch are embedded once
+        return {key: text for key, text in zip(keys, texts) if payloads[key] is None}
+
+    def _to_payloads(
+        self, missing_texts: dict[str, str], embeddings: list[list[float]]
+    ) -> dict[str, bytes]:
+        payloads = {
+            key: np.asarray(embedding, dtype=np.float16).tobytes()
+            for key, embedding in zip(missing_texts, embeddings)
+        }
+        for key, payload in payloads.items():
+            self.memory_cache.put(key, payload)
+        return payloads
+
+    def _store_in_redis(self, pipeline, payloads: dict[str, bytes]):
+        for key, payload in payloads.items():
+            pipeline.set(key, payload, ex=self.ttl_seconds)
+        return pipeline
+
+    def _from_payloads(
+        self, keys: list[str], payloads: dict[str, Optional[bytes]]
+    ) -> list[list[float]]:
+        lookups = self.memory_cache.hits + self.memory_cache.misses
+        if lookups and lookups % 100 < len(keys):
+            logger.info(f"Embedding cache hit rate: {self.stats.hit_rate:.1%}")
+        return [
+            np.frombuffer(payloads[key], dtype=np.float16).astype(np.float32).tolist()
+            for key in keys
+        ]
+
+
+_cached_embeddings: dict[str, CachedEmbeddings] = {}
+
+
+def get_cached_embeddings(
+    config: BaseConfig, embeddings: Embeddings
+) -> CachedEmbeddings:
+    """
+    Returns the process-wide cache for the embedding model in the config,
+    so every vector store and retriever shares one LRU and one hit rate.
+    """
+    if config.embedding_model not in _cached_embeddings:
+        _cached_embeddings[config.embedding_model] = CachedEmbeddings.from_config(
+            config, embeddings
+        )
+    return _cached_embeddings[config.embedding_model]
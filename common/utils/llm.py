@@ -11,23 +11,80 @@ from langchain_core.callbacks import AsyncCallbackHandler
 
 from backend.app.config.config import backend_config
 from common.config.base_config import BaseConfig
-from common.schemas.llm import LLMPrefix
-from common.utils.vllm import VLLMClient, VLLMToolCallClient
+from common.schemas.llm import LLMPrefix, LLMPriority
+from common.utils.vllm import BatchedVLLMClient, VLLMClient, VLLMToolCallClient
+from common.utils.llm_batcher import get_llm_batcher
+from common.utils.llm_admission import get_llm_admission_controller
+from common.utils.llm_router import (
+    LLMRouter,
+    LLMRouterBackend,
+    get_llm_backend_health,
+)
+from common.utils.embedding_cache import get_cached_embeddings
 
 
 def get_llm_from_config(
     config: BaseConfig,
     llm: Optional[str] = None,
     callbacks: Optional[list[AsyncCallbackHandler]] = None,
+    batched: bool = False,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
 ) -> BaseLanguageModel:
     """
     Get a LLM from the config. If a LLM is not specified, the default LLM is used.
     Since ChatOllama doesn't have async parallel calling support, we give the option
     of connecting to a remote vLLM server instead for parallel calling.
+    With batched, concurrent prompts to a vLLM model are micro-batched into one request,
+    which suits short classification prompts. Other backends ignore it.
+    Every call holds a slot of the process-wide admission controller of its backend
+    while it runs, and the controller admits the calls of the most urgent priority first.
+    The LLM is routed to its llm_fallbacks when it fails, times out or has its circuit open.
     """
     if llm is None:
         llm = config.llm
+    # The tool call client isn't a langchain model and is used as is
+    if LLMPrefix.VLLM_TOOL_CALL.value in llm:
+        return _get_backend_llm(config, llm, callbacks, batched, priority)
+    return LLMRouter(
+        backends=[
+            _get_router_backend(config, backend_llm, callbacks, batched, priority)
+            for backend_llm in [llm, *config.llm_fallbacks.get(llm, [])]
+        ],
+        timeout=config.llm_timeout_seconds,
+        # Streamed tokens of a hedged or retried call would be sent twice
+        hedge=not callbacks,
+        streaming=bool(callbacks),
+    )
+
 
+def _get_router_backend(
+    config: BaseConfig,
+    llm: str,
+    callbacks: Optional[list[AsyncCallbackHandler]],
+    batched: bool,
+    priority: LLMPriority,
+) -> LLMRouterBackend:
+    backend_llm = _get_backend_llm(config, llm, callbacks, batched, priority)
+    return LLMRouterBackend(
+        llm=backend_llm,
+        health=get_llm_backend_health(config, llm),
+        # The batcher admits each batch as a whole
+        admission=(
+            None
+            if isinstance(backend_llm, BatchedVLLMClient)
+            else get_llm_admission_controller(config, get_llm_backend(llm))
+        ),
+        priority=priority,
+    )
+
+
+def _get_backend_llm(
+    config: BaseConfig,
+    llm: str,
+    callbacks: Optional[list[AsyncCallbackHandler]],
+    batched: bool,
+    priority: LLMPriority,
+) -> BaseLanguageModel | VLLMToolCallClient:
     http_async_client = httpx.AsyncClient()
     chat_ollama = partial(
         ChatOllama,
@@ -67,9 +124,19 @@ def get_llm_from_config(
             return VLLMToolCallClient(
                 api_key="EMPTY",
                 base_url=backend_config.vllm_url,
+                admission=get_llm_admission_controller(config, "vllm"),
+                priority=priority,
             )
         case str() if LLMPrefix.VLLM.value in llm:
             model_name = llm.split("_")[1]
+            if batched and config.llm_batch_max_size > 1:
+                return BatchedVLLMClient(
+                    openai_api_key="EMPTY",
+                    openai_api_base=backend_config.vllm_url,
+                    model_name=model_name,
+                    batcher=get_llm_batcher(config, model_name),
+                    priority=priority,
+                )
             return VLLMClient(
                 openai_api_key="EMPTY",
                 openai_api_base=backend_config.vllm_url,
@@ -81,18 +148,35 @@ def get_llm_from_config(
             raise ValueError(f"Invalid LLM: {llm}")
 
 
+def get_llm_backend(llm: str) -> str:
+    """
+    Get the backend serving a LLM of the config: openai, ollama or vllm.
+    """
+    if llm.startswith("gpt-"):
+        return "openai"
+    if LLMPrefix.OLLAMA.value in llm:
+        return "ollama"
+    if LLMPrefix.VLLM.value in llm:
+        return "vllm"
+    raise ValueError(f"Invalid LLM: {llm}")
+
+
 def get_embedding_model_from_config(
     config: BaseConfig,
 ) -> Embeddings:
+    """
+    Get the embedding model from the config, behind the process-wide embedding cache.
+    """
     match config.embedding_model:
         case "text-embedding-3-small":
-            return OpenAIEmbeddings(
+            embeddings = OpenAIEmbeddings(
                 model="text-embedding-3-small", api_key=config.openai_api_key
             )
         case "nomic-embed-text":
-            return OllamaEmbeddings(
+            embeddings = OllamaEmbeddings(
                 base_url=config.ollama_url,
                 model="nomic-embed-text",
             )
         case _:
             raise ValueError(f"Invalid embedding model: {config.embedding_model}")
+    return get_cached_embeddings(config, embeddings)
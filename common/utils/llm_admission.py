@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from common.config.base_config import BaseConfig
+from common.schemas.llm import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+# Identifies the request an LLM call is made for, so concurrent requests share the queue fairly
+llm_request_id: ContextVar[str] = ContextVar("llm_request_id", default="default")
+
+
+class LLMAdmissionStats(BaseModel):
+    backend: str
+    max_concurrency: int
+    in_flight: int
+    queue_depth: dict[str, int]
+    admitted: dict[str, int]
+    mean_wait_seconds: dict[str, float]
+    max_wait_seconds: dict[str, float]
+
+
+class LLMAdmissionController(BaseModel):
+    """
+    Limits the in-flight calls this process makes to one LLM backend.
+    Calls over max_concurrency wait for a slot. Freed slots go to the most urgent
+    priority class with waiting calls, and within a class to the requests in turn,
+    so one request's fan-out can't starve another request of the same class.
+    """
+
+    backend: str
+    max_concurrency: int
+    _in_flight: int = PrivateAttr(default=0)
+    _waiters: dict[LLMPriority, OrderedDict[str, deque[asyncio.Future]]] = PrivateAttr(
+        default_factory=lambda: {priority: OrderedDict() for priority in LLMPriority}
+    )
+    _admitted: dict[LLMPriority, int] = PrivateAttr(
+        default_factory=lambda: dict.fromkeys(LLMPriority, 0)
+    )
+    _total_wait: dict[LLMPriority, float] = PrivateAttr(
+        default_factory=lambda: dict.fromkeys(LLMPriority, 0.0)
+    )
+    _max_wait: dict[LLMPriority, float] = PrivateAttr(
+        default_factory=lambda: dict.fromkeys(LLMPriority, 0.0)
+    )
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(
+            len(waiters)
+            for requests in self._waiters.values()
+            for waiters in requests.values()
+        )
+
+    @property
+    def stats(self) -> LLMAdmissionStats:
+        return LLMAdmissionStats(
+            backend=self.backend,
+            max_concurrency=self.max_concurrency,
+            in_flight=self._in_flight,
+            queue_depth={
+                priority.name.lower(): sum(map(len, requests.values()))
+                for priority, requests in self._waiters.items()
+            },
+            admitted={
+                priority.name.lower(): admitted
+                for priority, admitted in self._admitted.items()
+            },
+            mean_wait_seconds={
+                priority.name.lower(): (
+                    self._total_wait[priority] / admitted if admitted else 0.0
+                )
+                for priority, admitted in self._admitted.items()
+            },
+            max_wait_seconds={
+                priority.name.lower(): max_wait
+                for priority, max_wait in self._max_wait.items()
+            },
+        )
+
+    @asynccontextmanager
+    async def admit(
+        self, priority: LLMPriority, request_id: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        await self.acquire(priority, request_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(
+        self, priority: LLMPriority, request_id: Optional[str] = None
+    ) -> None:
+        start = time.perf_counter()
+        if self._in_flight < self.max_concurrency and not self.queue_depth:
+            self._in_flight += 1
+            self._record_wait(priority, 0.0)
+            return
+
+        request_id = request_id or llm_request_id.get()
+        future = asyncio.get_running_loop().create_future()
+        requests = self._waiters[priority]
+        requests.setdefault(request_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._remove_waiter(priority, request_id, future)
+            else:
+                # The slot was granted just before the caller was cancelled
+                self.release()
+            raise
+        wait = time.perf_counter() - start
+        self._record_wait(priority, wait)
+        logger.debug(
+            f"Admitted a {priority.name.lower()} {self.backend} call for {request_id} "
+            f"after {wait * 1000:.0f}ms, {self.queue_depth} still queued"
+        )
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        while self._in_flight < self.max_concurrency:
+            future = self._next_waiter()
+            if future is None:
+                return
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for requests in self._waiters.values():
+            while requests:
+                request_id, waiters = next(iter(requests.items()))
+                future = waiters.popleft()
+                # The request goes to the back of its class, behind the other requests
+                if waiters:
+                    requests.move_to_end(request_id)
+                else:
+                    del requests[request_id]
+                if not future.done():
+                    return future
+        return None
+
+    def _remove_waiter(
+        self, priority: LLMPriority, request_id: str, future: asyncio.Future
+    ) -> None:
+        waiters = self._waiters[priority].get(request_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        if not waiters:
+            del self._waiters[priority][request_id]
+
+    def _record_wait(self, priority: LLMPriority, wait: float) -> None:
+        self._admitted[priority] += 1
+        self._total_wait[priority] += wait
+        self._max_wait[priority] = max(self._max_wait[priority], wait)
+
+
+_llm_admission_controllers: dict[str, LLMAdmissionController] = {}
+
+
+def get_llm_admission_controller(
+    config: BaseConfig, backend: str
+) -> LLMAdmissionController:
+    """
+    Returns the process-wide admission controller of an LLM backend (vllm, ollama or openai).
+    """
+    if backend not in _llm_admission_controllers:
+        _llm_admission_controllers[backend] = LLMAdmissionController(
+            backend=backend, max_concurrency=config.llm_max_concurrency[backend]
+        )
+    return _llm_admission_controllers[backend]
+
+
+def get_llm_admission_stats() -> list[LLMAdmissionStats]:
+    return [controller.stats for controller in _llm_admission_controllers.values()]
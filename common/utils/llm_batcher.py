@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from openai import AsyncOpenAI
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from common.config.base_config import BaseConfig
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import (
+    LLMAdmissionController,
+    get_llm_admission_controller,
+    llm_request_id,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBatchStats(BaseModel):
+    num_prompts: int
+    num_batches: int
+    total_queue_wait_seconds: float
+    total_request_seconds: float
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.num_prompts / self.num_batches if self.num_batches else 0.0
+
+    @property
+    def mean_queue_wait_seconds(self) -> float:
+        return (
+            self.total_queue_wait_seconds / self.num_prompts
+            if self.num_prompts
+            else 0.0
+        )
+
+    @property
+    def prompts_per_second(self) -> float:
+        return (
+            self.num_prompts / self.total_request_seconds
+            if self.total_request_seconds
+            else 0.0
+        )
+
+
+class _QueuedPrompt(BaseModel):
+    prompt: str
+    priority: LLMPriority
+    request_id: str
+    future: asyncio.Future
+    queued_at: float
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+class LLMBatcher(BaseModel):
+    """
+    Micro-batches short completion prompts to a vLLM server.
+    Prompts submitted concurrently within window_seconds of the first one are sent as a
+    single completions request with a list of prompts, which vLLM schedules as one batch,
+    and each caller gets back the completion of its own prompt. A batch is sent early once
+    it has max_batch_size prompts. A batch takes one admission slot, at the most urgent
+    priority of its prompts.
+    """
+
+    client: AsyncOpenAI
+    admission: LLMAdmissionController
+    model_name: str
+    temperature: float
+    max_tokens: int
+    window_seconds: float
+    max_batch_size: int
+    _queue: list[_QueuedPrompt] = PrivateAttr(default_factory=list)
+    _flush_handle: Optional[asyncio.TimerHandle] = PrivateAttr(default=None)
+    _tasks: set[asyncio.Task] = PrivateAttr(default_factory=set)
+    _stats: LLMBatchStats = PrivateAttr(
+        default_factory=lambda: LLMBatchStats(
+            num_prompts=0,
+            num_batches=0,
+            total_queue_wait_seconds=0.0,
+            total_request_seconds=0.0,
+        )
+    )
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(cls, config: BaseConfig, model_name: str) -> "LLMBatcher":
+        return cls(
+            client=AsyncOpenAI(api_key="EMPTY", base_url=config.vllm_url),
+            admission=get_llm_admission_controller(config, "vllm"),
+            model_name=model_name,
+            temperature=config.llm_temperature,
+            max_tokens=config.llm_batch_max_tokens,
+            window_seconds=config.llm_batch_window_ms / 1000,
+            max_batch_size=config.llm_batch_max_size,
+        )
+
+    @property
+    def stats(self) -> LLMBatchStats:
+        return self._stats.model_copy()
+
+    async def acomplete(
+        self, prompt: str, priority: LLMPriority = LLMPriority.ROUTING
+    ) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append(
+            _QueuedPrompt(
+                prompt=prompt,
+                priority=priority,
+                request_id=llm_request_id.get(),
+                future=future,
+                queued_at=time.perf_counter(),
+            )
+        )
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Callers that were cancelled while queued don't need a completion
+        batch = [queued for queued in self._queue if not queued.future.done()]
+        self._queue = []
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[_QueuedPrompt]) -> None:
+        urgent = min(batch, key=lambda queued: queued.priority)
+        try:
+            async with self.admission.admit(urgent.priority, urgent.request_id):
+                start = time.perf_counter()
+                response = await self.client.completions.create(
+                    model=self.model_name,
+                    prompt=[queued.prompt for queued in batch],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+        except Exception as e:
+            for queued in batch:
+                if not queued.future.done():
+                    queued.future.set_exception(e)
+            return
+        request_seconds = time.perf_counter() - start
+        # Queue wait includes the wait for admission
+        queue_wait = sum(start - queued.queued_at for queued in batch)
+
+        # Choices are indexed by the position of their prompt in the request
+        for choice in response.choices:
+            queued = batch[choice.index]
+            if not queued.future.done():
+                queued.future.set_result(choice.text)
+        for queued in batch:
+            if not queued.future.done():
+                queued.future.set_exception(
+                    ValueError("No completion returned for the prompt")
+                )
+
+        self._stats.num_prompts += len(batch)
+        self._stats.num_batches += 1
+        self._stats.total_queue_wait_seconds += queue_wait
+        self._stats.total_request_seconds += request_seconds
+        logger.info(
+            f"Sent a batch of {len(batch)} prompts to {self.model_name}: "
+            f"mean queue wait {queue_wait / len(batch) * 1000:.1f}ms, "
+            f"request {request_seconds * 1000:.0f}ms, "
+            f"{len(batch) / request_seconds:.1f} prompts/s "
+            f"(mean batch size {self._stats.mean_batch_size:.1f})"
+        )
+
+
+_llm_batchers: dict[tuple[str, str], LLMBatcher] = {}
+
+
+def get_llm_batcher(config: BaseConfig, model_name: str) -> LLMBatcher:
+    """
+    Returns the process-wide batcher of a vLLM model, so prompts from concurrent
+    requests are batched together.
+    """
+    key = (config.vllm_url, model_name)
+    if key not in _llm_batchers:
+        _llm_batchers[key] = LLMBatcher.from_config(config, model_name)
+    return _llm_batchers[key]
@@ -0,0 +1,369 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackHandler,
+    BaseCallbackHandler,
+    BaseCallbackManager,
+    Callbacks,
+)
+from langchain_core.language_models import (
+    BaseChatModel,
+    BaseLanguageModel,
+    LanguageModelInput,
+)
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import RunnableConfig, ensure_config, patch_config
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from common.config.base_config import BaseConfig
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import LLMAdmissionController
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendStats(BaseModel):
+    llm: str
+    circuit_open: bool
+    num_calls: int
+    num_failures: int
+    p50_seconds: Optional[float]
+    p95_seconds: Optional[float]
+    p99_seconds: Optional[float]
+
+
+class LLMBackendHealth(BaseModel):
+    """
+    Latency samples and circuit breaker of one LLM backend, shared by every router using it.
+    The circuit opens after failure_threshold consecutive failures. Once open, calls skip
+    the backend until reset_seconds have passed, then a single call probes it: a success
+    closes the circuit, a failure keeps it open for another reset_seconds, and a probe that
+    is cancelled before it answers lets the next call probe again.
+    """
+
+    llm: str
+    failure_threshold: int
+    reset_seconds: float
+    hedge_percentile: float
+    hedge_min_samples: int
+    num_calls: int = 0
+    num_failures: int = 0
+    consecutive_failures: int = 0
+    opened_at: Optional[float] = None
+    probing: bool = False
+    _latencies: deque[float] = PrivateAttr()
+
+    def __init__(self, latency_window: int, **data: Any):
+        super().__init__(**data)
+        self._latencies = deque(maxlen=latency_window)
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def stats(self) -> LLMBackendStats:
+        latencies = np.array(self._latencies)
+        p50, p95, p99 = (
+            np.percentile(latencies, [50, 95, 99]).tolist()
+            if len(latencies)
+            else (None, None, None)
+        )
+        return LLMBackendStats(
+            llm=self.llm,
+            circuit_open=self.circuit_open,
+            num_calls=self.num_calls,
+            num_failures=self.num_failures,
+            p50_seconds=p50,
+            p95_seconds=p95,
+            p99_seconds=p99,
+        )
+
+    def allow_request(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return False
+        # Half-open: this call probes the backend, the others wait for another period
+        self.opened_at = time.monotonic()
+        self.probing = True
+        return True
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        How long to wait for a call before sending a duplicate, None until there are enough samples.
+        """
+        if len(self._latencies) < self.hedge_min_samples:
+            return None
+        return float(np.percentile(self._latencies, self.hedge_percentile))
+
+    def record_success(self, latency: float) -> None:
+        self.num_calls += 1
+        self.probing = False
+        self._latencies.append(latency)
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info(f"Closing the circuit of {self.llm}")
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.num_calls += 1
+        self.probing = False
+        self.num_failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    f"Opening the circuit of {self.llm} after "
+                    f"{self.consecutive_failures} consecutive failures"
+                )
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self) -> None:
+        """Records a call cancelled before it answered, e.g. the loser of a hedge race."""
+        if self.probing:
+            # The probe says nothing about the backend's health, let the next call probe it
+            self.probing = False
+            self.opened_at = time.monotonic() - self.reset_seconds
+
+
+class LLMRouterBackend(BaseModel):
+    llm: BaseLanguageModel
+    health: LLMBackendHealth
+    # Calls hold a slot of the admission controller for their whole duration, if there is one
+    admission: Optional[LLMAdmissionController] = None
+    priority: LLMPriority = LLMPriority.INTERACTIVE
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+class LLMRouter(BaseChatModel):
+    """
+    Routes the calls of one LLM role to an ordered list of backends.
+    Backends with an open circuit are skipped, and a call that fails or takes longer than
+    timeout seconds is retried on the next backend. With hedge, a call still running after the
+    hedge_percentile latency of its backend is duplicated on the next backend, or on the same one
+    if there is no other, and the first response wins.
+    With streaming, tokens go to the caller's stream handler as they are generated, so calls are
+    never hedged, timeout only bounds the wait for the first token, and a call that fails after
+    its first token is not retried, which would stream the answer twice.
+    Each call holds a slot of its backend's admission controller until it returns, fails
+    or is cancelled.
+    """
+
+    backends: list[LLMRouterBackend]
+    timeout: float
+    hedge: bool = True
+    streaming: bool = False
+    cache: bool = False  # The backends use the LLM cache themselves
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm_router"
+
+    def _generate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        raise NotImplementedError("LLMRouter does not support sync invoke")
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        *,
+        stop: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        config = ensure_config(config)
+        hedge = self.hedge and not self.streaming
+        queue = list(self.backends)
+        tasks: dict[asyncio.Task, tuple[LLMRouterBackend, float, asyncio.Event]] = {}
+
+        def start(backend: LLMRouterBackend) -> None:
+            first_token = asyncio.Event()
+            task = asyncio.create_task(
+                self._acall(backend, input, dict(config), stop, first_token, **kwargs)
+            )
+            tasks[task] = (backend, time.perf_counter(), first_token)
+
+        def next_backend() -> Optional[LLMRouterBackend]:
+            while queue:
+                backend = queue.pop(0)
+                if backend.health.allow_request():
+                    return backend
+            return None
+
+        if (first_backend := next_backend()) is None:
+            raise ConnectionError(
+                "The circuits of all the backends are open: "
+                + ", ".join(backend.health.llm for backend in self.backends)
+            )
+        start(first_backend)
+        hedged, last_error = False, None
+        try:
+            while tasks:
+                hedge_timeout = None
+                if hedge and not hedged:
+                    backend, started_at, _ = next(iter(tasks.values()))
+                    delay = backend.health.hedge_delay()
+                    if delay is not None:
+                        hedge_timeout = max(
+                            delay - (time.perf_counter() - started_at), 0.0
+                        )
+                done, _ = await asyncio.wait(
+                    tasks, timeout=hedge_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    hedge_backend = next_backend() or backend
+                    logger.info(
+                        f"{backend.health.llm} is slower than its p{backend.health.hedge_percentile:g}, "
+                        f"hedging on {hedge_backend.health.llm}"
+                    )
+                    start(hedge_backend)
+                    continue
+                for task in done:
+                    backend, _, first_token = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"{backend.health.llm} failed: {last_error!r}")
+                    if first_token.is_set():
+                        # Part of the answer already reached the caller
+                        raise last_error
+                if not tasks and (fallback := next_backend()) is not None:
+                    logger.info(f"Failing over to {fallback.health.llm}")
+                    start(fallback)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancelled calls to give back their admission slots
+            if tasks:
+                await asyncio.wait(tasks)
+        raise last_error
+
+    async def _acall(
+        self,
+        backend: LLMRouterBackend,
+        input: LanguageModelInput,
+        config: RunnableConfig,
+        stop: Optional[list[str]],
+        first_token: asyncio.Event,
+        **kwargs: Any,
+    ) -> AIMessage:
+        # The slot is released however the call ends, including when it is cancelled
+        async with (
+            backend.admission.admit(backend.priority)
+            if backend.admission
+            else nullcontext()
+        ):
+            # Time spent waiting for admission isn't the backend's latency
+            start = time.perf_counter()
+            try:
+                if self.streaming:
+                    result = await self._astream_call(
+                        backend, input, config, stop, first_token, **kwargs
+                    )
+                else:
+                    result = await asyncio.wait_for(
+                        backend.llm.ainvoke(input, config, stop=stop, **kwargs),
+                        self.timeout,
+                    )
+            except asyncio.CancelledError:
+                # Lost a hedge race, which says nothing about the backend's health
+                backend.health.record_cancelled()
+                raise
+            except Exception:
+                backend.health.record_failure()
+                raise
+        backend.health.record_success(time.perf_counter() - start)
+        return AIMessage.model_validate(result)
+
+    async def _astream_call(
+        self,
+        backend: LLMRouterBackend,
+        input: LanguageModelInput,
+        config: RunnableConfig,
+        stop: Optional[list[str]],
+        first_token: asyncio.Event,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Invokes a streaming backend, failing if no token arrives within timeout seconds
+        but letting an answer that has started streaming take as long as it needs.
+        """
+        call = asyncio.ensure_future(
+            backend.llm.ainvoke(
+                input,
+                patch_config(
+                    config,
+                    callbacks=_add_handler(
+                        config.get("callbacks"), _FirstTokenHandler(first_token)
+                    ),
+                ),
+                stop=stop,
+                **kwargs,
+            )
+        )
+        started = asyncio.ensure_future(first_token.wait())
+        try:
+            await asyncio.wait(
+                {call, started},
+                timeout=self.timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not call.done() and not started.done():
+                raise TimeoutError(f"No token within {self.timeout}s")
+            return await call
+        finally:
+            started.cancel()
+            if not call.done():
+                call.cancel()
+                await asyncio.wait({call})
+
+
+class _FirstTokenHandler(AsyncCallbackHandler):
+    """Sets first_token when the LLM streams its first token."""
+
+    def __init__(self, first_token: asyncio.Event):
+        self.first_token = first_token
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.first_token.set()
+
+
+def _add_handler(callbacks: Callbacks, handler: BaseCallbackHandler) -> Callbacks:
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=False)
+        return callbacks
+    return [*(callbacks or []), handler]
+
+
+_llm_backend_health: dict[str, LLMBackendHealth] = {}
+
+
+def get_llm_backend_health(config: BaseConfig, llm: str) -> LLMBackendHealth:
+    """
+    Returns the process-wide health of an LLM backend of the config, e.g. vllm_meta-llama/Llama-3.1-8B-Instruct.
+    """
+    if llm not in _llm_backend_health:
+        _llm_backend_health[llm] = LLMBackendHealth(
+            llm=llm,
+            failure_threshold=config.llm_circuit_failure_threshold,
+            reset_seconds=config.llm_circuit_reset_seconds,
+            hedge_percentile=config.llm_hedge_percentile,
+            hedge_min_samples=config.llm_hedge_min_samples,
+            latency_window=config.llm_latency_window,
+        )
+    return _llm_backend_health[llm]
+
+
+def get_llm_backend_stats() -> list[LLMBackendStats]:
+    return [health.stats for health in _llm_backend_health.values()]
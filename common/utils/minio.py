@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import lru_cache
 from io import BytesIO
-import uuid
+import hashlib
+
+from minio.error import S3Error
 
 from common.db.minio import get_minio_client, MinioResponse
 from crawler.config.config import config
@@ -15,21 +19,55 @@ def minio_presigned_get_object(bucket_name: str, object_name: str) -> str:
     )
 
 
+def minio_object_exists(bucket_name: str, object_name: str) -> bool:
+    try:
+        get_minio_client().stat_object(bucket_name, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject"):
+            return False
+        raise
+
+
+def get_content_addressed_object_name(file_data: BytesIO) -> str:
+    """
+    Names an object after the SHA-256 of its bytes so identical files share one object.
+    """
+    return hashlib.sha256(file_data.getbuffer()).hexdigest()
+
+
 def minio_put_object(file_data: BytesIO, content_type: str) -> MinioResponse:
     """
     Uploads a file to Minio and returns a presigned URL to the file.
+    Objects are content-addressed, so the upload is skipped if the bytes are already stored.
     """
     minio_client = get_minio_client()
-    file_id = str(uuid.uuid4())
-    minio_client.put_object(
-        bucket_name=config.minio_bucket,
-        object_name=file_id,
-        data=file_data,
-        length=file_data.getbuffer().nbytes,
-        content_type=content_type,
-    )
+    file_id = get_content_addressed_object_name(file_data)
+    if not minio_object_exists(config.minio_bucket, file_id):
+        minio_client.put_object(
+            bucket_name=config.minio_bucket,
+            object_name=file_id,
+            data=file_data,
+            length=file_data.getbuffer().nbytes,
+            content_type=content_type,
+        )
     return MinioResponse(
         bucket_name=config.minio_bucket,
         file_name=file_id,
         url=minio_presigned_get_object(config.minio_bucket, file_id),
     )
+
+
+@lru_cache(maxsize=None)
+def _get_upload_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=config.minio_upload_workers, thread_name_prefix="minio-upload"
+    )
+
+
+def minio_put_objects(files: list[tuple[BytesIO, str]]) -> list[MinioResponse]:
+    """
+    Uploads (file_data, content_type) pairs concurrently through a shared thread pool,
+    since the minio SDK is blocking. Responses are returned in the order of the files.
+    """
+    return list(_get_upload_executor().map(lambda file: minio_put_object(*file), files))
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1, norms)
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> list[int]:
+    """
+    Selects k candidates by maximal marginal relevance, in selection order.
+    Both inputs must be L2-normalized. All similarities come from two matrix products up front,
+    and each step only updates every candidate's max similarity to the selection with one
+    vectorized maximum, instead of recomputing similarities against the selection in Python.
+
+    Args:
+        query_embedding (np.ndarray): The normalized query embedding, shape (dim,).
+        candidate_embeddings (np.ndarray): The normalized candidate embeddings, shape (n, dim).
+        k (int): The number of candidates to select.
+        lambda_mult (float): 1 for pure relevance, 0 for maximum diversity.
+
+    Returns:
+        list[int]: Indices of the selected candidates.
+    """
+    num_candidates = len(candidate_embeddings)
+    k = min(k, num_candidates)
+    if k <= 0:
+        return []
+
+    similarity_to_query = candidate_embeddings @ query_embedding
+    similarity_between = candidate_embeddings @ candidate_embeddings.T
+
+    selected = [int(np.argmax(similarity_to_query))]
+    max_similarity_to_selected = similarity_between[selected[0]].copy()
+    available = np.ones(num_candidates, dtype=bool)
+    available[selected[0]] = False
+    for _ in range(k - 1):
+        scores = (
+            lambda_mult * similarity_to_query
+            - (1 - lambda_mult) * max_similarity_to_selected
+        )
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(
+            max_similarity_to_selected,
+            similarity_between[best],
+            out=max_similarity_to_selected,
+        )
+    return selected
@@ -0,0 +1,22 @@
+from langchain_core.documents import Document
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: list[list[Document]],
+    weights: list[float],
+    k: int = 60,
+) -> list[Document]:
+    """
+    Fuses ranked lists of documents with weighted reciprocal rank fusion.
+    Each document scores sum(weight / (k + rank)) over the lists it appears in,
+    so documents ranked highly by several retrievers rise to the top.
+    Documents are matched by id, falling back to their content.
+    """
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranked_list, weight in zip(ranked_lists, weights):
+        for rank, document in enumerate(ranked_list, start=1):
+            key = document.id or document.page_content
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
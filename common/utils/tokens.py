@@ -0,0 +1,34 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Llama 3 uses a tiktoken-derived 128k vocabulary, so cl100k_base is a close count for the
+# local models as well; OpenAI models use their exact encoding
+DEFAULT_ENCODING = "cl100k_base"
+# Fallback when the encoding can't be loaded, e.g. without access to download it
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(llm: str) -> Optional[tiktoken.Encoding]:
+    try:
+        encoding_name = tiktoken.encoding_name_for_model(llm)
+    except KeyError:
+        encoding_name = DEFAULT_ENCODING
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Failed to load the {encoding_name} encoding: {e}")
+        return None
+
+
+def count_tokens(text: str, llm: str) -> int:
+    """Counts the prompt tokens of text for the configured LLM name."""
+    encoding = get_encoding(llm)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,27 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_QUERY_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "igshid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so that links to the same page compare equal.
+    Lowercases the scheme and host, drops default ports, fragments, trailing slashes
+    and tracking query parameters, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in TRACKING_QUERY_PARAMS
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
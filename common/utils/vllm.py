@@ -1,6 +1,7 @@
 from typing import Any, Optional
 import logging
 import json
+from contextlib import nullcontext
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 from langchain_core.language_models import LanguageModelInput
@@ -10,6 +11,9 @@ from langchain_core.utils.function_calling import convert_to_openai_function
 from openai import AsyncOpenAI
 from langchain_core.tools import Tool
 
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import LLMAdmissionController
+from common.utils.llm_batcher import LLMBatcher
 
 logger = logging.getLogger(__name__)
 
@@ -40,12 +44,49 @@ class VLLMClient(VLLMOpenAI):
         return AIMessage(content=raw_res)
 
 
+class BatchedVLLMClient(VLLMClient):
+    """
+    A VLLMClient whose prompts are sent through a LLMBatcher, batched with the
+    prompts of concurrent calls. Meant for short classification prompts.
+    Calls with stop sequences are sent on their own, under the batcher's admission controller.
+    """
+
+    batcher: LLMBatcher
+    priority: LLMPriority = LLMPriority.ROUTING
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        stop: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        if stop:
+            # The batcher can't apply per-call stop sequences, the call is sent on its own
+            async with self.batcher.admission.admit(self.priority):
+                return await super().ainvoke(input, config, stop=stop, **kwargs)
+        prompt = self._convert_input(input).to_string()
+        return AIMessage(content=await self.batcher.acomplete(prompt, self.priority))
+
+
 # TODO: Merge these 2 classes to allow VLLMOpenAI to call tools if needed
 class VLLMToolCallClient(AsyncOpenAI):
     """
     A wrapper around the OpenAI client that supports the langchain interface.
+    Calls wait for the admission controller if one is given.
     """
 
+    def __init__(
+        self,
+        *args: Any,
+        admission: Optional[LLMAdmissionController] = None,
+        priority: LLMPriority = LLMPriority.BACKGROUND,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.admission = admission
+        self.priority = priority
+
     async def ainvoke_with_tools(
         self,
         query: LanguageModelInput,
@@ -58,14 +99,17 @@ class VLLMToolCallClient(AsyncOpenAI):
         Asynchronously invoke the OpenAI client with tools.
         Returns the structured output as tool calls.
         """
-        models = await self.models.list()
-        model = models.data[0].id
-        # tools = [convert_to_openai_function(tool) for tool in tools]
-        chat_completion = await self.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": query}],
-            tools=tools,
-        )
+        async with (
+            self.admission.admit(self.priority) if self.admission else nullcontext()
+        ):
+            models = await self.models.list()
+            model = models.data[0].id
+            # tools = [convert_to_openai_function(tool) for tool in tools]
+            chat_completion = await self.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": query}],
+                tools=tools,
+            )
         try:
             function_args = (
                 chat_completion.choices[0].message.tool_calls[0].function.arguments
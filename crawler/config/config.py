@@ -10,12 +10,42 @@ class CrawlerConfig(BaseConfig):
     search_planner_prompt: str
     search_gender: str
     is_done_prompt: str
+    search_done_min_pages_per_category: int
+    search_done_min_new_page_rate: float
     fashion_summarizer_prompt: str
     chunk_format: str
     minio_presigned_url_expiry_days: int
+    minio_upload_workers: int
+    vector_store_batch_size: int
+    vector_store_flush_interval: float
     summarize_image_prompt: str
     summarize_content_prompt: str
+    content_summary_concurrency: int
+    content_summary_cache_size: int
+    content_summary_max_characters: int
+    chunk_max_characters: int
+    chunk_new_after_n_chars: int
+    chunk_combine_text_under_n_chars: int
     vision_llm: str
+    image_pipeline_queue_size: int
+    image_download_concurrency: int
+    image_download_timeout: float
+    image_max_bytes: int
+    image_decode_workers: int
+    image_upload_concurrency: int
+    image_summarize_concurrency: int
+    image_min_width: int
+    image_min_height: int
+    image_max_aspect_ratio: float
+    image_min_contrast: int
+    image_hash_max_distance: int
+    image_hash_table_name: str
+    url_index_table_name: str
+    query_markers_table_name: str
+    crawl_summary_max_urls: int
+    image_variant_sizes: List[int]
+    image_variant_quality: int
+
 
 # TODO: Update the path if necessary
 config = CrawlerConfig.from_yaml("crawler/config/config.yml")
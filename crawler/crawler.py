@@ -1,9 +1,15 @@
+import argparse
 import logging
 import asyncio
+from typing import Optional
+from uuid import uuid4
 
 from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 
+from common.db.postgres import get_postgres_connection_string
 from crawler.graphs.crawler_graph import CrawlerGraph
+from crawler.schemas.crawl_summary import CrawlSummary
 from crawler.config.config import config, CrawlerConfig
 from crawler.config.logging_config import setup_logging
 
@@ -14,27 +20,55 @@ logger = logging.getLogger(__name__)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Crawl the web for fashion trends")
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted crawl run from its last checkpoint",
+    )
+    args = parser.parse_args()
     try:
         logger.info("Starting crawl process")
         logger.debug(f"Config: {config}")
-        asyncio.run(crawl())
+        asyncio.run(crawl(resume_run_id=args.resume))
         logger.info("Crawl process completed")
     except Exception:
         logger.exception("An error occurred during the crawl process")
 
 
-async def crawl():
-    graph = await CrawlerGraph.from_config(config)
+async def crawl(resume_run_id: Optional[str] = None):
+    run_id = resume_run_id or str(uuid4())
+    logger.info(
+        f"{'Resuming' if resume_run_id else 'Starting'} crawl run {run_id}, "
+        f"resume it with: python -m crawler.crawler --resume {run_id}"
+    )
+    # Checkpoints are saved in Postgres after every node, keyed by the run id
+    async with AsyncPostgresSaver.from_conn_string(
+        get_postgres_connection_string(config)
+    ) as checkpointer:
+        await checkpointer.setup()
+        graph = await CrawlerGraph.from_config(config, checkpointer=checkpointer)
+        run_config = {"configurable": {"thread_id": run_id}}
 
-    init_msg = [HumanMessage(content=config.init_message)]
-    logger.debug(f"Initial message: {config.init_message}")
-    async for event in graph.graph.astream(
-        {"messages": init_msg, "search_categories": get_init_search_categories(config)}
-    ):
-        for value in event.values():
-            # TODO: Handle connection refused errors and recover
-            assistant_message = value["messages"][-1].content
-            logger.info(f"Assistant: {assistant_message}")
+        if resume_run_id:
+            # Passing no input continues from the last checkpoint of the thread
+            graph_input = None
+        else:
+            init_msg = [HumanMessage(content=config.init_message)]
+            logger.debug(f"Initial message: {config.init_message}")
+            graph_input = {
+                "messages": init_msg,
+                "search_categories": get_init_search_categories(config),
+                "crawl_summary": CrawlSummary(),
+            }
+        try:
+            async for event in graph.graph.astream(graph_input, run_config):
+                for value in event.values():
+                    assistant_message = value["messages"][-1].content
+                    logger.info(f"Assistant: {assistant_message}")
+        finally:
+            # Write out the documents buffered since the last flush, even if the crawl failed
+            await graph.close()
 
 
 def get_init_search_categories(config: CrawlerConfig) -> list[str]:
@@ -42,3 +76,7 @@ def get_init_search_categories(config: CrawlerConfig) -> list[str]:
         return config.men_fashion_categories
     else:
         return config.women_fashion_categories
+
+
+if __name__ == "__main__":
+    main()
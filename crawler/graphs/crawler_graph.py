@@ -1,35 +1,48 @@
 from functools import partial
+from typing import Optional
 
 from pydantic import BaseModel
 from langgraph.graph import StateGraph
 from langgraph.graph import START, END
 from langgraph.graph.state import CompiledStateGraph
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from crawler.schemas.state import WebCrawlerState
 from crawler.tools.search_tool import search_tool
 from crawler.tools.search_rephraser_tool import search_rephraser_tool
 from crawler.tools.search_planner_tool import search_planner_tool
-from crawler.tools.search_done_tool import search_done_tool
+from crawler.tools.search_done_tool import SearchDoneTool
 from common.db.vector_store import PgVectorStore
 from crawler.config.config import CrawlerConfig
+from crawler.utils.search_results_processor import SearchResultProcessor
 
 
 class CrawlerGraph(BaseModel):
     graph: CompiledStateGraph
+    search_result_processor: SearchResultProcessor
     # TODO: Add a callback handler here if LangGraph doesn't support the AsyncStreamingCallbackHandler
 
     class Config:
         arbitrary_types_allowed = True
 
     @classmethod
-    async def from_config(cls, config: CrawlerConfig) -> "CrawlerGraph":
+    async def from_config(
+        cls,
+        config: CrawlerConfig,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+    ) -> "CrawlerGraph":
         graph_builder = StateGraph(WebCrawlerState)
 
         vector_store = (await PgVectorStore.from_config(config)).vector_store
+        search_result_processor = await SearchResultProcessor.from_config(
+            config, vector_store
+        )
 
         # TODO: Refactor tools to be LangChain Tool objects that have a .from_config method
         graph_builder.add_node("search_planner", partial(search_planner_tool, config))
-        graph_builder.add_node("search_tool", partial(search_tool, vector_store))
+        graph_builder.add_node(
+            "search_tool", partial(search_tool, search_result_processor)
+        )
         graph_builder.add_node(
             "search_rephraser", partial(search_rephraser_tool, config)
         )
@@ -38,7 +51,8 @@ class CrawlerGraph(BaseModel):
         graph_builder.add_edge("search_planner", "search_tool")
         graph_builder.add_conditional_edges(
             "search_tool",
-            partial(search_done_tool, config),
+            # Async so the decision doesn't block the event loop, LLM and prompt are built once per crawl
+            SearchDoneTool.from_config(config).search_done_tool,
             path_map={
                 "true": END,
                 "false": "search_planner",
@@ -47,5 +61,8 @@ class CrawlerGraph(BaseModel):
         )
         graph_builder.add_edge("search_rephraser", "search_planner")
 
-        graph = graph_builder.compile()
-        return cls(graph=graph)
+        graph = graph_builder.compile(checkpointer=checkpointer)
+        return cls(graph=graph, search_result_processor=search_result_processor)
+
+    async def close(self) -> None:
+        await self.search_result_processor.close()
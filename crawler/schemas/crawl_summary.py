@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+
+
+class CategoryProgress(BaseModel):
+    num_queries: int = 0
+    num_pages: int = 0
+    # Top-ranked Tavily result of the first queries of the category
+    top_urls: list[str] = Field(default_factory=list)
+
+    def add_result(self, url: str, max_urls: int) -> None:
+        if url not in self.top_urls and len(self.top_urls) < max_urls:
+            self.top_urls.append(url)
+
+
+class IterationProgress(BaseModel):
+    num_queries: int = 0
+    # Pages that were new or had changed content, as opposed to skipped unchanged pages
+    num_new_pages: int = 0
+
+
+class CrawlSummary(BaseModel):
+    """
+    Compact, bounded summary of what the crawl has covered so far.
+    Updated incrementally by search_tool and used in place of the full graph state in prompts,
+    so prompt size no longer grows with every search result.
+    """
+
+    categories: dict[str, CategoryProgress] = Field(default_factory=dict)
+    iterations: list[IterationProgress] = Field(default_factory=list)
+
+    def start_iteration(self) -> IterationProgress:
+        self.iterations.append(IterationProgress())
+        return self.iterations[-1]
+
+    def record_query(self, category: str) -> None:
+        self.categories.setdefault(category, CategoryProgress()).num_queries += 1
+        self.iterations[-1].num_queries += 1
+
+    def record_page(self, category: str, url: str, is_new: bool, max_urls: int) -> None:
+        progress = self.categories.setdefault(category, CategoryProgress())
+        progress.num_pages += 1
+        progress.add_result(url, max_urls)
+        if is_new:
+            self.iterations[-1].num_new_pages += 1
+
+    def format(self) -> str:
+        if not self.categories:
+            return "Nothing has been searched yet."
+        lines = [
+            f"Iterations: {len(self.iterations)}, "
+            f"queries: {sum(p.num_queries for p in self.categories.values())}, "
+            f"pages: {sum(p.num_pages for p in self.categories.values())}"
+        ]
+        for category, progress in self.categories.items():
+            urls = ", ".join(progress.top_urls) or "none"
+            lines.append(
+                f"- {category}: {progress.num_queries} queries, "
+                f"{progress.num_pages} pages; top URLs: {urls}"
+            )
+        return "\n".join(lines)
+
+
+def update_crawl_summary(x: CrawlSummary, y: CrawlSummary) -> CrawlSummary:
+    return y if y else x
@@ -5,6 +5,7 @@ from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
+from crawler.schemas.crawl_summary import CrawlSummary, update_crawl_summary
 from crawler.schemas.search import (
     SearchPlans,
     increment_search_iterations,
@@ -18,3 +19,4 @@ class WebCrawlerState(TypedDict):
     search_plans: Annotated[SearchPlans, update_search_plans]
     num_search_iterations: Annotated[int, increment_search_iterations]
     search_categories: Annotated[list[str], update_search_categories]
+    crawl_summary: Annotated[CrawlSummary, update_crawl_summary]
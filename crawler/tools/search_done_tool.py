@@ -1,47 +1,114 @@
 import logging
+from typing import Literal, Optional
 
+from pydantic import BaseModel, ConfigDict
 from langchain_core.messages import AIMessage
+from langchain_core.language_models import BaseLanguageModel
 
 from crawler.config.config import CrawlerConfig
 from crawler.schemas.state import WebCrawlerState
+from crawler.schemas.crawl_summary import CrawlSummary
 from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
 
 from langchain_core.prompts import PromptTemplate
 from common.utils.time import get_current_year_and_month
 
-
 logger = logging.getLogger(__name__)
 
+SearchDoneDecision = Literal["true", "false", "rephrase"]
+
+
+class SearchDoneTool(BaseModel):
+    """
+    Async conditional edge deciding whether the crawl is done.
+    The LLM and prompt template are built once per crawl, and the LLM is only asked
+    when the cheap coverage and new-page-rate checks can't decide on their own.
+    """
+
+    llm: BaseLanguageModel
+    is_done_prompt_template: PromptTemplate
+    num_search_iterations: int
+    min_pages_per_category: int
+    min_new_page_rate: float
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(cls, config: CrawlerConfig) -> "SearchDoneTool":
+        return cls(
+            llm=get_llm_from_config(config, priority=LLMPriority.CRAWLER),
+            is_done_prompt_template=PromptTemplate.from_template(config.is_done_prompt),
+            num_search_iterations=config.num_search_iterations,
+            min_pages_per_category=config.search_done_min_pages_per_category,
+            min_new_page_rate=config.search_done_min_new_page_rate,
+        )
+
+    async def search_done_tool(self, state: WebCrawlerState) -> SearchDoneDecision:
+        if state["num_search_iterations"] < self.num_search_iterations:
+            return "rephrase"  # Rephrase the queries to search a greater variety of websites
+
+        stop_reason = self.get_stop_reason(
+            state["crawl_summary"], state["search_categories"]
+        )
+        if stop_reason is not None:
+            logger.info(f"AGENT DONE: {stop_reason}")
+            return "true"
 
-def search_done_tool(config: CrawlerConfig, state: WebCrawlerState) -> bool:
-    if state["num_search_iterations"] < config.num_search_iterations:
-        return (
-            "rephrase"  # Rephrase the queries to search a greater variety of websites
+        # TODO: Fine-tune an LLM to check if a search is complete
+        prompt = self.is_done_prompt(state)
+        logger.info(
+            f"Search done prompt size at iteration {state['num_search_iterations']}: {len(prompt)} chars"
         )
+        try:
+            res = AIMessage.model_validate(await self.llm.ainvoke(prompt)).content
+        except Exception as e:
+            logger.warning(
+                "LLM failed to decide if search was complete, stopping search."
+            )
+            logger.exception(
+                f"There was an exception making the search done prompt: {e}"
+            )
+            return "true"
 
-    # TODO: Fine-tune an LLM to check if a search is complete
-    is_done_prompt_template = PromptTemplate.from_template(config.is_done_prompt)
-    llm = get_llm_from_config(config)
+        if "true" in res.lower():
+            logger.debug("AGENT DONE")
+            return "true"
+        else:
+            logger.debug("AGENT NOT DONE, STARTING NEXT SEARCH")
+            return "false"
 
-    def is_done_prompt(state: WebCrawlerState) -> PromptTemplate:
+    def get_stop_reason(
+        self, crawl_summary: CrawlSummary, categories: list[str]
+    ) -> Optional[str]:
+        """
+        Deterministic stop criterion checked before asking the LLM.
+        Stops once every category has enough pages, or once the last iteration
+        found too few new or changed pages to be worth another round.
+        """
+        pages_per_category = {
+            category.lower(): progress.num_pages
+            for category, progress in crawl_summary.categories.items()
+        }
+        if categories and all(
+            pages_per_category.get(category.lower(), 0) >= self.min_pages_per_category
+            for category in categories
+        ):
+            return f"every category has at least {self.min_pages_per_category} pages"
+
+        if crawl_summary.iterations:
+            last_iteration = crawl_summary.iterations[-1]
+            new_page_rate = last_iteration.num_new_pages / max(
+                last_iteration.num_queries, 1
+            )
+            if new_page_rate < self.min_new_page_rate:
+                return f"new page rate {new_page_rate:.2f} fell below {self.min_new_page_rate}"
+        return None
+
+    def is_done_prompt(self, state: WebCrawlerState) -> str:
         current_year, current_month = get_current_year_and_month()
-        return is_done_prompt_template.format(
-            state=state,
+        return self.is_done_prompt_template.format(
+            crawl_summary=state["crawl_summary"].format(),
             current_year=current_year,
             current_month=current_month,
             categories=",\n".join(state["search_categories"]),
         )
-
-    try:
-        res = AIMessage.model_validate(llm.invoke(is_done_prompt(state))).content
-    except Exception as e:
-        logger.warning("LLM failed to decide if search was complete, stopping search.")
-        logger.exception(f"There was an exception making the search done prompt: {e}")
-        return "true"
-
-    if "true" in res.lower():
-        logger.debug("AGENT DONE")
-        return "true"
-    else:
-        logger.debug("AGENT NOT DONE, STARTING NEXT SEARCH")
-        return "false"
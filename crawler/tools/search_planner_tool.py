@@ -8,6 +8,7 @@ from crawler.schemas.state import WebCrawlerState
 from crawler.schemas.search import SearchPlan, SearchPlans
 from common.utils.time import get_current_year_and_month
 from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +19,14 @@ async def search_planner_tool(config: CrawlerConfig, state: WebCrawlerState):
     search_planner_prompt_template = PromptTemplate.from_template(
         config.search_planner_prompt
     )
-    structured_llm = get_llm_from_config(config, config.tool_call_llm)
+    structured_llm = get_llm_from_config(
+        config, config.tool_call_llm, priority=LLMPriority.CRAWLER
+    )
 
     def search_planner_prompt(state: WebCrawlerState) -> PromptTemplate:
         current_year, current_month = get_current_year_and_month()
         return search_planner_prompt_template.format(
-            state=state,
+            crawl_summary=state["crawl_summary"].format(),
             current_year=current_year,
             current_month=current_month,
             search_gender=config.search_gender,
@@ -32,8 +35,12 @@ async def search_planner_tool(config: CrawlerConfig, state: WebCrawlerState):
 
     while retries < config.search_plan_retry_limit:
         try:
+            prompt = search_planner_prompt(state)
+            logger.info(
+                f"Search planner prompt size at iteration {state['num_search_iterations']}: {len(prompt)} chars"
+            )
             raw_search_plan = await structured_llm.ainvoke_with_tools(
-                search_planner_prompt(state),
+                prompt,
                 tools=[get_search_plan_oai_function()],
             )
             logger.info(f"Raw search plan: {raw_search_plan}")
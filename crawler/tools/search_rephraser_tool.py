@@ -6,6 +6,7 @@ from crawler.config.config import CrawlerConfig
 from crawler.schemas.state import WebCrawlerState
 from crawler.schemas.search import SearchCategories
 from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
 from crawler.schemas.search import update_search_categories
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,9 @@ async def search_rephraser_tool(config: CrawlerConfig, state: WebCrawlerState):
     # llm = get_llm_from_config(config, config.tool_call_llm).with_structured_output(
     #     SearchCategories
     # )
-    structured_llm = get_llm_from_config(config, config.tool_call_llm)
+    structured_llm = get_llm_from_config(
+        config, config.tool_call_llm, priority=LLMPriority.CRAWLER
+    )
 
     while retries < config.search_plan_retry_limit:
         try:
@@ -1,10 +1,10 @@
 import logging
 
 from langchain_core.messages import AIMessage
-from langgraph.graph.message import add_messages
+from langchain_core.runnables import RunnableConfig
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_community.vectorstores import VectorStore
 
+from crawler.config.config import config as crawler_config
 from crawler.schemas.state import WebCrawlerState
 from crawler.schemas.search import increment_search_iterations
 from crawler.utils.search_results_processor import SearchResultProcessor
@@ -13,26 +13,59 @@ logger = logging.getLogger(__name__)
 
 
 # TODO: Improve model consistency at outputting JSON search plans
-async def search_tool(vector_store: VectorStore, state: WebCrawlerState):
+async def search_tool(
+    search_result_processor: SearchResultProcessor,
+    state: WebCrawlerState,
+    config: RunnableConfig,
+):
     logger.debug(f"State at start of search_tool: {state}")
+    # The checkpointer thread id doubles as the crawl run id
+    run_id = config["configurable"]["thread_id"]
+    query_markers = search_result_processor.query_markers
     search_plan = state[
         "search_plans"
     ]  # Assume the search planner always goes to the search tool
-    search_result_processor = SearchResultProcessor.from_vector_store(vector_store)
+    # Raw results go to the vector store, only this bounded summary is kept in the state
+    crawl_summary = state["crawl_summary"].model_copy(deep=True)
+    iteration = crawl_summary.start_iteration()
     for plan in search_plan.plans:
         logger.debug(f"Search plan: {plan}")
         tavily_search = TavilySearchResults()
         for query in plan.queries:
+            if await query_markers.is_completed(run_id, query):
+                logger.info(f"Skipping query completed before resume: {query}")
+                continue
+            crawl_summary.record_query(plan.category)
             res = AIMessage(
                 content=tavily_search.invoke({"query": query})
             )  # TODO: make res more readable
             if "HTTPError" in res.content:
                 raise ValueError(f"HTTP exception in calling Tavily API: {res}")
-            await search_result_processor.process_and_save_result(query, res)
-            add_messages(state["messages"], res)
+            res_url = res.content[0]["url"]
+            chunks = await search_result_processor.chunk(res)
+            is_new = not await search_result_processor.is_unchanged(res, chunks)
+            crawl_summary.record_page(
+                plan.category,
+                res_url,
+                is_new=is_new,
+                max_urls=crawler_config.crawl_summary_max_urls,
+            )
+            if not is_new:
+                logger.info(f"Skipping unchanged URL: {res_url}")
+                await query_markers.mark_completed(run_id, [query])
+                continue
+            await search_result_processor.process_and_save_result(
+                run_id, query, res, chunks
+            )
 
     return {
-        "messages": state["messages"],
+        "messages": [
+            AIMessage(
+                content=f"Searched {iteration.num_queries} queries, "
+                f"saved {iteration.num_new_pages} new or changed pages."
+            )
+        ],
+        "crawl_summary": crawl_summary,
         "num_search_iterations": increment_search_iterations(
             state["num_search_iterations"], 1
         ),
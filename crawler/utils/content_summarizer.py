@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import PromptTemplate
+
+from common.utils.llm import get_llm_from_config
+from common.schemas.llm import LLMPriority
+from crawler.config.config import CrawlerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ContentSummarizer(BaseModel):
+    """
+    Summarizes crawled content in batches.
+    Each batch is sent to the LLM as concurrent requests, bounded by a semaphore so the
+    vLLM backend can batch them without being flooded. The LLM client is built once,
+    and summaries are cached by content hash so identical content is only summarized once.
+    """
+
+    llm: BaseLanguageModel
+    summarize_prompt: PromptTemplate
+    cache_size: int
+    _semaphore: asyncio.Semaphore = PrivateAttr()
+    _cache: OrderedDict[str, str] = PrivateAttr(default_factory=OrderedDict)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def __init__(self, concurrency: int, **data):
+        super().__init__(**data)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    def from_config(cls, config: CrawlerConfig) -> "ContentSummarizer":
+        return cls(
+            llm=get_llm_from_config(config, priority=LLMPriority.CRAWLER),
+            summarize_prompt=PromptTemplate(
+                template=config.summarize_content_prompt, input_variables=["content"]
+            ),
+            cache_size=config.content_summary_cache_size,
+            concurrency=config.content_summary_concurrency,
+        )
+
+    async def summarize(self, contents: list[str]) -> list[Optional[str]]:
+        """
+        Summarizes a batch of contents.
+
+        Args:
+            contents (list[str]): The contents to summarize.
+
+        Returns:
+            list[Optional[str]]: One summary per content, None where summarization failed.
+        """
+        content_hashes = [
+            hashlib.sha256(content.encode("utf-8")).hexdigest() for content in contents
+        ]
+        # Identical contents in the batch share one request
+        missing = {
+            content_hash: content
+            for content_hash, content in zip(content_hashes, contents)
+            if content_hash not in self._cache
+        }
+        summaries = await asyncio.gather(
+            *(self._summarize_one(content) for content in missing.values()),
+            return_exceptions=True,
+        )
+        for content_hash, summary in zip(missing, summaries):
+            if isinstance(summary, Exception):
+                logger.error(f"Failed to summarize content: {summary}")
+                continue
+            self._cache_summary(content_hash, summary)
+        logger.info(
+            f"Requested summaries for {len(missing)} of {len(contents)} contents, the rest were cached"
+        )
+
+        results = []
+        for content_hash in content_hashes:
+            summary = self._cache.get(content_hash)
+            if summary is not None:
+                self._cache.move_to_end(content_hash)
+            results.append(summary)
+        return results
+
+    async def _summarize_one(self, content: str) -> str:
+        async with self._semaphore:
+            return AIMessage.model_validate(
+                await self.llm.ainvoke(self.summarize_prompt.format(content=content))
+            ).content
+
+    def _cache_summary(self, content_hash: str, summary: str) -> None:
+        self._cache[content_hash] = summary
+        self._cache.move_to_end(content_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import uuid
+from contextlib import suppress
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+from langchain_core.documents import Document
+from langchain_postgres import PGVector
+from sqlalchemy import Text, and_, cast, delete, func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from crawler.config.config import CrawlerConfig
+from crawler.utils.content_summarizer import ContentSummarizer
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentBuffer(BaseModel):
+    """
+    Write-behind buffer in front of the vector store.
+    Documents are accumulated and written in batches: each flush embeds the whole batch
+    with one embed_documents request and upserts it in a single multi-row INSERT.
+    The buffer flushes in the background when it reaches batch_size, so the crawl keeps
+    going while a batch is written, every flush_interval seconds, and when the crawl ends.
+    With a summarizer, documents without a content_summary are summarized as one batch
+    while the batch is being embedded.
+    The chunks of a page are added together, so they are always written in the same batch,
+    replacing every chunk previously stored for the page.
+    """
+
+    vector_store: PGVector
+    batch_size: int
+    flush_interval: float
+    summarizer: Optional[ContentSummarizer] = None
+    summary_max_characters: int
+    # Called with each batch once it has been written to the vector store
+    on_flush: Optional[Callable[[list[Document]], Awaitable[None]]] = None
+    _documents: list[Document] = PrivateAttr(default_factory=list)
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+    _flush_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _full_batch_task: Optional[asyncio.Task] = PrivateAttr(default=None)
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: CrawlerConfig,
+        vector_store: PGVector,
+        summarizer: Optional[ContentSummarizer] = None,
+        on_flush: Optional[Callable[[list[Document]], Awaitable[None]]] = None,
+    ) -> "DocumentBuffer":
+        return cls(
+            vector_store=vector_store,
+            batch_size=config.vector_store_batch_size,
+            flush_interval=config.vector_store_flush_interval,
+            summarizer=summarizer,
+            summary_max_characters=config.content_summary_max_characters,
+            on_flush=on_flush,
+        )
+
+    async def add(self, documents: list[Document]) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+        self._documents.extend(documents)
+        if len(self._documents) >= self.batch_size and (
+            self._full_batch_task is None or self._full_batch_task.done()
+        ):
+            self._full_batch_task = asyncio.create_task(self._flush_full_batches())
+
+    async def flush(self) -> None:
+        async with self._lock:
+            documents, self._documents = self._documents, []
+            if not documents:
+                return
+            texts = [document.page_content for document in documents]
+            try:
+                embeddings, _ = await asyncio.gather(
+                    self.vector_store.embeddings.aembed_documents(texts),
+                    self._summarize(documents),
+                )
+                # PGVector only supports sync writes on a sync engine, so run the upsert off the event loop
+                await asyncio.to_thread(self._write, documents, texts, embeddings)
+            except (Exception, asyncio.CancelledError):
+                # Keep the batch so the next flush retries it
+                self._documents = documents + self._documents
+                raise
+            logger.info(f"Flushed {len(documents)} documents to the vector store")
+            if self.on_flush is not None:
+                await self.on_flush(documents)
+
+    def _write(
+        self,
+        documents: list[Document],
+        texts: list[str],
+        embeddings: list[list[float]],
+    ) -> None:
+        parent_ids = list(
+            {
+                document.metadata["parent_id"]
+                for document in documents
+                if document.metadata.get("parent_id")
+            }
+        )
+        EmbeddingStore = self.vector_store.EmbeddingStore
+        # Replace the previous chunks in the same transaction, so searches never see a page
+        # without chunks or with both versions of them
+        with self.vector_store._make_sync_session() as session:
+            collection = self.vector_store.get_collection(session)
+            if not collection:
+                raise ValueError("Collection not found")
+            if parent_ids:
+                # Drop the chunks of the previous version of each page, which may have had more of them,
+                # and documents stored under the page id before pages were chunked
+                session.execute(
+                    delete(EmbeddingStore).where(
+                        or_(
+                            EmbeddingStore.id.in_(parent_ids),
+                            and_(
+                                EmbeddingStore.collection_id == collection.uuid,
+                                EmbeddingStore.cmetadata.op("->>")(
+                                    literal_column("'parent_id'")
+                                ).in_(parent_ids),
+                            ),
+                        )
+                    )
+                )
+            # Same upsert as PGVector.add_embeddings, which would commit in a session of its own
+            stmt = insert(EmbeddingStore).values(
+                [
+                    {
+                        "id": document.id or str(uuid.uuid4()),
+                        "collection_id": collection.uuid,
+                        "embedding": embedding,
+                        "document": text,
+                        "cmetadata": document.metadata,
+                    }
+                    for document, text, embedding in zip(documents, texts, embeddings)
+                ]
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["id"],
+                    set_={
+                        "embedding": stmt.excluded.embedding,
+                        "document": stmt.excluded.document,
+                        "cmetadata": stmt.excluded.cmetadata,
+                    },
+                )
+            )
+            session.commit()
+
+    async def touch(self, parent_id: str, timestamp: str) -> None:
+        """
+        Sets the timestamp of the stored chunks of an unchanged page,
+        so time-filtered retrieval still finds pages that re-crawls skip.
+        """
+        await asyncio.to_thread(self._touch, parent_id, timestamp)
+
+    def _touch(self, parent_id: str, timestamp: str) -> None:
+        EmbeddingStore = self.vector_store.EmbeddingStore
+        with self.vector_store._make_sync_session() as session:
+            collection = self.vector_store.get_collection(session)
+            if not collection:
+                raise ValueError("Collection not found")
+            session.execute(
+                update(EmbeddingStore)
+                .where(
+                    EmbeddingStore.collection_id == collection.uuid,
+                    or_(
+                        EmbeddingStore.id == parent_id,
+                        EmbeddingStore.cmetadata.op("->>")(
+                            literal_column("'parent_id'")
+                        )
+                        == parent_id,
+                    ),
+                )
+                .values(
+                    cmetadata=func.jsonb_set(
+                        EmbeddingStore.cmetadata,
+                        literal_column("'{timestamp}'"),
+                        func.to_jsonb(cast(timestamp, Text)),
+                    )
+                )
+            )
+            session.commit()
+
+    async def _summarize(self, documents: list[Document]) -> None:
+        """Summarizes each page once from its chunks, sharing the summary between them."""
+        if self.summarizer is None:
+            return
+        pages: dict[str, list[Document]] = {}
+        for document in documents:
+            if document.metadata.get("content_summary") is None:
+                pages.setdefault(
+                    document.metadata.get("parent_id") or document.id, []
+                ).append(document)
+        if not pages:
+            return
+        summaries = await self.summarizer.summarize(
+            [
+                "\n".join(chunk.page_content for chunk in chunks)[
+                    : self.summary_max_characters
+                ]
+                for chunks in pages.values()
+            ]
+        )
+        for chunks, summary in zip(pages.values(), summaries):
+            for chunk in chunks:
+                chunk.metadata["content_summary"] = summary
+
+    async def close(self) -> None:
+        """Stops the periodic flush and writes out anything still buffered."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        if self._full_batch_task is not None:
+            await self._full_batch_task
+            self._full_batch_task = None
+        await self.flush()
+
+    async def _flush_full_batches(self) -> None:
+        # Documents added while a batch is being written may fill the next one
+        while len(self._documents) >= self.batch_size:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Vector store flush failed, will retry")
+                return
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Shielded so that close() lets an in-flight flush finish writing its batch
+                # and running on_flush, the final flush then waits for it on the lock
+                await asyncio.shield(self.flush())
+            except Exception:
+                logger.exception("Periodic vector store flush failed, will retry")
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from PIL import Image as PILImage
+
+
+def get_junk_image_reason(
+    image: PILImage.Image,
+    min_width: int,
+    min_height: int,
+    max_aspect_ratio: float,
+    min_contrast: int,
+) -> Optional[str]:
+    """
+    Checks an image against cheap heuristics for tracking pixels, icons, banners and blank images.
+
+    Returns:
+        Optional[str]: Why the image should be skipped, or None if the image should be kept.
+    """
+    width, height = image.size
+    if width < min_width or height < min_height:
+        return f"image is too small ({width}x{height})"
+    if max(width, height) / min(width, height) > max_aspect_ratio:
+        return f"aspect ratio is too extreme ({width}x{height})"
+    darkest, brightest = image.convert("L").getextrema()
+    if brightest - darkest < min_contrast:
+        return "image is empty"
+    return None
+
+
+def dhash(image: PILImage.Image, hash_size: int = 8) -> int:
+    """
+    Computes the difference hash of an image.
+    Each bit records whether a pixel is brighter than its right neighbour in a
+    (hash_size + 1) x hash_size grayscale thumbnail, so re-encoded or resized copies
+    of the same image land within a few bits of each other.
+    """
+    thumbnail = image.convert("L").resize(
+        (hash_size + 1, hash_size), PILImage.Resampling.LANCZOS
+    )
+    pixels = list(thumbnail.getdata())
+    image_hash = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            image_hash = (image_hash << 1) | int(left > right)
+    return image_hash
+
+
+def hamming_distance(x: int, y: int) -> int:
+    return (x ^ y).bit_count()
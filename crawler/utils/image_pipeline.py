@@ -0,0 +1,367 @@
+import asyncio
+import logging
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+import aiohttp
+from pydantic import BaseModel, ConfigDict, Field
+from PIL import Image as PILImage
+
+from common.utils.minio import minio_put_objects, minio_presigned_get_object
+from common.schemas.image_metadata import ImageMetadata, ImageVariant
+from common.db.image_hash_index import HammingIndex, ImageHashEntry, ImageHashIndex
+from crawler.config.config import CrawlerConfig
+from crawler.utils.image_filters import dhash, get_junk_image_reason
+
+logger = logging.getLogger(__name__)
+
+# Sentinel passed down the stage queues to signal that no more items will arrive
+_DONE = object()
+
+
+class ImageItem(BaseModel):
+    """
+    An image moving through the ingestion pipeline.
+    Each stage fills in the fields it is responsible for.
+    """
+
+    index: int
+    source_url: str
+    raw_bytes: Optional[bytes] = None
+    image: Optional[PILImage.Image] = None
+    image_bytes: Optional[bytes] = None
+    content_type: Optional[str] = None
+    image_hash: Optional[int] = None
+    variant_bytes: dict[int, bytes] = Field(default_factory=dict)
+    object_name: Optional[str] = None
+    variant_object_names: dict[int, str] = Field(default_factory=dict)
+    url: Optional[str] = None
+    variants: list[ImageVariant] = Field(default_factory=list)
+    summary: Optional[str] = None
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+class ImageIngestionPipeline(BaseModel):
+    """
+    Staged async pipeline that downloads, decodes, deduplicates, uploads and summarizes images.
+    Stages are connected by bounded queues so a slow stage applies backpressure
+    to the ones before it, and a failing image is dropped without stalling the rest.
+    Junk images are filtered out while decoding, and images the ImageHashIndex has
+    already seen reuse the stored object and summary instead of being uploaded again.
+    Each stored image also gets downscaled WebP variants for display at thumbnail size.
+    """
+
+    summarize_image: Callable[[PILImage.Image], Awaitable[str]]
+    image_hash_index: Optional[ImageHashIndex] = None
+    minio_bucket: str
+    queue_size: int
+    download_concurrency: int
+    download_timeout: float
+    max_bytes: int
+    decode_workers: int
+    upload_concurrency: int
+    summarize_concurrency: int
+    min_width: int
+    min_height: int
+    max_aspect_ratio: float
+    min_contrast: int
+    hash_max_distance: int
+    variant_sizes: list[int]
+    variant_quality: int
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @classmethod
+    def from_config(
+        cls,
+        config: CrawlerConfig,
+        summarize_image: Callable[[PILImage.Image], Awaitable[str]],
+        image_hash_index: Optional[ImageHashIndex] = None,
+    ) -> "ImageIngestionPipeline":
+        return cls(
+            summarize_image=summarize_image,
+            image_hash_index=image_hash_index,
+            minio_bucket=config.minio_bucket,
+            queue_size=config.image_pipeline_queue_size,
+            download_concurrency=config.image_download_concurrency,
+            download_timeout=config.image_download_timeout,
+            max_bytes=config.image_max_bytes,
+            decode_workers=config.image_decode_workers,
+            upload_concurrency=config.image_upload_concurrency,
+            summarize_concurrency=config.image_summarize_concurrency,
+            min_width=config.image_min_width,
+            min_height=config.image_min_height,
+            max_aspect_ratio=config.image_max_aspect_ratio,
+            min_contrast=config.image_min_contrast,
+            hash_max_distance=config.image_hash_max_distance,
+            variant_sizes=config.image_variant_sizes,
+            variant_quality=config.image_variant_quality,
+        )
+
+    async def run(self, image_urls: list[str]) -> list[ImageMetadata]:
+        """
+        Runs every image URL through the pipeline.
+
+        Args:
+            image_urls (list[str]): The image URLs scraped from a web page.
+
+        Returns:
+            list[ImageMetadata]: Metadata for the images that made it through every stage,
+            in the order their URLs were given.
+        """
+        download_queue = asyncio.Queue(maxsize=self.queue_size)
+        decode_queue = asyncio.Queue(maxsize=self.queue_size)
+        dedup_queue = asyncio.Queue(maxsize=self.queue_size)
+        upload_queue = asyncio.Queue(maxsize=self.queue_size)
+        summarize_queue = asyncio.Queue(maxsize=self.queue_size)
+        results: list[ImageItem] = []
+        # Near-duplicates within the same page are dropped rather than resolved
+        seen_hashes = HammingIndex(self.hash_max_distance)
+
+        async def collect(item: ImageItem) -> None:
+            results.append(item)
+
+        timeout = aiohttp.ClientTimeout(total=self.download_timeout)
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as executor:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                await asyncio.gather(
+                    self._feed(image_urls, download_queue),
+                    self._run_stage(
+                        "download",
+                        lambda item: self._download(session, item),
+                        download_queue,
+                        decode_queue,
+                        self.download_concurrency,
+                    ),
+                    self._run_stage(
+                        "decode",
+                        lambda item: self._decode(executor, item),
+                        decode_queue,
+                        dedup_queue,
+                        self.decode_workers,
+                    ),
+                    self._run_stage(
+                        "dedup",
+                        lambda item: self._dedup(seen_hashes, collect, item),
+                        dedup_queue,
+                        upload_queue,
+                        1,
+                    ),
+                    self._run_stage(
+                        "upload",
+                        self._upload,
+                        upload_queue,
+                        summarize_queue,
+                        self.upload_concurrency,
+                    ),
+                    self._run_stage(
+                        "summarize",
+                        self._summarize,
+                        summarize_queue,
+                        None,
+                        self.summarize_concurrency,
+                        on_result=collect,
+                    ),
+                )
+
+        results.sort(key=lambda item: item.index)
+        logger.info(f"Ingested {len(results)} of {len(image_urls)} images")
+        return [
+            ImageMetadata(url=item.url, summary=item.summary, variants=item.variants)
+            for item in results
+        ]
+
+    @staticmethod
+    async def _feed(image_urls: list[str], queue: asyncio.Queue) -> None:
+        for index, image_url in enumerate(image_urls):
+            await queue.put(ImageItem(index=index, source_url=image_url))
+        await queue.put(_DONE)
+
+    @staticmethod
+    async def _run_stage(
+        name: str,
+        process: Callable[[Any], Awaitable[Optional[Any]]],
+        in_queue: asyncio.Queue,
+        out_queue: Optional[asyncio.Queue],
+        concurrency: int,
+        on_result: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Runs `concurrency` workers that pull from in_queue until the sentinel arrives.
+        Items that raise or return None are dropped. When every worker has stopped,
+        the sentinel is passed on to the next stage.
+        """
+
+        async def worker() -> None:
+            while True:
+                item = await in_queue.get()
+                if item is _DONE:
+                    # Put the sentinel back so the sibling workers also stop
+                    await in_queue.put(_DONE)
+                    return
+                try:
+                    result = await process(item)
+                except Exception:
+                    logger.exception(f"Image {name} stage failed: {item.source_url}")
+                    logger.warning(f"Skipping image: {item.source_url}")
+                    continue
+                if result is None:
+                    continue
+                if on_result:
+                    await on_result(result)
+                if out_queue is not None:
+                    await out_queue.put(result)
+
+        await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+        if out_queue is not None:
+            await out_queue.put(_DONE)
+
+    async def _download(
+        self, session: aiohttp.ClientSession, item: ImageItem
+    ) -> ImageItem:
+        async with session.get(item.source_url) as response:
+            response.raise_for_status()
+            if (response.content_length or 0) > self.max_bytes:
+                raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+            raw_bytes = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                raw_bytes.extend(chunk)
+                if len(raw_bytes) > self.max_bytes:
+                    raise ValueError(f"Image is larger than {self.max_bytes} bytes")
+        item.raw_bytes = bytes(raw_bytes)
+        return item
+
+    async def _decode(
+        self, executor: ThreadPoolExecutor, item: ImageItem
+    ) -> Optional[ImageItem]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._decode_image, item)
+
+    def _decode_image(self, item: ImageItem) -> Optional[ImageItem]:
+        """
+        Decodes, filters, hashes, re-encodes and downscales the image off the event loop.
+        Fully loading the pixels here surfaces truncated or corrupt images before upload.
+        """
+        # TODO: Consider the security implications of opening images from the internet into memory here
+        image = PILImage.open(BytesIO(item.raw_bytes))
+        image.load()
+        junk_reason = get_junk_image_reason(
+            image,
+            min_width=self.min_width,
+            min_height=self.min_height,
+            max_aspect_ratio=self.max_aspect_ratio,
+            min_contrast=self.min_contrast,
+        )
+        if junk_reason:
+            logger.debug(f"Skipping image {item.source_url}: {junk_reason}")
+            return None
+        item.image_hash = dhash(image)
+        image_format = image.format or "PNG"
+        # Save the image to a BytesIO object to preserve format and metadata
+        image_bytes_io = BytesIO()
+        image.save(image_bytes_io, format=image_format)
+        item.image = image
+        item.image_bytes = image_bytes_io.getvalue()
+        item.content_type = PILImage.MIME.get(
+            image_format.upper(), "application/octet-stream"
+        )
+        item.variant_bytes = self._make_variants(image)
+        item.raw_bytes = None
+        return item
+
+    def _make_variants(self, image: PILImage.Image) -> dict[int, bytes]:
+        """
+        Encodes a WebP copy of the image for each variant size smaller than the image.
+        """
+        variants = {}
+        for max_size in sorted(self.variant_sizes):
+            if max(image.size) <= max_size:
+                break
+            variant = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            variant.thumbnail((max_size, max_size), PILImage.Resampling.LANCZOS)
+            variant_bytes_io = BytesIO()
+            variant.save(variant_bytes_io, format="WEBP", quality=self.variant_quality)
+            variants[max_size] = variant_bytes_io.getvalue()
+        return variants
+
+    async def _dedup(
+        self,
+        seen_hashes: HammingIndex,
+        collect: Callable[[ImageItem], Awaitable[None]],
+        item: ImageItem,
+    ) -> Optional[ImageItem]:
+        """
+        Drops near-duplicates of images already on this page, and resolves images
+        stored by previous crawls to their existing object and summary.
+        """
+        if seen_hashes.find(item.image_hash) is not None:
+            logger.debug(f"Skipping duplicate image on page: {item.source_url}")
+            return None
+        seen_hashes.add(item.image_hash)
+
+        match = (
+            self.image_hash_index.find(item.image_hash)
+            if self.image_hash_index
+            else None
+        )
+        if match is None:
+            return item
+
+        logger.debug(f"Reusing stored image {match.object_name}: {item.source_url}")
+        item.object_name = match.object_name
+        item.url = await asyncio.to_thread(
+            minio_presigned_get_object, self.minio_bucket, match.object_name
+        )
+        item.variants = [
+            ImageVariant(
+                url=await asyncio.to_thread(
+                    minio_presigned_get_object, self.minio_bucket, object_name
+                ),
+                max_size=max_size,
+            )
+            for max_size, object_name in sorted(match.variant_object_names.items())
+        ]
+        item.summary = match.summary
+        item.image = None
+        item.image_bytes = None
+        item.variant_bytes = {}
+        await collect(item)
+        return None
+
+    @staticmethod
+    async def _upload(item: ImageItem) -> ImageItem:
+        # The minio SDK is blocking, so the original and its variants are
+        # uploaded together through the shared upload thread pool
+        variant_sizes = sorted(item.variant_bytes)
+        minio_response, *variant_responses = await asyncio.to_thread(
+            minio_put_objects,
+            [(BytesIO(item.image_bytes), item.content_type)]
+            + [
+                (BytesIO(item.variant_bytes[max_size]), "image/webp")
+                for max_size in variant_sizes
+            ],
+        )
+        item.object_name = minio_response.file_name
+        item.url = minio_response.url
+        for max_size, variant_response in zip(variant_sizes, variant_responses):
+            item.variant_object_names[max_size] = variant_response.file_name
+            item.variants.append(
+                ImageVariant(url=variant_response.url, max_size=max_size)
+            )
+        item.variant_bytes = {}
+        return item
+
+    async def _summarize(self, item: ImageItem) -> ImageItem:
+        item.summary = await self.summarize_image(item.image)
+        item.image = None
+        item.image_bytes = None
+        if self.image_hash_index:
+            await self.image_hash_index.add(
+                ImageHashEntry(
+                    image_hash=item.image_hash,
+                    object_name=item.object_name,
+                    variant_object_names=item.variant_object_names,
+                    summary=item.summary,
+                )
+            )
+        return item
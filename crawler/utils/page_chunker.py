@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+from pydantic import BaseModel
+from unstructured.chunking.title import chunk_by_title
+
+from common.utils.unstructured_io import partition_web_page
+from crawler.config.config import CrawlerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class PageChunker(BaseModel):
+    """
+    Splits a crawled web page into chunks for embedding.
+    The page is partitioned with unstructured.io and chunked by title, so chunks follow
+    the page's sections: a section is never merged into the previous one once that one
+    has new_after_n_chars, small sections are combined, and long ones are split at max_characters.
+    """
+
+    max_characters: int
+    new_after_n_chars: int
+    combine_text_under_n_chars: int
+
+    @classmethod
+    def from_config(cls, config: CrawlerConfig) -> "PageChunker":
+        return cls(
+            max_characters=config.chunk_max_characters,
+            new_after_n_chars=config.chunk_new_after_n_chars,
+            combine_text_under_n_chars=config.chunk_combine_text_under_n_chars,
+        )
+
+    async def chunk(self, url: str, fallback_content: str) -> list[str]:
+        """
+        Chunks the web page at url.
+        Falls back to fallback_content as a single chunk if the page can't be partitioned.
+
+        Args:
+            url (str): The URL of the web page.
+            fallback_content (str): The content to use if partitioning fails, e.g. the search result snippet.
+
+        Returns:
+            list[str]: The chunk texts in page order.
+        """
+        try:
+            # partition_html downloads and parses the page synchronously
+            elements = await asyncio.to_thread(partition_web_page, url)
+            chunks = chunk_by_title(
+                elements,
+                max_characters=self.max_characters,
+                new_after_n_chars=self.new_after_n_chars,
+                combine_text_under_n_chars=self.combine_text_under_n_chars,
+            )
+        except Exception:
+            logger.exception(f"Error partitioning web page {url}:")
+            return [fallback_content]
+        texts = [text for chunk in chunks if (text := chunk.text.strip())]
+        logger.info(f"Split {url} into {len(texts)} chunks")
+        return texts or [fallback_content]
@@ -1,89 +1,188 @@
-import requests
+import asyncio
 import logging
 from datetime import datetime
 import base64
+import hashlib
+from uuid import uuid4
 from io import BytesIO
 
 from pydantic import BaseModel, ConfigDict
 from PIL import Image as PILImage
 from langchain_core.documents import Document
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_community.vectorstores import VectorStore
-from unstructured.documents.elements import Image
+from langchain_postgres import PGVector
 from playwright.async_api import async_playwright
 
 from common.utils.llm import get_llm_from_config
-from common.utils.minio import minio_put_object
-from common.utils.unstructured_io import partition_web_page
-from langchain_core.prompts import PromptTemplate
+from common.schemas.llm import LLMPriority
+from common.utils.chunks import get_chunk_id
 from common.schemas.vector_metadata import VectorMetadata
 from common.schemas.image_metadata import ImageMetadata
-from crawler.config.config import config
+from common.db.image_hash_index import ImageHashIndex
+from common.db.url_index import UrlIndex
+from common.db.query_markers import QueryMarkers
+from crawler.config.config import config, CrawlerConfig
+from crawler.utils.image_pipeline import ImageIngestionPipeline
+from crawler.utils.document_buffer import DocumentBuffer
+from crawler.utils.content_summarizer import ContentSummarizer
+from crawler.utils.page_chunker import PageChunker
 
 logger = logging.getLogger(__name__)
 
 
 class SearchResultProcessor(BaseModel):
-    vector_store: VectorStore
+    document_buffer: DocumentBuffer
+    image_hash_index: ImageHashIndex
+    url_index: UrlIndex
+    query_markers: QueryMarkers
+    page_chunker: PageChunker
     model_config: ConfigDict = ConfigDict(arbitrary_types_allowed=True)
 
     @classmethod
-    def from_vector_store(cls, vector_store: VectorStore):
+    async def from_config(cls, config: CrawlerConfig, vector_store: PGVector):
         """
-        Creates a SearchResultProcessor instance from a VectorStore.
+        Creates a SearchResultProcessor instance from a config and a VectorStore.
+        Loads the image hash index, URL index and query markers once,
+        so they are shared by every search result in the crawl.
 
         Args:
-            vector_store (VectorStore): The vector store to use for processing search results.
+            config (CrawlerConfig): The crawler config.
+            vector_store (PGVector): The vector store to save processed search results to.
 
         Returns:
             SearchResultProcessor: An instance of SearchResultProcessor.
         """
-        return cls(vector_store=vector_store)
+        url_index = await UrlIndex.from_config(config)
+        query_markers = await QueryMarkers.from_config(config)
 
-    async def process_and_save_result(self, query: str, tavily_res: AIMessage) -> None:
+        async def record_flushed(documents: list[Document]) -> None:
+            await url_index.record([document.metadata["url"] for document in documents])
+            await query_markers.record(
+                [document.metadata["query"] for document in documents]
+            )
+
+        return cls(
+            document_buffer=DocumentBuffer.from_config(
+                config,
+                vector_store,
+                summarizer=ContentSummarizer.from_config(config),
+                on_flush=record_flushed,
+            ),
+            image_hash_index=await ImageHashIndex.from_config(config),
+            url_index=url_index,
+            query_markers=query_markers,
+            page_chunker=PageChunker.from_config(config),
+        )
+
+    async def chunk(self, tavily_res: AIMessage) -> list[str]:
+        """
+        Chunks the page of a search result, falling back to Tavily's content if the page can't be partitioned.
+
+        Args:
+            tavily_res (AIMessage): The search result from Tavily.
+
+        Returns:
+            list[str]: The chunk texts in page order.
+        """
+        return await self.page_chunker.chunk(
+            tavily_res.content[0]["url"], tavily_res.content[0]["content"]
+        )
+
+    async def is_unchanged(self, tavily_res: AIMessage, chunks: list[str]) -> bool:
+        """
+        Checks whether a search result was already saved with identical content.
+        The content hash is taken over the page's chunks rather than Tavily's content,
+        which depends on the query the page was found with.
+        Unchanged pages are only marked as seen and get a fresh timestamp in the vector store,
+        so re-crawls skip image ingestion, the LLM and embedding for them
+        while time-filtered retrieval still finds them.
+
+        Args:
+            tavily_res (AIMessage): The search result from Tavily.
+            chunks (list[str]): The chunks of the page.
+
+        Returns:
+            bool: True if the page is already indexed with the same content.
+        """
+        res_url = tavily_res.content[0]["url"]
+        entry = await self.url_index.lookup(res_url)
+        if entry is None or entry.content_hash != self._hash_chunks(chunks):
+            return False
+        await asyncio.gather(
+            self.url_index.touch(res_url),
+            self.document_buffer.touch(entry.document_id, datetime.now().isoformat()),
+        )
+        return True
+
+    async def process_and_save_result(
+        self, run_id: str, query: str, tavily_res: AIMessage, chunks: list[str]
+    ) -> None:
         """
         Processes and saves a search result from Tavily.
+        The chunks of the page share its metadata and parent id,
+        and are embedded in batches by the document buffer.
+        The query is marked completed for the run once its document has been written to the vector store.
 
         Args:
+            run_id (str): The id of the crawl run.
             query (str): The search query.
             tavily_res (AIMessage): The search result from Tavily.
+            chunks (list[str]): The chunks of the page.
 
         Returns:
             None
         """
-        res_content = tavily_res.content[0][
-            "content"
-        ]  # TODO: Find a better way to break the content down into finer chunks
-        # TODO: Break down the content into chunks with unstructured.io
         res_url = tavily_res.content[0]["url"]
         logger.info(f"Query: {query}")
         logger.info(f"Searching URL: {res_url}")
 
         image_metadata = await self.extract_tavily_res_images(res_url)
 
+        content_hash = self._hash_chunks(chunks)
+        # Reuse the id of a changed page so its chunks are replaced instead of duplicated
+        entry = await self.url_index.lookup(res_url)
+        parent_id = entry.document_id if entry else str(uuid4())
+
         metadata = VectorMetadata(
             query=query,
             url=res_url,
             image_metadata=image_metadata,
+            parent_id=parent_id,
             timestamp=datetime.now().isoformat(),
             source_type="web_page",
-            content_summary=await self.summarize_content(res_content),
+            # content_summary is filled in by the document buffer, which summarizes whole batches at once
             relevance_score=0.85,  # TODO: Generate a relevance score at crawl time with the LLM
+            content_hash=content_hash,
         ).model_dump(mode="json")
         logger.info(f"Metadata: {metadata}")
 
-        # TODO: Should we embed by page content or by summary?
-        # text_chunks = partition_web_page(res_url)
-        doc = Document(
-            page_content=res_content,
-            metadata=metadata,
-        )
-        logger.info(f"Adding document to vector store: {doc}")
-        self.vector_store.add_documents(documents=[doc])
+        docs = [
+            Document(
+                id=(chunk_id := get_chunk_id(parent_id, chunk_index)),
+                page_content=chunk,
+                metadata={**metadata, "chunk_id": chunk_id, "chunk_index": chunk_index},
+            )
+            for chunk_index, chunk in enumerate(chunks)
+        ]
+        logger.info(f"Adding {len(docs)} chunks of {res_url} to the vector store")
+        self.url_index.mark_pending(res_url, parent_id, content_hash)
+        self.query_markers.mark_pending(run_id, query)
+        await self.document_buffer.add(docs)
+
+    @staticmethod
+    def _hash_chunks(chunks: list[str]) -> str:
+        return hashlib.sha256("\n\n".join(chunks).encode("utf-8")).hexdigest()
+
+    async def close(self) -> None:
+        """
+        Flushes any documents still buffered for the vector store. Call once the crawl ends.
+        """
+        await self.document_buffer.close()
 
     async def extract_tavily_res_images(self, url: str) -> list[dict]:
         """
         Extracts all images and other media from the Tavily search results and stores them in Minio.
+        Images are downloaded, decoded, uploaded and summarized concurrently by the ImageIngestionPipeline.
         Returns presigned URLs to use in the metadata of the document the images etc. were extracted from.
 
         Args:
@@ -101,32 +200,10 @@ class SearchResultProcessor(BaseModel):
             )
             return []
 
-        res: list[ImageMetadata] = []
-        for image_url in image_urls:
-            try:
-                # TODO: Consider the security implications of opening images from the internet into memory here
-                # TODO: Come up with a method for filtering out EMPTY and DUPLICATE images
-                image = PILImage.open(requests.get(image_url, stream=True).raw)
-            except Exception:
-                logger.exception(f"Error opening image: {image_url}")
-                logger.warning(f"Skipping image: {image_url}")
-                continue
-            content_type = (
-                "image/jpeg"
-                if image.format.lower() == "jpeg" or image.format.lower() == "jpg"
-                else "image/png"
-            )
-            # Save the image to a BytesIO object to preserve format and metadata
-            # TODO: Come up with a method for filtering out EMPTY and DUPLICATE images
-            image_bytes_io = BytesIO()
-            image.save(image_bytes_io, format=image.format)
-            image_bytes_io.seek(0)
-            minio_response = minio_put_object(image_bytes_io, content_type)
-            res.append(
-                ImageMetadata(
-                    url=minio_response.url, summary=await self.summarize_image(image)
-                )
-            )
+        pipeline = ImageIngestionPipeline.from_config(
+            config, self.summarize_image, self.image_hash_index
+        )
+        res: list[ImageMetadata] = await pipeline.run(image_urls)
         return [metadata.model_dump() for metadata in res]
 
     async def summarize_image(self, image: PILImage.Image) -> str:
@@ -143,7 +220,9 @@ class SearchResultProcessor(BaseModel):
         if config.vision_llm != "gpt-4o":
             return "No image summary available"
 
-        llm = get_llm_from_config(config, llm=config.vision_llm)
+        llm = get_llm_from_config(
+            config, llm=config.vision_llm, priority=LLMPriority.CRAWLER
+        )
         # Encode the image as base64
         buffered = BytesIO()
         image_format = image.format.upper()
@@ -168,24 +247,6 @@ class SearchResultProcessor(BaseModel):
         ]
         return AIMessage.model_validate(await llm.ainvoke(messages)).content
 
-    async def summarize_content(self, content: str) -> str:
-        """
-        Summarizes the given content using an LLM.
-
-        Args:
-            content (str): The content to summarize.
-
-        Returns:
-            str: A summary of the content.
-        """
-        llm = get_llm_from_config(config)
-        summarize_prompt = PromptTemplate(
-            template=config.summarize_content_prompt, input_variables=["content"]
-        )
-        return AIMessage.model_validate(
-            await llm.ainvoke(summarize_prompt.format(content=content))
-        ).content
-
     async def scrape_images_from_page(self, url: str) -> list[str]:
         """
         Scrapes all image URLs from a given web page.
@@ -0,0 +1,73 @@
+"""
+Microbenchmark of the vectorized MMR re-ranker against langchain_postgres' MMR loop.
+
+Sweeps k and fetch_k over random normalized candidate embeddings; no database needed.
+
+Usage:
+    python -m tests.benchmarks.bench_mmr [--dim 768] [--repeats 50]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+from langchain_postgres._utils import (
+    maximal_marginal_relevance as langchain_maximal_marginal_relevance,
+)
+
+from common.utils.mmr import maximal_marginal_relevance, normalize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--ks", type=int, nargs="+", default=[4, 10, 20])
+    parser.add_argument(
+        "--fetch-ks", type=int, nargs="+", default=[20, 50, 100, 200, 500]
+    )
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(
+        f"{'k':>4} {'fetch_k':>8} {'langchain':>12} {'vectorized':>12} {'speedup':>8}"
+    )
+    for fetch_k in args.fetch_ks:
+        candidates = normalize(
+            rng.standard_normal((fetch_k, args.dim), dtype=np.float32)
+        )
+        query = normalize(rng.standard_normal(args.dim, dtype=np.float32))
+        # langchain_postgres receives the embeddings as a list of pgvector arrays
+        candidate_list = list(candidates)
+        for k in args.ks:
+            if k > fetch_k:
+                continue
+            assert maximal_marginal_relevance(
+                query, candidates, k
+            ) == langchain_maximal_marginal_relevance(query, candidate_list, k=k)
+            langchain_ms = (
+                timeit.timeit(
+                    lambda: langchain_maximal_marginal_relevance(
+                        query, candidate_list, k=k
+                    ),
+                    number=args.repeats,
+                )
+                / args.repeats
+                * 1000
+            )
+            vectorized_ms = (
+                timeit.timeit(
+                    lambda: maximal_marginal_relevance(query, candidates, k),
+                    number=args.repeats,
+                )
+                / args.repeats
+                * 1000
+            )
+            print(
+                f"{k:>4} {fetch_k:>8} {langchain_ms:>10.3f}ms {vectorized_ms:>10.3f}ms "
+                f"{langchain_ms / vectorized_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmarks the vector index quantization modes: full precision, halfvec and binary quantized HNSW.
+
+For each mode reports the index size, collection size (table and index), build time, query latency
+and recall@k, with and without re-scoring a shortlist at full precision. Recall is measured against
+exact nearest neighbours computed in NumPy.
+Needs a running Postgres with pgvector >= 0.7 (the docker compose database).
+
+Usage:
+    python -m tests.benchmarks.bench_quantization --sizes 10000 100000 --rescore-ks 40 100 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+import psycopg
+
+from backend.app.config.config import backend_config
+from common.db.postgres import get_postgres_connection_string
+from common.db.vector_index import get_indexed_expression
+from tests.benchmarks.bench_vector_index import (
+    TABLE_NAME,
+    exact_neighbours,
+    load_vectors,
+    recall_at_k,
+)
+
+
+def get_index_distance(quantization: str, dim: int) -> str:
+    # Same expressions PgVectorStore queries the quantized indexes with
+    match quantization:
+        case "none":
+            return "embedding <=> %(query)s::vector"
+        case "halfvec":
+            return f"embedding::halfvec({dim}) <=> %(query)s::halfvec({dim})"
+        case "binary":
+            return f"binary_quantize(embedding)::bit({dim}) <~> binary_quantize(%(query)s::vector({dim}))"
+
+
+def run_queries(
+    conn: psycopg.Connection,
+    queries: np.ndarray,
+    index_distance: str,
+    k: int,
+    rescore_k: int,
+) -> tuple[list[list[int]], list[float]]:
+    sql = f"""
+        SELECT id FROM (
+            SELECT id, embedding <=> %(query)s::vector AS distance
+            FROM {TABLE_NAME}
+            ORDER BY {index_distance}
+            LIMIT %(rescore_k)s
+        ) shortlist
+        ORDER BY distance
+        LIMIT %(k)s
+        """
+    results, latencies = [], []
+    for query in queries:
+        literal = "[" + ",".join(f"{x:.6f}" for x in query) + "]"
+        start = time.perf_counter()
+        rows = conn.execute(
+            sql, {"query": literal, "rescore_k": rescore_k, "k": k}
+        ).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([row[0] for row in rows])
+    return results, latencies
+
+
+def bench_size(conn: psycopg.Connection, size: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(size, args.num_queries, replace=False)]
+    queries = queries + rng.normal(0, 0.05, queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"\n{size} vectors, dim {args.dim}")
+    load_vectors(conn, vectors)
+    truth = exact_neighbours(vectors, queries, args.k)
+    table_mb = (
+        conn.execute(f"SELECT pg_table_size('{TABLE_NAME}')").fetchone()[0] / 1024**2
+    )
+    print(f"  table {table_mb:.1f} MiB")
+
+    options = (
+        f"m = {backend_config.vector_index_hnsw_m}, "
+        f"ef_construction = {backend_config.vector_index_hnsw_ef_construction}"
+    )
+    for quantization in ["none", "halfvec", "binary"]:
+        conn.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_ann")
+        start = time.perf_counter()
+        conn.execute(
+            f"CREATE INDEX {TABLE_NAME}_ann ON {TABLE_NAME} USING hnsw "
+            f"({get_indexed_expression(quantization, args.dim)}) WITH ({options})"
+        )
+        build_time = time.perf_counter() - start
+        index_mb = (
+            conn.execute(f"SELECT pg_relation_size('{TABLE_NAME}_ann')").fetchone()[0]
+            / 1024**2
+        )
+        print(
+            f"  {quantization}: index {index_mb:.1f} MiB, collection {table_mb + index_mb:.1f} MiB, "
+            f"built in {build_time:.1f}s"
+        )
+        index_distance = get_index_distance(quantization, args.dim)
+        # Without re-scoring the top k by quantized distance are returned as they are
+        for rescore_k in [args.k] + [r for r in args.rescore_ks if r > args.k]:
+            conn.execute(
+                f"SET hnsw.ef_search = {max(backend_config.vector_index_hnsw_ef_search, rescore_k)}"
+            )
+            results, latencies = run_queries(
+                conn, queries, index_distance, args.k, rescore_k
+            )
+            if quantization == "none":
+                label = "full precision"
+            elif rescore_k == args.k:
+                label = "no rescoring"
+            else:
+                label = f"rescore_k={rescore_k}"
+            print(
+                f"    {label:<20} recall@k={recall_at_k(results, truth):.3f} "
+                f"p50={np.percentile(latencies, 50):.2f}ms p95={np.percentile(latencies, 95):.2f}ms"
+            )
+            if quantization == "none":
+                break
+        conn.execute(f"DROP INDEX {TABLE_NAME}_ann")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=backend_config.embedding_dimension)
+    parser.add_argument("--k", type=int, default=backend_config.vector_search_fetch_k)
+    parser.add_argument(
+        "--rescore-ks",
+        type=int,
+        nargs="+",
+        default=[backend_config.vector_index_rescore_k, 200],
+    )
+    parser.add_argument("--num-queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with psycopg.connect(
+        get_postgres_connection_string(backend_config), autocommit=True
+    ) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute("SET maintenance_work_mem = '1GB'")
+        try:
+            for size in args.sizes:
+                bench_size(conn, size, args)
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
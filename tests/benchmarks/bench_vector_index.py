@@ -0,0 +1,147 @@
+"""
+Benchmarks recall@k against query latency for HNSW and IVFFlat pgvector indexes.
+
+Loads random unit vectors into a scratch table for each corpus size, builds each index type,
+and sweeps ef_search / probes. Recall is measured against exact nearest neighbours computed in NumPy.
+Needs a running Postgres with pgvector >= 0.5 (the docker compose database).
+
+Usage:
+    python -m tests.benchmarks.bench_vector_index --sizes 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import psycopg
+
+from backend.app.config.config import backend_config
+from common.db.postgres import get_postgres_connection_string
+
+TABLE_NAME = "bench_vector_index"
+
+
+def load_vectors(conn: psycopg.Connection, vectors: np.ndarray) -> None:
+    dim = vectors.shape[1]
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+    conn.execute(
+        f"CREATE TABLE {TABLE_NAME} (id bigint PRIMARY KEY, embedding vector({dim}))"
+    )
+    with conn.cursor().copy(f"COPY {TABLE_NAME} (id, embedding) FROM STDIN") as copy:
+        for i, vector in enumerate(vectors):
+            copy.write_row((i, "[" + ",".join(f"{x:.6f}" for x in vector) + "]"))
+    conn.execute(f"ANALYZE {TABLE_NAME}")
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    # Vectors are unit length, so the largest dot products are the smallest cosine distances
+    neighbours = []
+    for chunk in np.array_split(queries, max(len(queries) // 16, 1)):
+        scores = chunk @ vectors.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        neighbours.append(np.take_along_axis(top, order, axis=1))
+    return np.concatenate(neighbours)
+
+
+def run_queries(
+    conn: psycopg.Connection, queries: np.ndarray, k: int
+) -> tuple[list[list[int]], list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        literal = "[" + ",".join(f"{x:.6f}" for x in query) + "]"
+        start = time.perf_counter()
+        rows = conn.execute(
+            f"SELECT id FROM {TABLE_NAME} ORDER BY embedding <=> %s::vector LIMIT %s",
+            (literal, k),
+        ).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([row[0] for row in rows])
+    return results, latencies
+
+
+def recall_at_k(results: list[list[int]], truth: np.ndarray) -> float:
+    return float(
+        np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+    )
+
+
+def report(label: str, results, latencies, truth) -> None:
+    print(
+        f"  {label:<28} recall@k={recall_at_k(results, truth):.3f} "
+        f"p50={np.percentile(latencies, 50):.2f}ms p95={np.percentile(latencies, 95):.2f}ms"
+    )
+
+
+def bench_size(conn: psycopg.Connection, size: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(size, args.num_queries, replace=False)]
+    queries = queries + rng.normal(0, 0.05, queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"\n{size} vectors, dim {args.dim}")
+    load_vectors(conn, vectors)
+    truth = exact_neighbours(vectors, queries, args.k)
+
+    results, latencies = run_queries(conn, queries, args.k)
+    report("exact scan", results, latencies, truth)
+
+    indexes = {
+        "hnsw": (
+            f"m = {backend_config.vector_index_hnsw_m}, "
+            f"ef_construction = {backend_config.vector_index_hnsw_ef_construction}",
+            "hnsw.ef_search",
+            [10, 40, 100, 200],
+        ),
+        "ivfflat": (
+            f"lists = {max(size // 1000, 10)}",
+            "ivfflat.probes",
+            [1, 5, 10, 40],
+        ),
+    }
+    for index_type, (options, setting, values) in indexes.items():
+        conn.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_ann")
+        start = time.perf_counter()
+        conn.execute(
+            f"CREATE INDEX {TABLE_NAME}_ann ON {TABLE_NAME} "
+            f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+        )
+        size_mb = (
+            conn.execute(f"SELECT pg_relation_size('{TABLE_NAME}_ann')").fetchone()[0]
+            / 1024**2
+        )
+        print(
+            f"  {index_type} ({options}) built in {time.perf_counter() - start:.1f}s, "
+            f"{size_mb:.1f} MiB"
+        )
+        for value in values:
+            conn.execute(f"SET {setting} = {value}")
+            results, latencies = run_queries(conn, queries, args.k)
+            report(f"{setting}={value}", results, latencies, truth)
+        conn.execute(f"DROP INDEX {TABLE_NAME}_ann")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=backend_config.embedding_dimension)
+    parser.add_argument("--k", type=int, default=backend_config.vector_search_fetch_k)
+    parser.add_argument("--num-queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with psycopg.connect(
+        get_postgres_connection_string(backend_config), autocommit=True
+    ) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute("SET maintenance_work_mem = '1GB'")
+        try:
+            for size in args.sizes:
+                bench_size(conn, size, args)
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
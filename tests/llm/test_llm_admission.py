@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, Optional
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import LLMAdmissionController
+from common.utils.llm_router import LLMBackendHealth, LLMRouter, LLMRouterBackend
+
+
+class SlowChatModel(BaseChatModel):
+    """Answers every prompt with "done" after delay seconds."""
+
+    delay: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _generate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage("done"))])
+
+
+def get_router(
+    admission: LLMAdmissionController,
+    delay: float,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+    health: Optional[LLMBackendHealth] = None,
+) -> LLMRouter:
+    return LLMRouter(
+        backends=[
+            LLMRouterBackend(
+                llm=SlowChatModel(delay=delay),
+                health=health
+                or LLMBackendHealth(
+                    llm="slow",
+                    failure_threshold=3,
+                    reset_seconds=60,
+                    hedge_percentile=95,
+                    hedge_min_samples=5,
+                    latency_window=100,
+                ),
+                admission=admission,
+                priority=priority,
+            )
+        ],
+        timeout=5.0,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cancelled_calls_release_their_slots() -> None:
+    admission = LLMAdmissionController(backend="stub", max_concurrency=2)
+    router = get_router(admission, delay=10.0)
+
+    calls = [asyncio.create_task(router.ainvoke("Hi")) for _ in range(4)]
+    await asyncio.sleep(0.05)
+    assert admission.stats.in_flight == 2
+    assert admission.queue_depth == 2
+
+    for call in calls:
+        call.cancel()
+    await asyncio.gather(*calls, return_exceptions=True)
+
+    assert admission.stats.in_flight == 0
+    assert admission.queue_depth == 0
+    response = await asyncio.wait_for(get_router(admission, 0.0).ainvoke("Hi"), 1.0)
+    assert response.content == "done"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedge_losers_release_their_slots() -> None:
+    admission = LLMAdmissionController(backend="stub", max_concurrency=4)
+    health = LLMBackendHealth(
+        llm="slow",
+        failure_threshold=3,
+        reset_seconds=60,
+        hedge_percentile=95,
+        hedge_min_samples=5,
+        latency_window=100,
+    )
+    for _ in range(5):
+        health.record_success(0.01)
+    router = get_router(admission, delay=0.2, health=health)
+
+    response = await router.ainvoke("Hi")
+
+    assert response.content == "done"
+    assert admission.stats.admitted["interactive"] == 2
+    assert admission.stats.in_flight == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_admits_the_most_urgent_priority_first() -> None:
+    admission = LLMAdmissionController(backend="stub", max_concurrency=1)
+    order: list[str] = []
+
+    async def call(priority: LLMPriority) -> None:
+        await get_router(admission, 0.01, priority).ainvoke("Hi")
+        order.append(priority.name.lower())
+
+    blocker = asyncio.create_task(call(LLMPriority.BACKGROUND))
+    await asyncio.sleep(0)
+    queued = [
+        asyncio.create_task(call(priority))
+        for priority in (
+            LLMPriority.CRAWLER,
+            LLMPriority.ROUTING,
+            LLMPriority.INTERACTIVE,
+        )
+    ]
+    await asyncio.gather(blocker, *queued)
+
+    assert order == ["background", "interactive", "routing", "crawler"]
+    assert admission.stats.in_flight == 0
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from common.schemas.llm import LLMPriority
+from common.utils.llm_admission import LLMAdmissionController
+from common.utils.llm_batcher import LLMBatcher
+from common.utils.vllm import BatchedVLLMClient
+
+
+class StubCompletions:
+    """
+    Completions endpoint answering each prompt with its upper-cased text,
+    listing the choices in reverse order to check they are matched by index.
+    """
+
+    def __init__(self):
+        self.requests: list[dict] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append(body)
+        prompts = (
+            body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+        )
+        choices = [
+            {
+                "index": i,
+                "text": prompt.upper(),
+                "logprobs": None,
+                "finish_reason": "stop",
+            }
+            for i, prompt in enumerate(prompts)
+        ]
+        return httpx.Response(
+            200,
+            json={
+                "id": f"cmpl-{len(self.requests)}",
+                "object": "text_completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": choices[::-1],
+                "usage": {
+                    "prompt_tokens": len(prompts),
+                    "completion_tokens": len(prompts),
+                    "total_tokens": 2 * len(prompts),
+                },
+            },
+        )
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def get_batcher(
+    stub: StubCompletions, admission: LLMAdmissionController, max_batch_size: int = 32
+) -> LLMBatcher:
+    return LLMBatcher(
+        client=AsyncOpenAI(
+            api_key="EMPTY", base_url="http://stub/v1", http_client=stub.http_client()
+        ),
+        admission=admission,
+        model_name="stub",
+        temperature=0.0,
+        max_tokens=8,
+        window_seconds=0.05,
+        max_batch_size=max_batch_size,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fans_batched_completions_out_to_their_callers() -> None:
+    stub = StubCompletions()
+    batcher = get_batcher(
+        stub, LLMAdmissionController(backend="vllm", max_concurrency=1)
+    )
+    prompts = [f"prompt {i}" for i in range(5)]
+
+    completions = await asyncio.gather(
+        *[batcher.acomplete(prompt) for prompt in prompts]
+    )
+
+    assert completions == [prompt.upper() for prompt in prompts]
+    assert [request["prompt"] for request in stub.requests] == [prompts]
+    assert batcher.stats.num_batches == 1
+    assert batcher.stats.mean_batch_size == 5
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sends_full_batches_early() -> None:
+    stub = StubCompletions()
+    batcher = get_batcher(
+        stub,
+        LLMAdmissionController(backend="vllm", max_concurrency=4),
+        max_batch_size=2,
+    )
+    prompts = [f"prompt {i}" for i in range(5)]
+
+    completions = await asyncio.gather(
+        *[batcher.acomplete(prompt) for prompt in prompts]
+    )
+
+    assert completions == [prompt.upper() for prompt in prompts]
+    assert sorted(len(request["prompt"]) for request in stub.requests) == [1, 2, 2]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_skips_prompts_of_cancelled_callers() -> None:
+    stub = StubCompletions()
+    batcher = get_batcher(
+        stub, LLMAdmissionController(backend="vllm", max_concurrency=1)
+    )
+
+    cancelled = asyncio.create_task(batcher.acomplete("cancelled"))
+    kept = asyncio.create_task(batcher.acomplete("kept"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await kept == "KEPT"
+    assert [request["prompt"] for request in stub.requests] == [["kept"]]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_calls_with_stop_sequences_wait_for_admission() -> None:
+    stub = StubCompletions()
+    admission = LLMAdmissionController(backend="vllm", max_concurrency=1)
+    llm = BatchedVLLMClient(
+        openai_api_key="EMPTY",
+        openai_api_base="http://stub/v1",
+        model_name="stub",
+        async_client=AsyncOpenAI(
+            api_key="EMPTY", base_url="http://stub/v1", http_client=stub.http_client()
+        ).completions,
+        batcher=get_batcher(stub, admission),
+        priority=LLMPriority.ROUTING,
+    )
+
+    await admission.acquire(LLMPriority.INTERACTIVE)
+    call = asyncio.create_task(llm.ainvoke("hi", stop=["\n"]))
+    await asyncio.sleep(0.05)
+    assert not call.done()
+    assert admission.queue_depth == 1
+    assert stub.requests == []
+
+    admission.release()
+    response = await call
+
+    assert response.content == "HI"
+    assert stub.requests[0]["stop"] == ["\n"]
+    assert admission.stats.in_flight == 0
@@ -0,0 +1,336 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from common.utils.llm_router import LLMBackendHealth, LLMRouter, LLMRouterBackend
+from common.utils.vllm import VLLMClient
+
+
+class StubLLMServer:
+    """
+    Local OpenAI compatible completions server answering every prompt with its name,
+    after delay seconds or with status_code. Streamed answers wait stream_delay seconds
+    after the first token, then end or, with fail_mid_stream, break off.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        delay: float = 0.0,
+        status_code: int = 200,
+        stream_delay: float = 0.0,
+        fail_mid_stream: bool = False,
+    ):
+        self.name = name
+        self.delay = delay
+        self.status_code = status_code
+        self.stream_delay = stream_delay
+        self.fail_mid_stream = fail_mid_stream
+        self.num_requests = 0
+        self.url = ""
+        self.app = FastAPI()
+        self.app.post("/v1/completions")(self.completions)
+
+    async def completions(self, request: Request) -> Response:
+        self.num_requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if self.status_code != 200:
+            return Response(status_code=self.status_code)
+        completion = {
+            "id": f"cmpl-{self.num_requests}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "text": self.name,
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+        if not body.get("stream"):
+            return Response(
+                content=json.dumps(completion), media_type="application/json"
+            )
+
+        async def events() -> AsyncIterator[str]:
+            yield f"data: {json.dumps(completion)}\n\n"
+            await asyncio.sleep(self.stream_delay)
+            if self.fail_mid_stream:
+                raise ConnectionResetError("Stream broken off")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator["StubLLMServer"]:
+        server = uvicorn.Server(
+            uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+        try:
+            yield self
+        finally:
+            server.should_exit = True
+            await task
+
+
+def get_health(name: str, **kwargs) -> LLMBackendHealth:
+    return LLMBackendHealth(
+        **{
+            "llm": name,
+            "failure_threshold": 3,
+            "reset_seconds": 60,
+            "hedge_percentile": 95,
+            "hedge_min_samples": 5,
+            "latency_window": 100,
+            **kwargs,
+        }
+    )
+
+
+def get_router(
+    servers: list[StubLLMServer],
+    healths: list[LLMBackendHealth],
+    timeout: float = 5.0,
+    streaming: bool = False,
+) -> LLMRouter:
+    return LLMRouter(
+        backends=[
+            LLMRouterBackend(
+                llm=VLLMClient(
+                    openai_api_key="EMPTY",
+                    openai_api_base=server.url,
+                    model_name="stub",
+                    streaming=True,
+                    max_retries=0,
+                ),
+                health=health,
+            )
+            for server, health in zip(servers, healths)
+        ],
+        timeout=timeout,
+        hedge=not streaming,
+        streaming=streaming,
+    )
+
+
+@asynccontextmanager
+async def serve(*servers: StubLLMServer) -> AsyncIterator[list[StubLLMServer]]:
+    async with servers[0].serve():
+        if len(servers) == 1:
+            yield list(servers)
+        else:
+            async with serve(*servers[1:]):
+                yield list(servers)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fails_over_on_error() -> None:
+    async with serve(
+        StubLLMServer("primary", status_code=500), StubLLMServer("fallback")
+    ) as (primary, fallback):
+        healths = [get_health("primary"), get_health("fallback")]
+        response = await get_router([primary, fallback], healths).ainvoke("Hi")
+
+    assert response.content == "fallback"
+    assert primary.num_requests == 1
+    assert healths[0].num_failures == 1
+    assert healths[1].num_failures == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fails_over_on_timeout() -> None:
+    async with serve(
+        StubLLMServer("primary", delay=2.0), StubLLMServer("fallback")
+    ) as (
+        primary,
+        fallback,
+    ):
+        healths = [get_health("primary"), get_health("fallback")]
+        start = time.perf_counter()
+        response = await get_router([primary, fallback], healths, timeout=0.3).ainvoke(
+            "Hi"
+        )
+        elapsed = time.perf_counter() - start
+
+    assert response.content == "fallback"
+    assert elapsed < 1.5
+    assert healths[0].num_failures == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedges_calls_slower_than_p95() -> None:
+    async with serve(
+        StubLLMServer("primary", delay=2.0), StubLLMServer("fallback")
+    ) as (
+        primary,
+        fallback,
+    ):
+        healths = [get_health("primary"), get_health("fallback")]
+        for _ in range(5):
+            healths[0].record_success(0.05)
+        start = time.perf_counter()
+        response = await get_router([primary, fallback], healths).ainvoke("Hi")
+        elapsed = time.perf_counter() - start
+
+    assert response.content == "fallback"
+    assert elapsed < 1.5
+    assert primary.num_requests == 1
+    assert fallback.num_requests == 1
+    # The losing call was cancelled, not failed
+    assert healths[0].num_failures == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_does_not_hedge_streaming_calls() -> None:
+    async with serve(
+        StubLLMServer("primary", delay=0.3), StubLLMServer("fallback")
+    ) as (
+        primary,
+        fallback,
+    ):
+        healths = [get_health("primary"), get_health("fallback")]
+        for _ in range(5):
+            healths[0].record_success(0.05)
+        response = await get_router(
+            [primary, fallback], healths, streaming=True
+        ).ainvoke("Hi")
+
+    assert response.content == "primary"
+    assert fallback.num_requests == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedges_despite_runtime_callbacks() -> None:
+    # LangGraph nodes always pass their callbacks in the runtime config
+    async with serve(
+        StubLLMServer("primary", delay=2.0), StubLLMServer("fallback")
+    ) as (
+        primary,
+        fallback,
+    ):
+        healths = [get_health("primary"), get_health("fallback")]
+        for _ in range(5):
+            healths[0].record_success(0.05)
+        response = await get_router([primary, fallback], healths).ainvoke(
+            "Hi", config={"callbacks": [AsyncCallbackHandler()]}
+        )
+
+    assert response.content == "fallback"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_does_not_time_out_streaming_answers() -> None:
+    async with serve(
+        StubLLMServer("primary", stream_delay=0.5), StubLLMServer("fallback")
+    ) as (primary, fallback):
+        healths = [get_health("primary"), get_health("fallback")]
+        response = await get_router(
+            [primary, fallback], healths, timeout=0.2, streaming=True
+        ).ainvoke("Hi")
+
+    assert response.content == "primary"
+    assert fallback.num_requests == 0
+    assert healths[0].num_failures == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_times_out_streaming_calls_without_a_first_token() -> None:
+    async with serve(
+        StubLLMServer("primary", delay=2.0), StubLLMServer("fallback")
+    ) as (primary, fallback):
+        healths = [get_health("primary"), get_health("fallback")]
+        start = time.perf_counter()
+        response = await get_router(
+            [primary, fallback], healths, timeout=0.3, streaming=True
+        ).ainvoke("Hi")
+        elapsed = time.perf_counter() - start
+
+    assert response.content == "fallback"
+    assert elapsed < 1.5
+    assert healths[0].num_failures == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_does_not_fail_over_once_streaming_started() -> None:
+    async with serve(
+        StubLLMServer("primary", fail_mid_stream=True), StubLLMServer("fallback")
+    ) as (primary, fallback):
+        healths = [get_health("primary"), get_health("fallback")]
+        with pytest.raises(Exception):
+            await get_router([primary, fallback], healths, streaming=True).ainvoke("Hi")
+
+    assert fallback.num_requests == 0
+    assert healths[0].num_failures == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cancelled_probe_lets_the_next_call_probe() -> None:
+    async with serve(StubLLMServer("primary", delay=2.0)) as (primary,):
+        healths = [get_health("primary", failure_threshold=1, reset_seconds=0.1)]
+        healths[0].record_failure()
+        await asyncio.sleep(0.1)
+        probe = asyncio.create_task(get_router([primary], healths).ainvoke("Hi"))
+        await asyncio.sleep(0.05)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    assert healths[0].circuit_open
+    assert healths[0].allow_request()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_circuit_opens_after_consecutive_failures() -> None:
+    async with serve(
+        StubLLMServer("primary", status_code=503), StubLLMServer("fallback")
+    ) as (primary, fallback):
+        healths = [get_health("primary", failure_threshold=2), get_health("fallback")]
+        router = get_router([primary, fallback], healths)
+        responses = [await router.ainvoke("Hi") for _ in range(4)]
+
+    assert [response.content for response in responses] == ["fallback"] * 4
+    assert primary.num_requests == 2
+    assert healths[0].stats.circuit_open
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fails_when_every_circuit_is_open() -> None:
+    async with serve(StubLLMServer("primary", status_code=500)) as (primary,):
+        healths = [get_health("primary", failure_threshold=1)]
+        router = get_router([primary], healths)
+        with pytest.raises(Exception):
+            await router.ainvoke("Hi")
+        with pytest.raises(ConnectionError):
+            await router.ainvoke("Hi")
+
+    assert primary.num_requests == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_reports_tail_latency_per_backend() -> None:
+    async with serve(StubLLMServer("primary", delay=0.01)) as (primary,):
+        healths = [get_health("primary")]
+        router = get_router([primary], healths)
+        await asyncio.gather(*[router.ainvoke("Hi") for _ in range(10)])
+
+    stats = healths[0].stats
+    assert stats.num_calls == 10
+    assert stats.num_failures == 0
+    assert 0.01 <= stats.p50_seconds <= stats.p95_seconds <= stats.p99_seconds